@@ -0,0 +1,150 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+import functions
+import store as storage
+from records import Todo
+
+r"""
+An asyncio facade over a TodoStore and the functions.* operations.
+
+The stores and functions.py block on file and database I/O, so calling them from a coroutine stalls
+every other request sharing the event loop. AsyncStore runs each call on a small thread pool of its
+own (max_workers threads, so a burst of requests queues up instead of spawning threads) and awaits
+the result:
+
+    async with AsyncStore() as store:               # or AsyncStore(storage.open_store("sqlite", ...))
+        change = await store.add("Buy milk")        # functions.Change; TodoError subclasses propagate
+        await store.complete(change.todo.id)
+        async for todo in store.iter_completed():   # archive segments first, one at a time
+            ...
+
+Listings are streamed: iter_todos() and iter_completed() pull CHUNK_SIZE todos per trip to the pool,
+so a long history is never held in memory at once and other coroutines run between chunks.
+
+Cancelling a coroutine (task.cancel(), asyncio.wait_for timeouts) also cancels its call if it is
+still queued for a thread, so it never runs. A call that already started cannot be interrupted halfway:
+it completes in the background (a write is still applied) and its result is dropped. A cancelled
+listing stops after the chunk in progress.
+
+The mutations work on scratch dicts, as the GUI's worker does: read the lists back (or use
+load_todos()) to see the outcome of writes made by anyone.
+"""
+
+MAX_WORKERS = 4  # Threads doing blocking store calls
+CHUNK_SIZE = 256  # Todos fetched per trip to the thread pool when streaming
+
+
+class AsyncStore:
+    """Awaitable versions of the store and functions.* calls, run on a bounded thread pool."""
+
+    def __init__(self, store: storage.TodoStore | None = None, max_workers: int = MAX_WORKERS):
+        self.store = store or functions.get_store()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="todo-aio")
+
+    async def _run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the pool; cancelling the await cancels it if it has not started."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    # -------------------------
+    # Reading
+    # -------------------------
+
+    async def version(self) -> int:
+        return await self._run(self.store.version)
+
+    async def get(self, todo_id: str) -> Todo | None:
+        return await self._run(self.store.get, todo_id)
+
+    async def counts(self) -> dict[str, int]:
+        return await self._run(self.store.counts)
+
+    async def load_todos(self) -> dict[str, Todo]:
+        """The whole active list at once (use iter_todos() to stream it)."""
+        return await self._run(self.store.load_todos)
+
+    async def archive_segments(self) -> list[dict]:
+        return await self._run(self.store.archive_segments)
+
+    async def search(self, query: str, limit: int | None = None) -> list[tuple[str, str, Todo]]:
+        return await self._run(functions.search_todos, query, self.store, limit)
+
+    async def between(self, field: str, start: int | None = None, end: int | None = None,
+                      limit: int | None = None, newest_first: bool = False) -> list[tuple[str, str, Todo]]:
+        return await self._run(functions.todos_between, field, start, end, self.store,
+                               limit=limit, newest_first=newest_first)
+
+    # -------------------------
+    # Streaming
+    # -------------------------
+
+    async def _stream(self, todos, chunk_size: int):
+        """Yield the items of a blocking iterator, fetching chunk_size of them per pool call."""
+        todos = iter(todos)
+        while True:
+            chunk = await self._run(lambda: list(islice(todos, chunk_size)))
+            if not chunk:
+                return
+            for todo in chunk:
+                yield todo
+
+    async def iter_todos(self, chunk_size: int = CHUNK_SIZE):
+        """Yield the active todos in the order they were added."""
+        todos = await self._run(self.store.load_todos)
+        async for todo in self._stream(todos.values(), chunk_size):
+            yield todo
+
+    async def iter_completed(self, include_archive: bool = True, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield completed todos oldest first: the archive segments (read one at a time, only as the
+        iteration reaches them) and then the newest ones. include_archive=False skips the archive.
+        """
+        if include_archive:
+            history = (todo for _todo_id, todo in self.store.iter_completed_history())
+        else:
+            history = iter(await self._run(lambda: list(self.store.load_completed().values())))
+        async for todo in self._stream(history, chunk_size):
+            yield todo
+
+    # -------------------------
+    # Writing
+    # -------------------------
+
+    async def add(self, text: str) -> functions.Change:
+        return await self._run(functions.add, text, {}, self.store)
+
+    async def edit(self, todo_id: str, text: str) -> functions.Change:
+        return await self._run(functions.edit, todo_id, text, {}, None, self.store)
+
+    async def remove(self, todo_id: str) -> functions.Change:
+        return await self._run(functions.remove, todo_id, {}, self.store)
+
+    async def complete(self, todo_id: str) -> functions.Change:
+        return await self._run(functions.complete, todo_id, {}, {}, self.store)
+
+    async def complete_many(self, todo_ids) -> functions.Change:
+        return await self._run(functions.complete_many, list(todo_ids), {}, {}, self.store)
+
+    async def remove_many(self, todo_ids) -> functions.Change:
+        return await self._run(functions.remove_many, list(todo_ids), {}, self.store)
+
+    async def clear_completed(self) -> functions.Change:
+        completed = await self._run(self.store.load_completed)  # Only counted, for the Change
+        return await self._run(functions.clear_completed, completed, self.store)
+
+    # -------------------------
+    # Closing
+    # -------------------------
+
+    async def aclose(self) -> None:
+        """Wait for calls already running, then stop the pool (the store itself stays open)."""
+        await asyncio.get_running_loop().run_in_executor(None, partial(self._executor.shutdown, wait=True))
+
+    async def __aenter__(self) -> "AsyncStore":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -58,22 +58,63 @@
 
 # ────────────────────────────── PYTHON CODE BELOW ──────────────────────────
 import streamlit as st
+import argparse
+import datetime
+import io
 import os
+from itertools import islice
+import time
 import functions  # your own helper module
+import live
+import metrics
+import records
+import store as storage
 
 
-# -------- FILE-SYSTEM SET-UP ------------------------------------------------
-APPDATA_DIR = os.path.join(os.path.expanduser("~"), ".todo_app")  # hidden dir in user’s home
-os.makedirs(APPDATA_DIR, exist_ok=True)
+# -------- RERUN METRICS ---------------------------------------------------
+# every interaction reruns this whole script; measure each rerun (shown at ?metrics=1)
+rerun_started = time.perf_counter()
+read_bytes_before = metrics.total("io.read_bytes")
 
-FILEPATH_TODO      = os.path.join(APPDATA_DIR, "todo_list.txt")
-FILEPATH_COMPLETED = os.path.join(APPDATA_DIR, "completed_todo_list.txt")
 
-# create empty files the first time the app runs
-if not os.path.isfile(FILEPATH_TODO):
-    open(FILEPATH_TODO, "w").close()
-if not os.path.isfile(FILEPATH_COMPLETED):
-    open(FILEPATH_COMPLETED, "w").close()
+# -------- STORAGE BACKEND --------------------------------------------------
+# streamlit run app_web.py -- --store sqlite   (or set TODO_STORE=sqlite)
+# add --durability fsync to sync every click to disk before the rerun (default: group commit)
+@st.cache_resource
+def get_store(kind, durability):
+    """
+    Open the chosen backend once per server process and reuse it on every rerun.
+    The store creates ~/.todo_app and its files itself the first time it writes.
+    """
+    if durability:
+        storage.set_durability(durability)
+    return storage.open_store(kind, functions.APPDATA_DIR)
+
+
+@st.cache_resource
+def get_live_view(_store):
+    """
+    One LiveView per server process, shared by every browser tab: it keeps the parsed lists and
+    the store version, so a change is read from disk once, not once per tab and rerun.
+    """
+    return live.LiveView(_store)
+
+
+@st.cache_resource
+def start_metrics():
+    """Save this server's metrics for `python cli.py stats` (once per process)."""
+    metrics.autosave(functions.METRICS_DIR, "web")
+
+
+start_metrics()
+
+_parser = argparse.ArgumentParser()
+_parser.add_argument("--store", choices=storage.BACKENDS, default=None)
+_parser.add_argument("--durability", choices=storage.DURABILITY_MODES, default=None)
+_parser.add_argument("--page-size", type=int, default=50, help="tasks shown per page (default 50)")
+_options = _parser.parse_known_args()[0]
+store = get_store(_options.store, _options.durability)
+live_view = get_live_view(store)
 
 
 # -------- CALLBACKS --------------------------------------------------------
@@ -84,20 +125,91 @@ def add_todo() -> None:
     """
     todos = st.session_state["new_todo"].strip()
     if todos:
-        # always read the file again to get the freshest list
-        todo_list = functions.load_todos(FILEPATH_TODO)
-        functions.add(todos, todo_list)
+        # the rerun shows the new todo (the shared lists are re-read once for the new version)
+        try:
+            functions.add(todos, {}, store)
+        except functions.TodoError as e:
+            st.session_state["todo_error"] = str(e)   # shown under the input field
+            return
         st.session_state["new_todo"] = ""        # clear the input field
         # (no explicit st.rerun() needed inside callbacks)
 
 
+def selected_todo_ids() -> list:
+    """Ids of the todos ticked in the bulk form (their checkboxes are keyed tick_<id>)."""
+    return [key[len("tick_"):] for key, ticked in st.session_state.items()
+            if key.startswith("tick_") and ticked]   # a prefix no other widget or state key uses
+
+
+def complete_selected() -> None:
+    """Complete every ticked todo in one store transaction (runs before the form's single rerun)."""
+    todo_ids = selected_todo_ids()
+    if todo_ids:
+        change = functions.complete_many(todo_ids, {}, {}, store)
+        st.session_state["bulk_result"] = f"🎉 {change.count} task(s) marked as completed!"
+
+
+def delete_selected() -> None:
+    """Delete every ticked todo in one store transaction."""
+    todo_ids = selected_todo_ids()
+    if todo_ids:
+        change = functions.remove_many(todo_ids, {}, store)
+        st.session_state["bulk_result"] = f"🗑️ {change.count} task(s) deleted."
+
+
 def clear_completed_todos() -> None:
-    """Erase the completed-todos file and refresh the app."""
-    completed_list = functions.load_todos(FILEPATH_COMPLETED)
-    functions.clear_completed(completed_list, FILEPATH_COMPLETED)
+    """Erase the completed todos and refresh the app."""
+    functions.clear_completed(dict(live_view.snapshot()[2]), store)   # a copy: the lists are shared
     # st.rerun()  # OK here because this function is called via st.button (on_click)
 
 
+def import_uploaded_file() -> None:
+    """Stream the uploaded JSONL/CSV file into the store (called by the Import button)."""
+    uploaded = st.session_state.get("import_file")
+    if uploaded is None:
+        return
+    fmt = functions.guess_format(uploaded.name)
+    # Wrap the upload so rows are parsed line by line instead of decoding the whole file at once
+    lines = io.TextIOWrapper(uploaded, encoding="utf-8", newline="")
+    try:
+        counts = functions.import_todos(functions.read_import_rows(lines, fmt), store=store)
+    except functions.InvalidImportFile as e:
+        st.session_state["import_error"] = str(e)   # shown under the Import button
+        return
+    st.session_state["import_result"] = counts
+
+
+def page_of(todos: dict, key: str, page_size: int) -> list:
+    """
+    Return the (id, Todo) pairs on the page picked for this list.
+
+    Only one page of widgets is built per rerun, however long the list is; the page picker is
+    shown when there is more than one page.
+    """
+    pages = max(1, -(-len(todos) // page_size))          # ceiling division
+    if st.session_state.get(key, 1) > pages:             # the list shrank since the page was picked
+        st.session_state[key] = pages
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+    start = (page - 1) * page_size
+    return list(islice(todos.items(), start, start + page_size))
+
+
+def strike_block(todos) -> str:
+    """All completed todos as ONE markdown block (one element instead of one per todo)."""
+    return "  \n".join(f"~~{todo.render()}~~ ✓" for todo in todos)
+
+
+def prepare_export() -> None:
+    """Build the export file for the chosen format (called by the Prepare export button only)."""
+    fmt = st.session_state["export_format"]
+    buffer = io.StringIO()
+    count = functions.write_export(buffer, fmt, store)
+    # Kept in this session until the format changes or it is prepared again; reruns never rebuild it
+    st.session_state["export_file"] = {"format": fmt, "data": buffer.getvalue(), "count": count}
+
+
 # -------- PAGE CONFIG ------------------------------------------------------
 st.set_page_config(
     page_title="My Todo App",
@@ -140,13 +252,77 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# -------- SESSION STATE INIT -----------------------------------------------
-if "processed_indices" not in st.session_state:
-    st.session_state.processed_indices = set()
+SEARCH_LIMIT = 50  # matches shown at once
+SYNC_INTERVAL = 2  # seconds between checks for changes made elsewhere
+
+# -------- READ DATA (shared by all tabs, re-read only after a change) -------
+shown_version, todo_list, completed_list = live_view.snapshot()   # read-only: shared with other tabs
+st.session_state["shown_version"] = shown_version
+
+
+# -------- LIVE SYNC ----------------------------------------------------------
+# changes from cli.py, the GUI or another tab show up without a click: this fragment reruns on its
+# own every few seconds, and only when the store version moved does it rerun the whole page.
+# poll() asks the store at most once per second for all tabs together.
+@st.fragment(run_every=SYNC_INTERVAL)
+def live_sync() -> None:
+    if live_view.poll() != st.session_state.get("shown_version"):
+        st.rerun()
+
+
+live_sync()
+
+# -------- SEARCH ------------------------------------------------------------
+search_query = st.text_input(
+    "🔍 Search",
+    key="search_query",
+    placeholder="Search active, completed and archived tasks (e.g. 'buy mil')",
+)
+if search_query.strip():
+    hits = functions.search_todos(search_query, store, limit=SEARCH_LIMIT)
+    if not hits:
+        st.info("No tasks match your search.")
+    for list_name, _todo_id, todo in hits:
+        if list_name == "todo":
+            st.markdown(f"📝 {todo.render()}")
+        else:
+            st.markdown(f"✅ ~~{todo.render()}~~" + (" *(archived)*" if list_name == "archived" else ""))
+    if len(hits) == SEARCH_LIMIT:
+        st.caption(f"Showing the first {SEARCH_LIMIT} matches. Add more words to narrow it down.")
+    st.markdown("---")
 
-# -------- READ DATA FROM DISK ----------------------------------------------
-todo_list      = functions.load_todos(FILEPATH_TODO)
-completed_list = functions.load_todos(FILEPATH_COMPLETED)
+# -------- DATE-RANGE FILTER -------------------------------------------------
+with st.expander("📅 Filter by date"):
+    date_field = st.radio(
+        "Show tasks",
+        ("completed", "created"),
+        format_func=lambda field: f"{field.capitalize()} between",
+        horizontal=True,
+        key="date_field",
+    )
+    today = datetime.date.today()
+    date_range = st.date_input(
+        "Dates",
+        value=(today - datetime.timedelta(days=7), today),   # last week by default
+        format="DD/MM/YYYY",
+        key="date_range",
+    )
+    if len(date_range) == 2:        # while picking, only the start date is set
+        first_day, last_day = date_range
+        start = int(time.mktime(first_day.timetuple()))
+        end = int(time.mktime((last_day + datetime.timedelta(days=1)).timetuple()))  # include last day
+        hits = functions.todos_between(date_field, start, end, store, limit=SEARCH_LIMIT, newest_first=True)
+        if not hits:
+            st.info("No tasks in that date range.")
+        for list_name, _todo_id, todo in hits:
+            if list_name == "todo":
+                st.markdown(f"📝 {todo.render()}")
+            else:
+                done_on = f" · done {records.format_date(todo.completed)}" if todo.completed else ""
+                st.markdown(f"✅ ~~{todo.render()}~~{done_on}"
+                            + (" *(archived)*" if list_name == "archived" else ""))
+        if len(hits) == SEARCH_LIMIT:
+            st.caption(f"Showing the newest {SEARCH_LIMIT} tasks. Pick a shorter range to see the rest.")
 
 # -------- MAIN LAYOUT (two columns) ----------------------------------------
 col1, col2 = st.columns(2)
@@ -155,20 +331,28 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown('<div class="todo-container">', unsafe_allow_html=True)
     st.subheader("📝 Active Tasks")
+    page_sizes = sorted({25, 50, 100, 200, _options.page_size})   # --page-size sets the default
+    page_size = st.selectbox("Tasks per page", page_sizes, index=page_sizes.index(_options.page_size),
+                             key="page_size")
 
     if not todo_list:
         st.info("🎉 No active tasks! Add one above to get started.")
     else:
-        for idx, todo in enumerate(todo_list):
-            # unique key prevents checkbox collisions if text repeats
-            checkbox_key = f"todo_{idx}_{hash(todo)}"
-            checked = st.checkbox(todo, key=checkbox_key, value=False)
-
-            if checked:
-                # move from active list to completed list
-                functions.complete(idx, todo_list, completed_list)
-                st.session_state.processed_indices.clear()
-                st.rerun()  # immediate visual update after ticking the box
+        # inside a form, ticking a box does not rerun the script; the submit buttons
+        # complete/delete all ticked tasks in ONE store transaction and ONE rerun
+        page = page_of(todo_list, "todo_page", page_size)   # the page picker stays outside the form
+        with st.form("bulk_form", clear_on_submit=True):
+            for todo_id, todo in page:
+                # the stable todo id keeps keys unique even when texts repeat
+                st.checkbox(todo.render(), key=f"tick_{todo_id}", value=False)
+
+            complete_col, delete_col = st.columns(2)
+            with complete_col:
+                st.form_submit_button("✅ Complete selected", on_click=complete_selected)
+            with delete_col:
+                st.form_submit_button("🗑️ Delete selected", on_click=delete_selected)
+    if "bulk_result" in st.session_state:
+        st.success(st.session_state.pop("bulk_result"))
     st.markdown("</div>", unsafe_allow_html=True)
 
 # -- COMPLETED TASKS (right column) -----------------------------------------
@@ -179,13 +363,26 @@ with col2:
     if not completed_list:
         st.info("📋 No completed tasks yet. Check off some todos!")
     else:
-        for comp in completed_list:
-            st.markdown(f"~~{comp}~~ ✓")
+        st.markdown(strike_block(comp for _comp_id, comp in page_of(completed_list, "completed_page", page_size)))
 
     if completed_list:
         # button calls clear_completed_todos() which then st.rerun()s
         st.button("🗑️ Clear All Completed", key="clear_completed",
                   on_click=clear_completed_todos)
+
+    # older completed todos live in archive segments; only the picked one is read
+    archived_segments = store.archive_segments()
+    if archived_segments:
+        picked = st.selectbox(
+            "🗄️ Older completed tasks",
+            list(reversed(archived_segments)),          # newest first
+            format_func=functions.archive_label,
+            index=None,
+            placeholder="Pick an archive segment to show",
+            key="archive_segment",
+        )
+        if picked is not None:
+            st.markdown(strike_block(store.load_archive_segment(picked["segment"]).values()))
     st.markdown("</div>", unsafe_allow_html=True)
 
 # -------- CENTERED INPUT FIELD ---------------------------------------------
@@ -200,17 +397,48 @@ with center:
         label_visibility="collapsed",
         help="Press Enter to add your todo",
     )
+    if "todo_error" in st.session_state:
+        st.warning(st.session_state.pop("todo_error"))
+
+# -------- IMPORT / EXPORT ---------------------------------------------------
+with st.expander("📦 Import / Export"):
+    import_col, export_col = st.columns(2)
+
+    with import_col:
+        st.file_uploader("Import todos (JSONL or CSV)", type=list(functions.EXPORT_FORMATS),
+                         key="import_file")
+        st.button("📥 Import", key="import_button", on_click=import_uploaded_file)
+        if "import_error" in st.session_state:
+            st.warning(st.session_state.pop("import_error"))
+        if "import_result" in st.session_state:
+            counts = st.session_state.pop("import_result")
+            st.success(f"Imported {counts['imported']} todos ({counts['completed']} completed), "
+                       f"skipped {counts['skipped']} invalid and {counts['duplicates']} already on the list.")
+
+    with export_col:
+        export_format = st.radio("Export format", functions.EXPORT_FORMATS, horizontal=True,
+                                 key="export_format")
+        st.button("📦 Prepare export", key="export_button", on_click=prepare_export)
+        # The file is only built when asked for, never on a rerun or because the store changed
+        export_file = st.session_state.get("export_file")
+        if export_file is not None and export_file["format"] == export_format:
+            st.download_button(f"📤 Download {export_file['count']} todos", export_file["data"],
+                               file_name=f"todos.{export_format}",
+                               mime="text/csv" if export_format == "csv" else "application/jsonl")
 
 # -------- FOOTER METRICS ----------------------------------------------------
+# counted by the store (len of its in-memory state / SQL COUNT), no list is copied or read
 st.markdown("---")
+counts = store.counts()
+completed_count = counts["completed"] + counts["archived"]
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.metric("📋 Active Tasks", len(todo_list))
+    st.metric("📋 Active Tasks", counts["todo"])
 with col2:
-    st.metric("✅ Completed Tasks", len(completed_list))
+    st.metric("✅ Completed Tasks", completed_count)
 with col3:
-    st.metric("📊 Total Tasks", len(todo_list) + len(completed_list))
+    st.metric("📊 Total Tasks", counts["todo"] + completed_count)
 
 # Additional styling for the metric boxes
 st.markdown(
@@ -225,3 +453,31 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+# -------- HIDDEN METRICS PANEL (open the app with ?metrics=1) ---------------
+metrics.observe("web.rerun", time.perf_counter() - rerun_started, "seconds")
+metrics.observe("web.rerun_read_bytes", metrics.total("io.read_bytes") - read_bytes_before, "bytes")
+metrics.save_if_due()
+
+if st.query_params.get("metrics") == "1":
+    st.markdown("---")
+    st.subheader("📊 Metrics (this server process)")
+    counter_rows, summary_rows = metrics.rows(metrics.current())
+    st.caption(f"This rerun: {(time.perf_counter() - rerun_started) * 1000:.1f} ms, "
+               f"{metrics.total('io.read_bytes') - read_bytes_before:,.0f} bytes read")
+    st.dataframe(counter_rows, hide_index=True, use_container_width=True)
+    st.dataframe(
+        [
+            {"name": row["name"], "unit": "ms" if row["unit"] == "seconds" else row["unit"], "calls": row["count"],
+             **{column: row[column] * (1000 if row["unit"] == "seconds" else 1)
+                for column in ("mean", "p50", "p90", "p99")}}
+            for row in summary_rows
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    if st.button("💾 Write Prometheus file", key="write_prometheus"):
+        metrics.save()   # include this process's latest numbers
+        prometheus_path = os.path.join(functions.METRICS_DIR, "todo.prom")
+        metrics.write_prometheus(prometheus_path, metrics.merge(metrics.load_snapshots(functions.METRICS_DIR)))
+        st.success(f"Metrics of all front-ends written to {prometheus_path}")
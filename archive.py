@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import locking
+import metrics
+from oplog import _atomic_write
+from records import Todo, format_line, parse_line
+
+r"""
+Segmented archive for the completed todos.
+
+Completing a todo appends it to completed_todo_list.txt, the *head* segment. Once the head holds
+SEGMENT_MAX_TODOS todos, or has been collecting for longer than SEGMENT_MAX_AGE, it is *sealed*: its
+todos are written to a numbered, read-only segment file and the head starts again empty.
+
+    ~/.todo_app/completed_archive/manifest.json
+    ~/.todo_app/completed_archive/segment-000001.txt   (one todo per line, oldest first)
+    ~/.todo_app/completed_archive/segment-000002.txt
+    ...
+
+Only the head is loaded with the rest of the todos. Sealed segments are listed in the small
+manifest (number, todo count, when they were started and sealed) and a segment is only read when
+someone asks for it. Segment files never change once written, so a segment read once stays cached.
+
+Instead of throwing every completed todo away, clearing seals the head. After every seal a
+retention policy drops whole segments once there are more than RETENTION_SEGMENTS of them or they
+were sealed more than RETENTION_DAYS ago.
+"""
+
+ARCHIVE_DIR_NAME = "completed_archive"
+MANIFEST_NAME = "manifest.json"
+
+SEGMENT_MAX_TODOS = 1000  # Seal the head once it holds this many completed todos...
+SEGMENT_MAX_AGE = 30 * 24 * 3600  # ...or once it has been collecting for 30 days
+RETENTION_SEGMENTS = 100  # Keep at most this many sealed segments
+RETENTION_DAYS = 730  # Drop segments sealed longer ago than this
+
+
+def segment_is_full(count: int, started_at: float | None, now: float | None = None) -> bool:
+    """Return True when a head segment of count todos started at started_at should be sealed."""
+    if not count:
+        return False
+    if count >= SEGMENT_MAX_TODOS:
+        return True
+    now = time.time() if now is None else now
+    return started_at is not None and now - started_at >= SEGMENT_MAX_AGE
+
+
+def expired_segments(segments: list[dict], max_segments: int | None = RETENTION_SEGMENTS,
+                     max_age_days: float | None = RETENTION_DAYS, now: float | None = None) -> list[dict]:
+    """Return the segments (oldest first) that fall outside the retention policy."""
+    now = time.time() if now is None else now
+    expired = []
+    keep_from = len(segments) - max_segments if max_segments is not None else 0
+    for position, segment in enumerate(segments):
+        too_many = position < keep_from
+        too_old = max_age_days is not None and now - segment["sealed_at"] > max_age_days * 86400
+        if too_many or too_old:
+            expired.append(segment)
+    return expired
+
+
+class SegmentArchive:
+    """The sealed segments of one completed list, as used by TextFileStore."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        # The archive lives inside the data folder, so it shares the store's lock
+        self._lock = locking.get_lock(os.path.dirname(directory))
+        self._manifest: dict | None = None
+        self._seen = None  # Stat signature of the manifest when it was last read
+        self._segments: dict[int, dict[str, Todo]] = {}  # Segments already read (they never change)
+        self._cache_lock = threading.Lock()
+        self._pending: dict | None = None  # Writes held back while a batch is open (see batch)
+        # Create the folder up front, so the file watcher can watch it before the first seal
+        os.makedirs(directory, exist_ok=True)
+
+    # -------------------------
+    # Manifest
+    # -------------------------
+
+    def manifest(self) -> dict:
+        """Return the manifest, re-reading it only when the file changed."""
+        with self._lock.shared():
+            return self._read_manifest()
+
+    def _read_manifest(self) -> dict:
+        if self._pending is not None and self._pending["manifest"] is not None:
+            return self._pending["manifest"]  # Changed inside the open batch, not written yet
+        try:
+            st = os.stat(self.manifest_path)
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            signature = None
+        if self._manifest is None or signature != self._seen:
+            manifest = {}
+            if signature is not None:
+                try:
+                    with open(self.manifest_path, encoding="utf-8") as file:
+                        manifest = json.load(file)
+                except ValueError:
+                    manifest = {}
+                metrics.count("io.reads")
+                metrics.count("io.read_bytes", signature[1])
+            manifest.setdefault("next", 1)
+            manifest.setdefault("head_started", None)
+            manifest.setdefault("segments", [])
+            self._manifest, self._seen = manifest, signature
+        return self._manifest
+
+    def _write_manifest(self, manifest: dict) -> None:
+        if self._pending is not None:
+            self._pending["manifest"] = manifest
+            return
+        self._lock.mark_changed()
+        os.makedirs(self.directory, exist_ok=True)
+        _atomic_write(self.manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+        st = os.stat(self.manifest_path)
+        self._manifest, self._seen = manifest, (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold back the archive writes made inside the block until it ends without an error.
+
+        TextFileStore opens it inside the batches of its two logs, so a seal's segment file and
+        manifest are written just before the head clear is appended, and not at all if the
+        transaction fails. A crash in between still leaves a duplicate rather than a lost todo.
+        """
+        with self._lock.exclusive():
+            if self._pending is not None:  # Already inside a batch: join it
+                yield
+                return
+
+            self._pending = {"manifest": None, "segments": {}, "dropped": set()}
+            try:
+                yield
+            finally:
+                pending, self._pending = self._pending, None
+            # Not reached after an error: the held-back writes are simply forgotten
+            for number, items in pending["segments"].items():
+                self._write_segment(number, items)
+            if pending["manifest"] is not None:
+                self._write_manifest(pending["manifest"])
+            self._remove_segments(pending["dropped"])
+
+    def segments(self) -> list[dict]:
+        """Return the sealed segments, oldest first, as {"segment", "count", "started_at", "sealed_at"}."""
+        return [dict(segment) for segment in self.manifest()["segments"]]
+
+    def head_started(self) -> float | None:
+        """Return when the current head segment started collecting todos."""
+        return self.manifest()["head_started"]
+
+    def start_head(self) -> None:
+        """Record that the head has started collecting, if nobody has yet (exclusive lock held)."""
+        manifest = self._read_manifest()
+        if manifest["head_started"] is None:
+            self._write_manifest(dict(manifest, head_started=time.time()))
+
+    # -------------------------
+    # Segments
+    # -------------------------
+
+    def segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:06d}.txt")
+
+    def load(self, number: int) -> dict[str, Todo]:
+        """Read one sealed segment as {id: Todo} in completion order (empty if it is gone)."""
+        if self._pending is not None and number in self._pending["segments"]:
+            return dict(self._pending["segments"][number])  # Sealed in the open batch
+        with self._cache_lock:
+            if number in self._segments:
+                return dict(self._segments[number])
+
+        items: dict[str, Todo] = {}
+        try:
+            with metrics.timer("archive.load_segment"), \
+                    open(self.segment_path(number), encoding="utf-8") as file:
+                for line in file:
+                    todo = parse_line(line)
+                    if todo is not None and todo.id:
+                        items[todo.id] = todo
+                metrics.count("io.reads")
+                metrics.count("io.read_bytes", os.fstat(file.fileno()).st_size)
+        except FileNotFoundError:
+            return items  # Dropped by retention in the meantime; do not cache
+
+        with self._cache_lock:
+            self._segments[number] = items
+        return dict(items)
+
+    def seal(self, items: dict[str, Todo]) -> dict | None:
+        """
+        Write items as the next sealed segment and return its manifest entry (exclusive lock held).
+
+        The caller empties the head afterwards. If we crash in between, the todos show up both in
+        the segment and the head: a duplicate rather than a lost todo.
+        """
+        if not items:
+            return None
+        manifest = self._read_manifest()
+        number = manifest["next"]
+        now = time.time()
+
+        self._write_segment(number, items)
+
+        entry = {
+            "segment": number,
+            "count": len(items),
+            "started_at": manifest["head_started"] or now,
+            "sealed_at": now,
+        }
+        self._write_manifest({
+            "next": number + 1,
+            "head_started": None,  # Starts again with the next completed todo
+            "segments": manifest["segments"] + [entry],
+        })
+        return entry
+
+    def drop(self, expired: list[dict]) -> None:
+        """Remove segments from the manifest, then delete their files (exclusive lock held)."""
+        if not expired:
+            return
+        numbers = {segment["segment"] for segment in expired}
+        manifest = self._read_manifest()
+        segments = [segment for segment in manifest["segments"] if segment["segment"] not in numbers]
+        self._write_manifest(dict(manifest, segments=segments))
+        # A crash here only leaves orphan files behind, which nothing reads
+        self._remove_segments(numbers)
+
+    def _write_segment(self, number: int, items: dict[str, Todo]) -> None:
+        if self._pending is not None:
+            self._pending["segments"][number] = items
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        data = "".join(format_line(todo) + "\n" for todo in items.values())
+        _atomic_write(self.segment_path(number), data.encode("utf-8"))
+
+    def _remove_segments(self, numbers) -> None:
+        if self._pending is not None:
+            self._pending["dropped"] |= set(numbers)
+            return
+        for number in numbers:
+            try:
+                os.remove(self.segment_path(number))
+            except FileNotFoundError:
+                pass
+            with self._cache_lock:
+                self._segments.pop(number, None)
@@ -0,0 +1,385 @@
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+import oplog
+import store as storage
+
+r"""
+Benchmark suite for the functions.py core API.
+
+For every backend and list size it starts a fresh process (so peak memory belongs to that run
+alone), fills a throwaway data folder with that many todos and then times the calls the front-ends
+make, with their printing sent to os.devnull:
+
+    load_todos        functions.load_todos() on the warm cache (text) / store.load_todos() (SQLite)
+    load_todos_cold   the same from a freshly opened store, i.e. reading the files or database
+    add, edit, complete, remove, clear_completed
+
+Each operation runs up to --repeat times, but stops early once it has used --budget seconds (with
+at least MIN_SAMPLES samples), so the 1M runs finish in minutes. Reported per operation: latency
+percentiles (p50/p90/p99/max, in ms), mean and throughput (ops/s); per run: seeding time and
+peak RSS. Results are written as JSON with sorted keys, so two runs can be diffed directly or
+compared with --compare, which exits 1 when an operation's median got slower than --threshold.
+
+    python bench.py                                   # text and sqlite at 1k, 100k and 1M todos
+    python bench.py --store text --sizes 1000,100000 --output before.json
+    python bench.py --sizes 1000,100000 --compare before.json
+
+--startup instead times what a one-off command costs end to end: `python todo.py add ...` in fresh
+processes against a throwaway home folder, next to a bare `python -c pass`, plus the slowest imports
+reported by `python -X importtime`. It exits 1 when the median is over --startup-budget (50 ms).
+"""
+
+SIZES = (1_000, 100_000, 1_000_000)
+BACKENDS = ("text", "sqlite")  # Opened in-process; "daemon" needs a running todod and only fronts one of these
+OPERATIONS = ("load_todos", "load_todos_cold", "add", "edit", "complete", "remove", "clear_completed")
+MIN_SAMPLES = 5  # Take at least this many samples even when an operation blows its time budget
+CLEAR_BATCH = 10  # Todos completed (untimed) before each timed clear_completed
+STARTUP_BUDGET_MS = 50.0  # `todo add "x"` should finish within this (median, including interpreter start)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Turn per-call durations (seconds) into the reported statistics."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "samples": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "ops_per_s": round(len(ordered) / total, 1) if total else None,
+    }
+
+
+def peak_rss_kb() -> int | None:
+    """Peak resident memory of this process in KiB (ru_maxrss is bytes on macOS, KiB elsewhere)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+# =========================
+# One benchmark run (in its own process)
+# =========================
+
+def _seed(store, size: int) -> float:
+    """Fill the store with size todos in one transaction; returns the seconds it took."""
+    start = time.perf_counter()
+    with store.transaction():
+        for i in range(size):
+            store.add(f"Seed Todo {i}.")
+    return time.perf_counter() - start
+
+
+def _bench_size(kind: str, size: int, repeat: int, budget: float, seed: int) -> dict:
+    """Seed a throwaway store with size todos and time every operation against it."""
+    import functions  # Imported here so the parent process never opens the user's data
+
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="todo_bench_") as directory:
+        store = storage.open_store(kind, directory)
+        seed_seconds = _seed(store, size)
+        todo_list = store.load_todos()
+        completed_list = store.load_completed()
+        counter = iter(range(10 ** 9))
+
+        def random_id() -> str:
+            return ids[rng.randrange(len(ids))]
+
+        def take_id() -> str:
+            # Swap with the last id and pop, so picking a todo to get rid of stays O(1) at 1M todos
+            position = rng.randrange(len(ids))
+            ids[position], ids[-1] = ids[-1], ids[position]
+            return ids.pop()
+
+        def load_warm():
+            if kind == "text":
+                functions.load_todos(store.todo_path)
+            else:
+                store.load_todos()
+
+        def load_cold():
+            if kind == "text":
+                oplog.OpLog(store.todo_path).items()  # New log object: nothing cached yet
+            else:
+                fresh = storage.open_store(kind, directory)
+                fresh.load_todos()
+                fresh.close()
+
+        def add():
+            functions.add(f"Bench Todo {next(counter)}", todo_list, store)
+
+        def edit():
+            functions.edit(random_id(), f"Edited Todo {next(counter)}", todo_list, completed_list, store)
+
+        def complete():
+            functions.complete(take_id(), todo_list, completed_list, store)
+
+        def remove():
+            functions.remove(take_id(), todo_list, store)
+
+        def clear_setup():
+            while len(ids) < CLEAR_BATCH:  # Small lists run out once the ops got fast; top up
+                ids.append(functions.add(f"Refill Todo {next(counter)}", todo_list, store).todo.id)
+            for _ in range(CLEAR_BATCH):
+                todo_id = take_id()
+                completed_list[todo_id] = store.complete(todo_id)
+                todo_list.pop(todo_id, None)
+
+        def clear():
+            functions.clear_completed(completed_list, store)
+
+        operations = {
+            "load_todos": (load_warm, None),
+            "load_todos_cold": (load_cold, None),
+            "add": (add, None),
+            "edit": (edit, None),
+            "complete": (complete, None),
+            "remove": (remove, None),
+            "clear_completed": (clear, clear_setup),
+        }
+
+        results = {}
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for name in OPERATIONS:
+                ids = list(todo_list)
+                body, setup = operations[name]
+                samples: list[float] = []
+                started = time.perf_counter()
+                while len(samples) < repeat and (len(samples) < MIN_SAMPLES
+                                                 or time.perf_counter() - started < budget):
+                    if setup is not None:
+                        setup()
+                    t0 = time.perf_counter()
+                    body()
+                    samples.append(time.perf_counter() - t0)
+                results[name] = summarize(samples)
+        store.close()
+
+    return {
+        "seed_s": round(seed_seconds, 3),
+        "seed_ops_per_s": round(size / seed_seconds, 1) if seed_seconds else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "ops": results,
+    }
+
+
+def _worker(kind: str, size: int, repeat: int, budget: float, seed: int, results) -> None:
+    """Body of one benchmark process."""
+    try:
+        results.put(_bench_size(kind, size, repeat, budget, seed))
+    except BaseException as e:  # Report instead of leaving the parent waiting forever
+        results.put({"error": f"{type(e).__name__}: {e}"})
+        raise
+
+
+# =========================
+# Startup time
+# =========================
+
+def _time_process(command: list[str], env: dict, runs: int) -> list[float]:
+    """Time runs fresh processes; "{n}" in an argument becomes the run number (e.g. distinct todo texts)."""
+    samples = []
+    for n in range(runs):
+        run_command = [part.replace("{n}", str(n)) for part in command]
+        t0 = time.perf_counter()
+        subprocess.run(run_command, env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _slowest_imports(command: list[str], env: dict, count: int = 10) -> dict[str, float]:
+    """Cumulative ms of the slowest top-level imports, from python -X importtime."""
+    output = subprocess.run([command[0], "-X", "importtime", *command[1:]], env=env,
+                            capture_output=True, text=True, check=True).stderr
+    imports = {}
+    for line in output.splitlines():
+        # "import time:   self [us] |   cumulative | package", nested imports are indented
+        parts = line.split("|")
+        if len(parts) == 3 and not parts[2].startswith("  ") and parts[1].strip().isdigit():
+            imports[parts[2].strip()] = int(parts[1]) / 1000
+    slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:count]
+    return {name: round(ms, 2) for name, ms in slowest}
+
+
+def bench_startup(runs: int = 20) -> dict:
+    """Time `python todo.py add ...` in fresh processes, against a throwaway home folder."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="todo_startup_") as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home)  # USERPROFILE: expanduser() on Windows
+        env.pop(storage.STORE_ENV_VAR, None)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)  # The warm-up run writes the .pyc files
+        # Every run adds a different todo: adding the same text again would be rejected as a duplicate
+        command = [sys.executable, os.path.join(here, "todo.py"), "add", "Startup check {n}"]
+        subprocess.run([*command[:-1], "Startup warm-up"], env=env, stdout=subprocess.DEVNULL, check=True)
+        return {
+            "todo_add": summarize(_time_process(command, env, runs)),
+            "python_baseline": summarize(_time_process([sys.executable, "-c", "pass"], env, runs)),
+            "slowest_imports_ms": _slowest_imports([*command[:-1], "Startup import check"], env),
+        }
+
+
+def print_startup(startup: dict) -> None:
+    """Print the startup timings and the slowest imports."""
+    print(f"  {'command':<24}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}")
+    for name, label in (("todo_add", "todo add ..."), ("python_baseline", "python -c pass")):
+        stats = startup[name]
+        print(f"  {label:<24}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print("\n  slowest imports (cumulative ms):")
+    for name, ms in startup["slowest_imports_ms"].items():
+        print(f"    {name:<28}{ms:>8.2f}")
+
+
+# =========================
+# Driver
+# =========================
+
+def git_commit() -> str | None:
+    """Short hash of the checked-out commit (with "+dirty" for local changes), if this is a git checkout."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+dirty" if dirty else "")
+
+
+def run(kinds, sizes, repeat: int = 200, budget: float = 10.0, seed: int = 0) -> dict:
+    """Run every backend x size in a fresh process and return the JSON-ready report."""
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "budget_s": budget,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    ctx = multiprocessing.get_context("spawn")
+    for kind in kinds:
+        for size in sizes:
+            print(f"⏱️  {kind} @ {size:,} todos ...", file=sys.stderr, flush=True)
+            results = ctx.Queue()
+            process = ctx.Process(target=_worker, args=(kind, size, repeat, budget, seed, results))
+            process.start()
+            outcome = results.get()
+            process.join()
+            report["results"].setdefault(kind, {})[str(size)] = outcome
+    return report
+
+
+def print_report(report: dict) -> None:
+    """Print the results as one table per backend and size."""
+    for kind, by_size in report["results"].items():
+        for size, outcome in by_size.items():
+            print(f"\n{kind} @ {int(size):,} todos", end="")
+            if "error" in outcome:
+                print(f": ❌ {outcome['error']}")
+                continue
+            rss = outcome["peak_rss_kb"]
+            print(f" (seeded in {outcome['seed_s']}s, peak RSS "
+                  f"{'n/a' if rss is None else f'{rss / 1024:.1f} MiB'})")
+            print(f"  {'operation':<16}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>11}{'n':>6}")
+            for name, stats in outcome["ops"].items():
+                print(f"  {name:<16}{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                      f"{stats['max_ms']:>10.3f}{stats['ops_per_s'] or 0:>11.1f}{stats['samples']:>6}")
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Return a line per operation whose median latency grew by more than threshold (0.25 = 25%)."""
+    regressions = []
+    for kind, by_size in new["results"].items():
+        for size, outcome in by_size.items():
+            before = old.get("results", {}).get(kind, {}).get(size, {})
+            for name, stats in outcome.get("ops", {}).items():
+                previous = before.get("ops", {}).get(name)
+                if not previous or not previous["p50_ms"]:
+                    continue
+                change = stats["p50_ms"] / previous["p50_ms"] - 1
+                if change > threshold:
+                    regressions.append(f"{kind} @ {int(size):,} {name}: p50 {previous['p50_ms']:.3f} ms -> "
+                                       f"{stats['p50_ms']:.3f} ms (+{change:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the functions.py core API at growing list sizes.")
+    parser.add_argument("--store", choices=BACKENDS + ("all",), default="all")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated list sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=200, help="samples per operation (default: %(default)s)")
+    parser.add_argument("--budget", type=float, default=10.0,
+                        help="seconds per operation before sampling stops early (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for picking todos (default: %(default)s)")
+    parser.add_argument("--output", default=None, help="JSON results file (default: bench-<commit>.json)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="flag operations slower than in this earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="with --compare: allowed median slowdown (default: %(default)s = 25%%)")
+    parser.add_argument("--startup", action="store_true",
+                        help="only time `todo.py add` startup in fresh processes (no JSON file)")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS,
+                        help="with --startup: allowed median in ms (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = bench_startup()
+        print_startup(startup)
+        median = startup["todo_add"]["p50_ms"]
+        if median > args.startup_budget:
+            print(f"\n⚠️ todo add takes {median:.1f} ms, over the {args.startup_budget:g} ms budget.")
+            sys.exit(1)
+        print(f"\n✅ todo add starts and finishes in {median:.1f} ms (budget {args.startup_budget:g} ms).")
+        sys.exit(0)
+
+    kinds = BACKENDS if args.store == "all" else (args.store,)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run(kinds, sizes, args.repeat, args.budget, args.seed)
+    print_report(report)
+
+    output = args.output or f"bench-{(report['meta']['commit'] or 'results').replace('+', '-')}.json"
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=1, sort_keys=True)
+        file.write("\n")
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"✅ No operation got more than {args.threshold:.0%} slower than in {args.compare}.")
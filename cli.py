@@ -1,23 +1,15 @@
-import datetime
+import archive
+import argparse
+import duplicates
 import functions
-import os
+import json
+import metrics
+import records
+import search
+import sys
+import store as storage
+import terminal
 
-# Use the user's home directory with a .todo_app subfolder
-APPDATA_DIR = os.path.join(os.path.expanduser("~"), ".todo_app")
-os.makedirs(APPDATA_DIR, exist_ok=True)  # Ensure the directory exists
-
-FILEPATH_TODO = os.path.join(APPDATA_DIR, "todo_list.txt")
-FILEPATH_COMPLETED_TODO = os.path.join(APPDATA_DIR, "completed_todo_list.txt")
-
-
-# Create file if it does not exist, empty
-if not os.path.isfile(FILEPATH_TODO):
-    with open(FILEPATH_TODO, 'w', encoding='utf-8'):
-        pass
-
-if not os.path.isfile(FILEPATH_COMPLETED_TODO):
-    with open(FILEPATH_COMPLETED_TODO, 'w', encoding='utf-8'):
-        pass
 
 # =========================
 #   Main Program Loop
@@ -25,16 +17,27 @@ if not os.path.isfile(FILEPATH_COMPLETED_TODO):
 
 '''
 IMPORTANT INFO TO REMEMBER:
-In memory(RAM): your todos are a Python list of strings.
-On disk(Storage): your todos are stored as plain text, one string per line.
+In memory(RAM): your todos are a Python dict of {id: Todo} records (id, text, created, completed), in the order they were added.
+On disk(Storage): your todos are stored as plain text, one "id<TAB>created<TAB>completed<TAB>text" line per todo.
 You convert between these using file reading/writing in your code.
 '''
-def main(filepath=FILEPATH_TODO, filepath2=FILEPATH_COMPLETED_TODO):
+def main(store=None):
     """
     Main loop: handles user input and calls the appropriate functions.
     """
-    todo_list = functions.load_todos(filepath)
-    completed_todo_list = functions.load_todos(filepath2)
+    store = store or functions.get_store()
+    todo_list = store.load_todos()
+    completed_todo_list = store.load_completed()
+
+    def apply(mutation, *args) -> bool:
+        """Run a functions mutation and show what it did (or why it failed); True on success."""
+        try:
+            change = mutation(*args)
+        except functions.TodoError as e:
+            terminal.show_error(e)
+            return False
+        terminal.report(change, todo_list, completed_todo_list)
+        return True
     
     # Load existing todos from files into Python lists at program startup
     # These lines are essential for converting file contents into Python lists
@@ -80,135 +83,135 @@ Enter command: """
         # Check for empty input
         if not user_action:
             print("⚠️  Please enter a valid option.\n")
-            functions.pause_terminal()
-            functions.clear_terminal()
+            terminal.pause_terminal()
+            terminal.clear_terminal()
             continue
 
         # Handle "add <todo_text>" format - user can type todo directly
         if user_action.startswith("add") and len(user_action) > 4:
             todo_item = user_action[4:]
-            functions.add(todo_item, todo_list)
-            print("\n✅ Your Todo Task Has Been Added Successfully!")
-            functions.pause_terminal()
-            functions.clear_terminal()
+            if apply(functions.add, todo_item, todo_list, store):
+                print("\n✅ Your Todo Task Has Been Added Successfully!")
+            terminal.pause_terminal()
+            terminal.clear_terminal()
 
         # Handle regular add command
         elif user_action in ADD_COMMANDS:
             user_input: str = input("Enter your Todo: ")
-            functions.add(user_input, todo_list)
-            print("\n✅ Your Todo Task Has Been Added Successfully!")
-            functions.pause_terminal()
-            functions.clear_terminal()
+            if apply(functions.add, user_input, todo_list, store):
+                print("\n✅ Your Todo Task Has Been Added Successfully!")
+            terminal.pause_terminal()
+            terminal.clear_terminal()
 
         elif user_action in REMOVE_COMMANDS:
-            selected_todo_to_remove = functions.prompt_for_todo_selection(todo_list)
+            selected_todo_to_remove = terminal.prompt_for_todo_selection(todo_list)
             if selected_todo_to_remove is not None:
-                functions.remove(selected_todo_to_remove, todo_list)  
-                functions.pause_terminal()
-                functions.clear_terminal()
+                apply(functions.remove, selected_todo_to_remove, todo_list, store)
+                terminal.pause_terminal()
+                terminal.clear_terminal()
 
         elif user_action.startswith("remove") and len(user_action) > 7:
             if not todo_list:
                 print("\n⚠️  Your Todo list is empty. Please add a Todo first.")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
             try:
                 remove_todo_index = int(user_action[7:])
                 if 0 < remove_todo_index <= len(todo_list):  # Check the original number
-                    functions.remove(remove_todo_index - 1, todo_list) # Then convert to 0-based
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    apply(functions.remove, functions.todo_id_at(todo_list, remove_todo_index), todo_list, store) # Then look up its id
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                 else:
                     print("\n⚠️  The value is out of range of the number of todos you have.")
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                     continue
             except ValueError as e:
                 print(f"\n⚠️  You have entered a string(todo) instead of an integer(todo number).\nError: {e}")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
 
 
         # Handle show/display command
         elif user_action in SHOW_COMMANDS:
-            functions.show(todo_list, completed_todo_list)
-            functions.pause_terminal()
-            functions.clear_terminal()
+            terminal.show(todo_list, completed_todo_list)
+            terminal.pause_terminal()
+            terminal.clear_terminal()
 
         # Handle edit command
         elif user_action in EDIT_COMMANDS:
-            selected_todo = functions.prompt_for_todo_selection(todo_list)
+            selected_todo = terminal.prompt_for_todo_selection(todo_list)
             if selected_todo is not None:
                 new_todo = input("Enter your new todo: ")
-                functions.edit(selected_todo, new_todo, todo_list, completed_todo_list)
-                functions.pause_terminal()
-                functions.clear_terminal()    
+                apply(functions.edit, selected_todo, new_todo, todo_list, completed_todo_list, store)
+                terminal.pause_terminal()
+                terminal.clear_terminal()    
 
         # Handle "edit <todo_number>" format - user can edit todo directly
         elif user_action.startswith("edit") and len(user_action) > 5:
             if not todo_list:
                 print("\n⚠️  Your Todo list is empty. Please add a Todo first.")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
             try:
                 new_todo_item = int(user_action[5:])
                 if 0 < new_todo_item <= len(todo_list):  # Check the original number
                     new_todo = input("Enter your new todo: ")
-                    functions.edit(new_todo_item - 1, new_todo, todo_list, completed_todo_list) # Then convert to 0-based
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    apply(functions.edit, functions.todo_id_at(todo_list, new_todo_item), new_todo, todo_list, completed_todo_list, store) # Then look up its id
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                 else:
                     print("\n⚠️  The value is out of range of the number of todos you have.")
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                     continue
             except ValueError as e:
                 print(f"\n⚠️  You have entered a string(todo) instead of an integer(todo number).\nError: {e}")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
 
         # Handle complete command
         elif user_action in COMPLETE_COMMANDS:
             
-            selected_todo = functions.prompt_for_todo_selection(todo_list)
+            selected_todo = terminal.prompt_for_todo_selection(todo_list)
             if selected_todo is not None:
-                functions.complete(selected_todo, todo_list, completed_todo_list)
-                functions.pause_terminal()
-                functions.clear_terminal()
+                apply(functions.complete, selected_todo, todo_list, completed_todo_list, store)
+                terminal.pause_terminal()
+                terminal.clear_terminal()
         
 	# Handle "complete <todo_number>" format - user can complete todo directly
         elif user_action.startswith("complete") and len(user_action) > 8:
             if not todo_list:
                 print("\n⚠️  Your Todo list is empty. Please add a Todo first.")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
             try:
                 new_todo_item = int(user_action[8:].strip())
                 if 0 < new_todo_item <= len(todo_list):  # Check the original number
-                    functions.complete(new_todo_item - 1, todo_list, completed_todo_list)  # Then convert to 0-based
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    apply(functions.complete, functions.todo_id_at(todo_list, new_todo_item), todo_list, completed_todo_list, store)  # Then look up its id
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                 else:
                     print("\n⚠️  The value is out of range of the number of todos you have.")
-                    functions.pause_terminal()
-                    functions.clear_terminal()
+                    terminal.pause_terminal()
+                    terminal.clear_terminal()
                     continue
             except ValueError as e:
                 print(f"\n⚠️  You have entered a string(Todo) instead of an integer(Todo number).\nError: {e}")
-                functions.pause_terminal()
-                functions.clear_terminal()
+                terminal.pause_terminal()
+                terminal.clear_terminal()
                 continue
 
         # Handle clear completed command
         elif user_action in CLEAR_COMMANDS:
-            functions.clear_completed(completed_todo_list)
-            functions.pause_terminal()
-            functions.clear_terminal()
+            apply(functions.clear_completed, completed_todo_list, store)
+            terminal.pause_terminal()
+            terminal.clear_terminal()
 
         # Handle exit command
         elif user_action in EXIT_COMMANDS:
@@ -218,13 +221,407 @@ Enter command: """
         # Handle invalid commands
         else:
             print("\n⚠️  Please enter a valid option.")
-            functions.pause_terminal()
-            functions.clear_terminal()
+            terminal.pause_terminal()
+            terminal.clear_terminal()
+
+# =========================
+#   Batch Mode
+# =========================
+
+BATCH_HELP = """\
+Read one command per line and apply them all as a single commit:
+
+  add <text>                 add a todo
+  remove <number|#id>        remove a todo
+  edit <number|#id> <text>   replace a todo's text
+  complete <number|#id>      mark a todo as completed
+  clear                      clear the completed todos
+
+Numbers are positions in the todo list as it stands at that line (1 = first). Adding a todo that
+is already active (or editing one into it) fails like an invalid todo. Blank lines and lines
+starting with '#' are ignored. One JSON object is printed per command, then a summary.
+"""
+
+
+def _batch_target(todo_list: dict, ref: str) -> str:
+    """Resolve a batch command's '<number>' or '#<id>' argument to a todo id."""
+    if ref.startswith("#"):
+        todo_id = ref[1:]
+    else:
+        try:
+            todo_id = functions.todo_id_at(todo_list, int(ref))
+        except ValueError:
+            raise ValueError(f"expected a todo number or #id, got {ref!r}") from None
+        if todo_id is None:
+            raise ValueError(f"todo number {ref} is out of range")
+    if todo_id not in todo_list:
+        raise ValueError(f"no todo with id {todo_id!r}")
+    return todo_id
+
+
+def read_batch(lines) -> list[tuple[int, str, str]]:
+    """Read every batch command up front as (line number, command, rest of the line)."""
+    commands = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        command, _, rest = line.partition(" ")
+        commands.append((line_no, command.lower(), rest))
+    return commands
+
+
+def run_batch(lines, store=None, out=sys.stdout) -> bool:
+    """
+    Apply batch commands (see BATCH_HELP) to the store in one transaction.
+
+    All input is read before the transaction starts, so a slow pipe never keeps the store locked
+    for the GUI, the web app or other commands. The commands are then checked and applied in memory
+    and the store commits once at the end, so there are no pauses, screen clears or per-command file
+    writes. Returns True when every command succeeded. A command that fails is reported and skipped;
+    if the final commit fails, nothing is saved.
+    """
+    store = store or functions.get_store()
+    commands = read_batch(lines)
+    applied = failed = 0
+    results = []
+
+    # Told of each line's change inside the transaction, so later lines see it (see indexes.py for
+    # why only the duplicate index may be; the others catch up from the store version)
+    duplicate_index = duplicates.DuplicateIndex.for_store(store)
+
+    try:
+        with store.transaction():
+            todo_list = store.load_todos()
+            for line_no, command, rest in commands:
+                result = {"line": line_no, "command": command}
+                try:
+                    if command == "add":
+                        text = functions.normalize_todo(rest)
+                        existing_id = duplicate_index.find(text)
+                        if existing_id is not None:
+                            raise functions.DuplicateTodo(existing_id)
+                        todo_id = store.add(text)
+                        todo_list[todo_id] = store.get(todo_id)
+                        duplicate_index.note_put("todo", todo_list[todo_id])
+                        result.update(id=todo_id, todo=todo_list[todo_id].render())
+                    elif command == "remove":
+                        todo_id = _batch_target(todo_list, rest.strip())
+                        store.delete(todo_id)
+                        del todo_list[todo_id]
+                        duplicate_index.note_delete(todo_id)
+                        result.update(id=todo_id)
+                    elif command == "edit":
+                        ref, _, text = rest.strip().partition(" ")
+                        todo_id = _batch_target(todo_list, ref)
+                        text = functions.normalize_todo(text)
+                        existing_id = duplicate_index.find(text, exclude_id=todo_id)
+                        if existing_id is not None:
+                            raise functions.DuplicateTodo(existing_id)
+                        todo_list[todo_id] = store.replace(todo_id, text)
+                        duplicate_index.note_put("todo", todo_list[todo_id])
+                        result.update(id=todo_id, todo=todo_list[todo_id].render())
+                    elif command == "complete":
+                        todo_id = _batch_target(todo_list, rest.strip())
+                        completed_todo = store.complete(todo_id)
+                        del todo_list[todo_id]
+                        duplicate_index.note_put("completed", completed_todo)
+                        result.update(id=todo_id)
+                    elif command == "clear":
+                        store.clear_completed()
+                    else:
+                        raise ValueError(f"unknown command {command!r}")
+                    result["ok"] = True
+                    applied += 1
+                except ValueError as e:
+                    result.update(ok=False, error=e.message if isinstance(e, functions.TodoError) else str(e))
+                    failed += 1
+                results.append(result)
+    except Exception as e:
+        out.write(json.dumps({"summary": {"committed": False, "error": str(e)}}) + "\n")
+        return False
+
+    # Everything is written in one go once the commit has succeeded
+    out.writelines(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+    summary = {"committed": True, "applied": applied, "failed": failed, "version": store.version()}
+    out.write(json.dumps({"summary": summary}) + "\n")
+    return failed == 0
+
 
 # =========================
 #   Entry Point
 # =========================
-if __name__ == "__main__":
+def parse_args(argv=None):
+    """Parse command line options: the storage backend and an optional subcommand."""
+    parser = argparse.ArgumentParser(description="Todo App - command line interface")
+    parser.add_argument(
+        "--store",
+        choices=storage.BACKENDS,
+        default=None,
+        help=f"storage backend to use (default: ${storage.STORE_ENV_VAR} or 'text')",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=storage.DURABILITY_MODES,
+        default=None,
+        help="'fsync' syncs every write to disk before returning, 'group' lets writes made within "
+             "a few ms share one background fsync (default: $TODO_DURABILITY or 'group')",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    add = commands.add_parser("add", help="add a todo without starting the interactive app")
+    add.add_argument("text", nargs="+", help="the todo, e.g. todo add buy milk")
+    add.add_argument("--allow-duplicate", action="store_true",
+                     help="add it even if the same todo is already on the active list")
+
+    batch = commands.add_parser(
+        "batch",
+        help="apply commands from a file or stdin in one commit",
+        description=BATCH_HELP,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    batch.add_argument("file", nargs="?", default="-", help="command file (default: stdin)")
+
+    import_ = commands.add_parser("import", help="bulk add todos from a JSONL or CSV file")
+    import_.add_argument("file", help="file to read ('-' for stdin)")
+    import_.add_argument("--format", choices=functions.EXPORT_FORMATS, default=None,
+                         help="file format (default: from the file extension, else jsonl)")
+
+    export = commands.add_parser("export", help="write all todos to a JSONL or CSV file")
+    export.add_argument("file", help="file to write ('-' for stdout)")
+    export.add_argument("--format", choices=functions.EXPORT_FORMATS, default=None,
+                        help="file format (default: from the file extension, else jsonl)")
+
+    search_cmd = commands.add_parser("search", help="find todos containing every word of a query")
+    search_cmd.add_argument("query", nargs="+", help="words to look for (prefixes match: 'mil' finds 'Milk')")
+    search_cmd.add_argument("--limit", type=int, default=50, help="show at most this many (default: %(default)s)")
+    search_cmd.add_argument("--active", action="store_true", help="only search the active todos")
+
+    for field, verb in (("created", "created"), ("completed", "completed")):
+        when_cmd = commands.add_parser(
+            field,
+            help=f"list todos {verb} in a date range",
+            description=f"List the todos {verb} in a date range. WHEN is a dd/mm/yyyy date, 'today', "
+                        f"'yesterday' or an age such as '7d', '2w' or '12h' (that long ago).",
+        )
+        when_cmd.add_argument("--since", metavar="WHEN", help=f"{verb} on or after WHEN")
+        when_cmd.add_argument("--until", metavar="WHEN", help=f"{verb} before WHEN (a date includes that day)")
+        when_cmd.add_argument("--limit", type=int, default=None, help="show at most this many")
+        when_cmd.add_argument("--newest", action="store_true", help="newest first")
+        if field == "created":
+            when_cmd.add_argument("--active", action="store_true", help="only the active todos")
+
+    dedupe = commands.add_parser("dedupe", help="list duplicate todos (one pass over active and completed)")
+    dedupe.add_argument("--remove", action="store_true",
+                        help="remove the active duplicates, keeping the first of each")
+
+    stats = commands.add_parser("stats", help="show timings and counters recorded by the CLI, GUI and web app")
+    stats.add_argument("--prometheus", metavar="FILE",
+                       help="write them in Prometheus text format to FILE ('-' for stdout) instead")
+    stats.add_argument("--reset", action="store_true", help="delete the recorded metrics")
+
+    history = commands.add_parser("history", help="list or show archived completed todos")
+    history.add_argument("segment", nargs="?", type=int, help="archive segment number to show")
+    history.add_argument("--prune", action="store_true",
+                         help="apply the retention policy (drop old segments) instead")
+    history.add_argument("--keep", type=int, default=archive.RETENTION_SEGMENTS,
+                         help="with --prune: segments to keep (default: %(default)s)")
+    history.add_argument("--days", type=float, default=archive.RETENTION_DAYS,
+                         help="with --prune: drop segments sealed more days ago (default: %(default)s)")
+
+    return parser.parse_args(argv)
+
+
+def run_command(args) -> int:
+    """Run a non-interactive subcommand and return the process exit code."""
+    if args.command == "add":
+        try:
+            # Nothing is loaded: add() only appends, so the list it updates can start out empty
+            change = functions.add(" ".join(args.text), {}, allow_duplicate=args.allow_duplicate)
+        except functions.TodoError as e:
+            terminal.show_error(e)
+            return 1
+        print(f"✅ Added: {change.todo}")
+        return 0
+
+    if args.command == "batch":
+        if args.file == "-":
+            return 0 if run_batch(sys.stdin) else 1
+        with open(args.file, encoding="utf-8") as file:
+            return 0 if run_batch(file) else 1
+
+    if args.command == "import":
+        fmt = args.format or functions.guess_format(args.file)
+        try:
+            if args.file == "-":
+                counts = functions.import_todos(functions.read_import_rows(sys.stdin, fmt))
+            else:
+                with open(args.file, encoding="utf-8", newline="") as file:
+                    counts = functions.import_todos(functions.read_import_rows(file, fmt))
+        except functions.InvalidImportFile as e:
+            # Batches before the bad spot are already saved; importing again skips them as duplicates
+            terminal.show_error(e)
+            return 1
+        print(f"✅ Imported {counts['imported']} todos ({counts['completed']} completed), "
+              f"skipped {counts['skipped']} invalid and {counts['duplicates']} already on the list.",
+              file=sys.stderr)
+        return 0
+
+    if args.command == "export":
+        fmt = args.format or functions.guess_format(args.file)
+        if args.file == "-":
+            count = functions.write_export(sys.stdout, fmt)
+        else:
+            count = functions.export_todos(args.file, fmt)
+        print(f"✅ Exported {count} todos.", file=sys.stderr)
+        return 0
+
+    if args.command == "history":
+        return show_history(args)
+
+    if args.command == "search":
+        return show_search(args)
+
+    if args.command in ("created", "completed"):
+        return show_between(args)
+
+    if args.command == "dedupe":
+        return show_duplicates(args)
+
+    if args.command == "stats":
+        return show_stats(args)
+    return 2
+
+
+def show_duplicates(args) -> int:
+    """Print the stored duplicates as they are found (and remove the active ones with --remove)."""
+    def report(list_name: str, todo, original_id: str) -> None:
+        print(f"#{todo.id} {todo.render()}{SEARCH_MARKERS[list_name]}  (same as #{original_id})")
+
+    counts = functions.dedupe(remove=args.remove, report=report)
+    found = counts["todo"] + counts["completed"] + counts["archived"]
+    if not found:
+        print("✅ No duplicate todos.")
+        return 0
+    print(f"\n{counts['todo']} active, {counts['completed'] + counts['archived']} completed duplicates.")
+    if args.remove:
+        print(f"✅ Removed {counts['removed']} active duplicates.")
+    elif counts["todo"]:
+        print("Run `python cli.py dedupe --remove` to remove the active ones.")
+    return 0
+
+
+SEARCH_MARKERS = {"todo": "", "completed": " --> Done", "archived": " --> Done (archived)"}
+
+
+def show_search(args) -> int:
+    """Print the todos matching a search query; exit code 1 when nothing matches."""
+    lists = ("todo",) if args.active else search.LISTS
+    hits = functions.search_todos(" ".join(args.query), limit=args.limit, lists=lists)
+    if not hits:
+        print("🔍 No todos match your search.")
+        return 1
+    for i, (list_name, _todo_id, todo) in enumerate(hits, 1):
+        print(f"{i}. {todo}{SEARCH_MARKERS[list_name]}")
+    return 0
+
+
+def show_between(args) -> int:
+    """Print the todos created or completed in a date range; exit code 1 when there are none."""
+    try:
+        start = functions.parse_when(args.since) if args.since else None
+        end = functions.parse_when(args.until, end=True) if args.until else None
+    except ValueError as e:
+        print(e)
+        return 2
+    lists = ("todo",) if getattr(args, "active", False) else search.LISTS
+    hits = functions.todos_between(args.command, start, end, lists=lists, limit=args.limit,
+                                   newest_first=args.newest)
+    if not hits:
+        print("📅 No todos in that date range.")
+        return 1
+    for i, (list_name, _todo_id, todo) in enumerate(hits, 1):
+        if list_name == "todo" or todo.completed is None:  # Todos completed before dates were kept
+            print(f"{i}. {todo}{SEARCH_MARKERS[list_name]}")
+        else:
+            archived = " (archived)" if list_name == "archived" else ""
+            print(f"{i}. {todo} --> Done on {records.format_date(todo.completed)}{archived}")
+    return 0
+
+
+def show_stats(args) -> int:
+    """Print the metrics saved by every front-end, write them for Prometheus, or reset them."""
+    if args.reset:
+        removed = metrics.reset(functions.METRICS_DIR)
+        print(f"✅ Deleted {removed} metrics files.")
+        return 0
+
+    snapshots = metrics.load_snapshots(functions.METRICS_DIR)
+    merged = metrics.merge(snapshots)
+    if args.prometheus == "-":
+        sys.stdout.write(metrics.to_prometheus(merged))
+        return 0
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus, merged)
+        print(f"✅ Metrics written to {args.prometheus}.")
+        return 0
+
+    if not snapshots:
+        print("📊 No metrics recorded yet. Use the CLI, GUI or web app first.")
+        return 1
+    counter_rows, summary_rows = metrics.rows(merged)
+    print(f"📊 Metrics from {', '.join(merged['processes'])}")
+
+    print(f"\n{'Counter':<32}{'total':>16}{'last minute':>14}")
+    for row in counter_rows:
+        print(f"{row['name']:<32}{row['total']:>16,.0f}{row['last_minute']:>14,.0f}")
+
+    print(f"\n{'Timing (ms) / value':<32}{'calls':>9}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}")
+    for row in summary_rows:
+        scale = 1000 if row["unit"] == "seconds" else 1  # Durations in ms, other values as they are
+        name = row["name"] if row["unit"] == "seconds" else f"{row['name']} ({row['unit'] or 'value'})"
+        print(f"{name:<32}{row['count']:>9}" + "".join(
+            f"{row[column] * scale:>11.3f}" for column in ("mean", "p50", "p90", "p99")))
+    return 0
+
+
+def show_history(args) -> int:
+    """List the archive segments, print one of them, or prune them."""
+    store = functions.get_store()
+    if args.prune:
+        dropped = store.apply_retention(args.keep, args.days)
+        print(f"✅ Dropped {dropped} archived todos.")
+        return 0
+
+    segments = store.archive_segments()
+    if args.segment is None:
+        if not segments:
+            print("🗄️ The archive is empty.")
+        for segment in reversed(segments):  # Newest first
+            print(functions.archive_label(segment))
+        return 0
+
+    if args.segment not in {segment["segment"] for segment in segments}:
+        print(f"⚠️ There is no archive segment #{args.segment}.")
+        return 1
+    for i, todo in enumerate(store.load_archive_segment(args.segment).values(), 1):
+        print(f"{i}. {todo} --> Done")
+    return 0
+
+
+def start(argv=None) -> int:
+    """Run the CLI with the given arguments (default: sys.argv) and return the exit code."""
+    args = parse_args(argv)
+    if args.durability:
+        storage.set_durability(args.durability)
+    functions.choose_store(args.store)  # Opened on first use, so e.g. stats never touches the data
+    if args.command != "stats":
+        metrics.autosave(functions.METRICS_DIR, "cli", shared=True)
+    if args.command:
+        return run_command(args)
+
+    import datetime  # Only the interactive app shows the date
+
     current_datetime = datetime.datetime.now()
     current_time_str = current_datetime.strftime("Date: %A, %B %d, %Y | Time: %H:%M |")
     print("=" * 84)
@@ -238,9 +635,14 @@ if __name__ == "__main__":
         print("\n\nDetected end of input (EOF).\n***Exiting Todo Program. Goodbye!***")
     except UnicodeDecodeError as e:
         print(f"The files are being edited with a non-UTF-8 editor\bError: {e}")
-        functions.pause_terminal()
-        functions.clear_terminal()
+        terminal.pause_terminal()
+        terminal.clear_terminal()
     except Exception as e:
         print(f"An error occurred: {e}")
-        functions.pause_terminal()
-        functions.clear_terminal()
+        terminal.pause_terminal()
+        terminal.clear_terminal()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(start())
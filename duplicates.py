@@ -0,0 +1,96 @@
+import indexes
+from records import Todo
+
+r"""
+Duplicate detection for active todos.
+
+DuplicateIndex keeps a hash of every active todo's normalized text ("Buy milk", "buy  milk!" and
+"BUY MILK." share the key "buy milk"), so add() and edit() can tell in O(1) whether the text is
+already on the list instead of comparing it with every todo.
+
+Like the search and time indexes it is built on first use and kept up to date as described in
+indexes.py; after a change made elsewhere the next lookup re-reads the active list once. Unlike
+them it is queried inside store transactions, because the check and the write must be one step.
+
+    duplicates.find(store, "buy milk")          # id of an active todo with that text, or None
+
+scan() finds the duplicates that are already stored, for the dedupe command: one pass over the
+active todos and then the completed history, one archive segment at a time.
+"""
+
+
+def key(text: str) -> str:
+    """The text two todos must share to count as duplicates: case, spacing and end punctuation ignored."""
+    return " ".join(text.casefold().split()).rstrip(".?!").rstrip()
+
+
+def history_key(text: str, created: int | None, completed: int | None) -> tuple:
+    """What two completed todos must share to be the same record (e.g. imported twice)."""
+    return key(text), created, completed
+
+
+class DuplicateIndex(indexes.StoreIndex):
+    """Normalized text -> ids of the active todos with that text, for one store."""
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._ids: dict[str, set[str]] = {}  # key -> ids (more than one if duplicates were stored earlier)
+        self._keys: dict[str, str] = {}  # id -> key, to remove a todo whose text is no longer known
+
+    def _put(self, list_name: str, todo: Todo) -> None:
+        self._delete(todo.id)
+        if list_name != "todo":
+            return  # Completed todos never count as duplicates
+        todo_key = key(todo.text)
+        self._ids.setdefault(todo_key, set()).add(todo.id)
+        self._keys[todo.id] = todo_key
+
+    def _delete(self, todo_id: str) -> None:
+        todo_key = self._keys.pop(todo_id, None)
+        if todo_key is not None:
+            ids = self._ids[todo_key]
+            ids.discard(todo_id)
+            if not ids:
+                del self._ids[todo_key]
+
+    def _catch_up(self, include_archive: bool) -> None:
+        self._ids, self._keys = {}, {}
+        for todo in self.store.load_todos().values():
+            self._put("todo", todo)
+
+    def find(self, text: str, exclude_id: str | None = None) -> str | None:
+        """Return the id of an active todo with the same normalized text (other than exclude_id), or None."""
+        with self._lock:
+            self._sync()
+            for todo_id in self._ids.get(key(text), ()):
+                if todo_id != exclude_id:
+                    return todo_id
+            return None
+
+
+def scan(store):
+    """
+    Yield (list name, todo, id of the todo it duplicates) for every stored duplicate, in one pass.
+
+    Active todos are duplicates when their text matches an earlier active todo. Completed todos
+    ("completed" or "archived") only when text, creation and completion time all match an earlier
+    one, e.g. after the same file was imported twice; doing the same task again later is not a duplicate.
+    Only the keys seen so far are kept in memory, not the todos.
+    """
+    seen: dict = {}
+    for todo in store.load_todos().values():
+        original = seen.setdefault(key(todo.text), todo.id)
+        if original != todo.id:
+            yield "todo", todo, original
+
+    seen.clear()
+    newest = store.load_completed()
+    for todo_id, todo in store.iter_completed_history():
+        original = seen.setdefault(history_key(todo.text, todo.created, todo.completed), todo_id)
+        if original != todo_id:
+            yield "completed" if todo_id in newest else "archived", todo, original
+
+
+def find(store, text: str, exclude_id: str | None = None) -> str | None:
+    """Id of an active todo in store with the same normalized text, or None; see DuplicateIndex.find."""
+    return DuplicateIndex.for_store(store).find(text, exclude_id)
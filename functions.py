@@ -1,268 +1,691 @@
+import json
 import os
 import time
+from itertools import islice
+
+import duplicates
+import indexes
+import metrics
+import oplog
+import records
+import search
+import store as storage
+import timeline
+from records import Todo
 
 r"""
-Below code creates a hidden folder named .todo_app inside the current user's home directory
-(e.g., C:\Users\Username on Windows or /home/username on Linux/macOS) to store application data files.
-It ensures the folder exists using os.makedirs with exist_ok=True, which avoids errors if the folder is already present.
-The two file paths defined within this folder (todo_list.txt and completed_todo_list.txt) are used to persist the user's to-do data
+Below code points at a hidden folder named .todo_app inside the current user's home directory
+(e.g., C:\Users\Username on Windows or /home/username on Linux/macOS) where the application data files live.
+Nothing is created when this module is imported: the folder and its files are made by the store the
+first time it is actually used, so commands that never touch the data (help, stats) start instantly.
+The files within this folder (todo_list.txt and completed_todo_list.txt) persist the user's to-do data
 safely and reliably across program runs, regardless of where the program or executable is launched from.
 """
 
 # Use the user's home directory with a .todo_app subfolder
 APPDATA_DIR = os.path.join(os.path.expanduser("~"), ".todo_app")
-os.makedirs(APPDATA_DIR, exist_ok=True)  # Ensure the directory exists
 
 FILEPATH_TODO = os.path.join(APPDATA_DIR, "todo_list.txt")
 FILEPATH_COMPLETED_TODO = os.path.join(APPDATA_DIR, "completed_todo_list.txt")
+METRICS_DIR = os.path.join(APPDATA_DIR, "metrics")  # Timings and counters saved by the front-ends
 
 # =========================
-# Todo App Functions
+# Storage Backend Selection
 # =========================
 
-MAX_TODO_LENGTH = 200  # Maximum length allowed for a todo item
+_active_store: storage.TodoStore | None = None
+_store_kind: str | None = None  # Backend get_store() opens; None means $TODO_STORE or "text"
 
 
-def load_todos(filepath): # This can be used to load both todo list and completed todo list
-    """Load todo items from a file, ignoring empty lines."""
-    with open(filepath, "r", encoding="utf-8") as file:
-        return [line.strip() for line in file if line.strip()]
+def get_store() -> storage.TodoStore:
+    """Return the store used by the functions below, opening the configured backend on first use."""
+    global _active_store
+    if _active_store is None:
+        _active_store = storage.open_store(_store_kind, APPDATA_DIR)
+    return _active_store
 
 
-def save_todos(filepath, todo_list):
-    """Save the list of todos to a file."""
-    with open(filepath, "w", encoding="utf-8") as file:
-        for todo in todo_list:
-            file.write(todo + '\n')
+def choose_store(kind: str | None = None) -> None:
+    """
+    Pick the backend ("text", "sqlite" or "daemon") get_store() opens, without opening it yet.
 
-def save_comp_todos(filepath2, completed_todo_list):
-    """Save the list of completed todos to a file."""
-    with open(filepath2, "w", encoding="utf-8") as file:
-        for todo in completed_todo_list:
-            file.write(todo + '\n')
+    The CLI calls this at startup so a command only pays for opening the store if it uses it.
+    """
+    global _active_store, _store_kind
+    if _active_store is not None:
+        _active_store.close()
+        _active_store = None
+    _store_kind = kind
 
 
-def add(user_input: str, todo_list: list, filepath=FILEPATH_TODO) -> None:
+def use_store(kind: str | None = None) -> storage.TodoStore:
     """
-    Add a new todo item to todo_list after validating and normalizing the input.
+    Switch every function in this module to the named backend ("text", "sqlite" or "daemon").
 
-    - Strips whitespace, collapses multiple spaces, capitalizes each word, and ensures punctuation.
-    - Ignores empty input.
+    Front-ends that need the store right away (the GUI) call this once at startup, e.g. from a --store option.
     """
-    user_input = user_input.title().strip()
-    user_input = " ".join(user_input.split())  # Remove extra spaces between words
+    choose_store(kind)
+    return get_store()
 
-    if not user_input.endswith((".", "?", "!")):
-        user_input += "."
 
-    # Check if input is empty after processing (was only whitespace)
-    if not user_input:
-        print("⚠️ You have not entered any Todo. Please enter one.")
-        pause_terminal()
-        clear_terminal()
-        return
+# =========================
+# Results and Errors
+# =========================
 
-    # Validate todo length doesn't exceed maximum allowed characters
-    if len(user_input) > MAX_TODO_LENGTH:
-        print(f"⚠️ Todo is too long! Please keep it under {MAX_TODO_LENGTH} characters.")
-        pause_terminal()
-        clear_terminal()
-        return
+MISSING_TODO_MESSAGE = "⚠️ That Todo no longer exists. It was probably changed from another window."
+
+
+class TodoError(Exception):
+    """Base class of the errors the todo functions raise; str() is the message to show the user."""
 
-    current_date = time.strftime("%d/%m/%Y")
-    todo_with_date = f"{user_input} (Created on: {current_date})"
+    @property
+    def message(self) -> str:
+        """The message without its leading warning sign, for plain output such as batch mode's JSON."""
+        return str(self).removeprefix("⚠️ ")
 
-    # Add to the passed list
-    todo_list.append(todo_with_date)
-    save_todos(filepath, todo_list)
 
-    print("\n***✅ Todo added successfully!***")
-    show_todo_list(todo_list)
+class InvalidTodo(TodoError, ValueError):
+    """The todo text is empty or too long."""
 
 
-def remove(index: int, todo_list: list, filepath=FILEPATH_TODO) -> None:
-    """Remove todo at specified index and update the file."""
-    todo_list.pop(index)
+class DuplicateTodo(TodoError, ValueError):
+    """The same todo (ignoring case, spacing and end punctuation) is already on the active list."""
 
-    # Update remaining todos in the file
-    with open(filepath, 'w', encoding='utf-8') as f:
-        for todos in todo_list:
-            f.write(f"{todos}\n")
+    def __init__(self, existing_id: str):
+        super().__init__("⚠️ That Todo is already on your list.")
+        self.existing_id = existing_id  # The active todo it duplicates
 
-    print("\n***✅ Todo removed successfully!***")
-    show_todo_list(todo_list)
 
+class InvalidImportFile(TodoError, ValueError):
+    """The file to import is not UTF-8 text, or not valid CSV."""
 
-def show(todo_list: list, completed_todo_list: list) -> None:
+
+class TodoNotFound(TodoError, LookupError):
+    """The todo is gone, usually because another window changed the list."""
+
+    def __init__(self, todo_id: str):
+        super().__init__(MISSING_TODO_MESSAGE)
+        self.todo_id = todo_id
+
+
+class Change:
     """
-    Display all current todos and completed todos.
+    What a mutation did, for the front-end to show.
 
-    - Todos are shown in the order they were added.
-    - Completed todos are shown with a '--> Done' marker.
+    action is "added", "removed", "edited", "completed" or "cleared", todo is the todo it touched
+    (None when clearing) and count how many todos it affected.
     """
-    print("\n" + "=" * 81)
 
-    # Show current todos
-    if not todo_list:  # Check for empty todo list
-        print("📝 Your Todo List:\n\n-> Your Todo list is empty. Add a Todo now and get back to work!")
-    else:
-        show_todo_list(todo_list)
+    __slots__ = ("action", "todo", "count")
 
-    # Show completed todos
-    if not completed_todo_list:  # Check if completed list is empty
-        print("\n✅ Your Completed Todo List:\n\n-> You have not completed any Todo Task.")
-    else:
-        show_completed_todo()
+    def __init__(self, action: str, todo: Todo | None = None, count: int = 1):
+        self.action = action
+        self.todo = todo
+        self.count = count
 
-    print("=" * 81)
+    def __repr__(self) -> str:
+        return f"Change({self.action!r}, {self.todo!r}, count={self.count})"
 
 
-def show_todo_list(todo_list, filepath=FILEPATH_TODO) -> None:
-    """Display the current todo list."""
-    if not todo_list:
-        print("\n📝 Your Todo List:\n\n-> Your Todo list is empty. Add a Todo now and get back to work!")
-    else:
-        print("\n📝 Your Todo List:\n")
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for i, todos in enumerate(f, 1):
-                print(f"{i}. {todos.strip()}")
+# =========================
+# Todo App Functions
+# =========================
+
+MAX_TODO_LENGTH = 200  # Maximum length allowed for a todo item
 
 
-def edit(index: int, new_todo: str, todo_list: list, completed_todo_list: list, filepath=FILEPATH_TODO) -> None:
+@metrics.timed
+def load_todos(filepath): # This can be used to load both todo list and completed todo list
     """
-    Edit an existing todo item at the given index (0-based).
-    
-    - Normalizes the new todo text.
-    - Updates the todo in place.
+    Load todo items from a file, ignoring empty lines (replays the file's operation log).
+
+    The parsed list is cached in memory and reused for as long as the file's mtime, size and
+    inode stay the same, so repeated loads of an unchanged file do not touch the disk.
+    Returns the display strings ("Text. (Created on: dd/mm/yyyy)"); load_records gives the records.
     """
-    new_todo = new_todo.strip().title()
-    new_todo = " ".join(new_todo.split())
+    return render_list(oplog.get_log(filepath).items())
 
-    # Validate todo length doesn't exceed maximum allowed characters
-    if len(new_todo.strip()) > MAX_TODO_LENGTH:
-        print(f"⚠️ Todo is too long! Please keep it under {MAX_TODO_LENGTH} characters.")
-        pause_terminal()
-        clear_terminal()
-        return
 
-    # Check if the new todo is not blank or only whitespace
-    if not new_todo:
-        print("⚠️ You have not entered any Todo. Please enter a Todo.")
-        pause_terminal()
-        clear_terminal()
-        return
+@metrics.timed
+def load_records(filepath) -> dict[str, Todo]:
+    """Load todo items from a file as an {id: Todo} dict, in file order (cached like load_todos)."""
+    return oplog.get_log(filepath).items()
 
-    # Add punctuation at the end if not present
-    if not new_todo.endswith((".", "?", "!")):
-        new_todo += "."
 
-    current_date = time.strftime("%d/%m/%Y")
-    new_todo_with_date = f"{new_todo} (Created on: {current_date})"
+@metrics.timed
+def render_list(todos: dict[str, Todo]) -> list[str]:
+    """Return the display strings of todos, in order (for listboxes and printing)."""
+    return [todo.render() for todo in todos.values()]
 
-    # Update todo in memory list
-    todo_list[index] = new_todo_with_date
 
-    # Update todos in the file
-    save_todos(filepath, todo_list)
+def load_cache_stats() -> dict[str, int]:
+    """
+    Return the load cache counters for this process: hits (served from memory), misses
+    (files re-read) and bytes_read. Useful to check that Streamlit reruns stop hitting the disk.
+    """
+    return oplog.cache_stats()
 
-    print("\n***✅ Todo updated successfully!***")
-    print("\n📝 Your New Todo List:\n")
 
-    for i, items in enumerate(todo_list, 1):
-        print(f"{i}. {items}")
+@metrics.timed
+def save_todos(filepath, todo_list):
+    """
+    Save the todos to a file (only the change is appended to the operation log).
+
+    todo_list may be a plain list of display strings or an {id: Todo} dict as returned by load_records.
+    """
+    oplog.get_log(filepath).save(todo_list)
 
-    if not completed_todo_list:
-        print("\n✅ Your Completed Todo List:\n\n-> You have not completed any Todo Task.")
-    else:
-        show_completed_todo()
+@metrics.timed
+def save_comp_todos(filepath2, completed_todo_list):
+    """Save the list of completed todos to a file."""
+    oplog.get_log(filepath2).save(completed_todo_list)
+
+
+def todo_id_at(todo_list: dict, number: int) -> str | None:
+    """Return the id of the todo shown as number (1-based) in todo_list, or None if out of range."""
+    if not 0 < number <= len(todo_list):
+        return None
+    return next(islice(todo_list, number - 1, None))
 
 
-def complete(index: int, todo_list: list, completed_todo_list: list, filepath2=FILEPATH_COMPLETED_TODO) -> None:
+@metrics.timed
+def normalize_todo(user_input: str) -> str:
     """
-    Mark a todo as completed by moving it from todo_list to completed_todo_list.
-    
-    Args:
-        index (int): 0-based index of todo item in todo_list.
+    Normalize todo text the way add() and edit() store it.
+
+    - Strips whitespace, collapses multiple spaces, capitalizes each word, and ensures punctuation.
+    - Raises InvalidTodo (with the message to show the user) if the text is empty or too long.
     """
-    # Remove item from todo_list
-    popped_todo = todo_list.pop(index)
+    todo = " ".join(user_input.title().split())  # Remove extra spaces between words
+
+    # Check if input is empty after processing (was only whitespace)
+    if not todo:
+        raise InvalidTodo("⚠️ You have not entered any Todo. Please enter one.")
+
+    if not todo.endswith((".", "?", "!")):
+        todo += "."
 
-    # Add to completed todos file (append mode)
-    with open(filepath2, 'a', encoding='utf-8') as f:
-        f.write(popped_todo + "\n")
+    # Validate todo length doesn't exceed maximum allowed characters
+    if len(todo) > MAX_TODO_LENGTH:
+        raise InvalidTodo(f"⚠️ Todo is too long! Please keep it under {MAX_TODO_LENGTH} characters.")
+
+    return todo
 
-    completed_todo_list.append(popped_todo)
 
-    # Update todos file to save remaining todos
-    save_todos(FILEPATH_TODO, todo_list)
+@metrics.timed
+def add(user_input: str, todo_list: dict, store: storage.TodoStore | None = None,
+        allow_duplicate: bool = False) -> Change:
+    """
+    Add a new todo item to todo_list after validating and normalizing the input.
 
-    print("\n🎉 Todo marked as completed!")
-    show_completed_todo()
+    - Strips whitespace, collapses multiple spaces, capitalizes each word, and ensures punctuation.
+    - Raises InvalidTodo for empty or too long input.
+    - Raises DuplicateTodo if the same todo is already active (an O(1) lookup), unless allow_duplicate.
+    """
+    todo = normalize_todo(user_input)
+    store = store or get_store()
+
+    # Stamp the creation time here, so the new record is known without reading it back
+    created = records.now()
+    # Check and insert under one exclusive lock, so a double submit cannot add the todo twice
+    with store.transaction():
+        if not allow_duplicate:
+            existing_id = duplicates.find(store, todo)
+            if existing_id is not None:
+                raise DuplicateTodo(existing_id)
+        todo_id = store.add(todo, created)
+    record = Todo(todo_id, todo, created)
+    todo_list[todo_id] = record
+    indexes.note_put(store, "todo", record)  # Keep the search, time and duplicate indexes current
+    return Change("added", record)
+
+
+@metrics.timed
+def remove(todo_id: str, todo_list: dict, store: storage.TodoStore | None = None) -> Change:
+    """Remove the todo with the given id and update the store. Raises TodoNotFound if it is gone."""
+    store = store or get_store()
+
+    # Remove the todo from storage first, it may already be gone if another window changed it
+    try:
+        removed = store.delete(todo_id)
+    except KeyError:
+        todo_list.pop(todo_id, None)
+        raise TodoNotFound(todo_id) from None
+    todo_list.pop(todo_id, None)
+    indexes.note_delete(store, todo_id)
+    return Change("removed", removed)
+
+
+@metrics.timed
+def edit(todo_id: str, new_todo: str, todo_list: dict, completed_todo_list: dict | None = None,
+         store: storage.TodoStore | None = None, allow_duplicate: bool = False) -> Change:
+    """
+    Edit the existing todo item with the given id.
+    
+    - Normalizes the new todo text (raises InvalidTodo if it is empty or too long).
+    - Updates the todo in place; it keeps its original creation date.
+    - Raises DuplicateTodo if another active todo already has that text, unless allow_duplicate.
+    - Raises TodoNotFound if the todo is gone. completed_todo_list is not needed any more and
+      only accepted so older callers keep working.
+    """
+    new_text = normalize_todo(new_todo)
+    store = store or get_store()
 
+    # Update the todo in storage, then in the memory dict (keeps its position)
+    try:
+        with store.transaction():  # The duplicate check and the write under one lock, as in add()
+            if not allow_duplicate:
+                existing_id = duplicates.find(store, new_text, exclude_id=todo_id)
+                if existing_id is not None:
+                    raise DuplicateTodo(existing_id)
+            record = store.replace(todo_id, new_text)
+    except KeyError:
+        todo_list.pop(todo_id, None)
+        raise TodoNotFound(todo_id) from None
+    todo_list[todo_id] = record
+    indexes.note_put(store, "todo", record)
+    return Change("edited", record)
+
+
+@metrics.timed
+def complete(todo_id: str, todo_list: dict, completed_todo_list: dict,
+             store: storage.TodoStore | None = None) -> Change:
+    """
+    Mark a todo as completed by moving it from todo_list to completed_todo_list.
+    
+    Args:
+        todo_id (str): id of the todo item in todo_list.
 
-def show_completed_todo(filepath2=FILEPATH_COMPLETED_TODO) -> None:
-    """Display all completed todos with completion markers."""
-    print("\n✅ Your Completed Todo List:\n")
-    # Read directly from file to display completed tasks
-    with open(filepath2, 'r', encoding='utf-8') as f:
-        for i, todos in enumerate(f, 1):
-            print(f"{i}. {todos.strip()} --> Done")
+    Raises TodoNotFound if the todo is gone.
+    """
+    store = store or get_store()
 
+    # Move the todo to the completed list in storage, then mirror it in memory
+    try:
+        completed_todo = store.complete(todo_id)
+    except KeyError:
+        todo_list.pop(todo_id, None)
+        raise TodoNotFound(todo_id) from None
+    todo_list.pop(todo_id, None)
+    completed_todo_list[todo_id] = completed_todo
+    indexes.note_put(store, "completed", completed_todo)
+    return Change("completed", completed_todo)
+
+
+@metrics.timed
+def complete_many(todo_ids, todo_list: dict, completed_todo_list: dict,
+                  store: storage.TodoStore | None = None) -> Change:
+    """
+    Complete several todos in one store transaction (one write, one version bump).
 
-def clear_completed(completed_todo_list: list, filepath2=FILEPATH_COMPLETED_TODO) -> None:
+    Ids that are already gone (completed or removed in another window) are skipped; the returned
+    Change counts the todos that were actually completed.
     """
-    Clear all completed todos from memory and file.
-    Keeps the completed_todo_list file from getting overfilled after long-term usage.
+    store = store or get_store()
+    completed = []
+
+    with store.transaction():
+        for todo_id in todo_ids:
+            if store.get(todo_id) is not None:  # Checked under the lock, so complete() cannot miss
+                completed.append(store.complete(todo_id))
+
+    for todo_id in todo_ids:
+        todo_list.pop(todo_id, None)
+    for completed_todo in completed:
+        completed_todo_list[completed_todo.id] = completed_todo
+        indexes.note_put(store, "completed", completed_todo)
+    return Change("completed", completed[-1] if completed else None, count=len(completed))
+
+
+@metrics.timed
+def remove_many(todo_ids, todo_list: dict, store: storage.TodoStore | None = None) -> Change:
+    """Remove several todos in one store transaction, skipping ids that are already gone."""
+    store = store or get_store()
+    removed = []
+
+    with store.transaction():
+        for todo_id in todo_ids:
+            if store.get(todo_id) is not None:
+                removed.append(store.delete(todo_id))
+
+    for todo_id in todo_ids:
+        todo_list.pop(todo_id, None)
+    for todo in removed:
+        indexes.note_delete(store, todo.id)
+    return Change("removed", removed[-1] if removed else None, count=len(removed))
+
+
+@metrics.timed
+def clear_completed(completed_todo_list: dict, store: storage.TodoStore | None = None) -> Change:
     """
+    Clear the completed todos from view by moving them into the archive.
+    Keeps the completed_todo_list file small; old archive segments are dropped by the retention policy.
+    """
+    cleared = len(completed_todo_list)
+
     # Clear the in-memory list
     completed_todo_list.clear()
 
-    # Clear the file contents (Method 2 preferred)
-    with open(filepath2, "w", encoding="utf-8"):
-        pass
+    # Seal the stored list into the archive
+    (store or get_store()).clear_completed()
+    return Change("cleared", count=cleared)
+
+
+@metrics.timed
+def completed_total(completed_todo_list: dict, store: storage.TodoStore | None = None) -> int:
+    """Count completed todos including the archive, without reading any archived segment."""
+    archived = (store or get_store()).archive_segments()
+    return len(completed_todo_list) + sum(segment["count"] for segment in archived)
+
+
+def archive_label(segment: dict) -> str:
+    """Describe an archive segment for pickers and listings, e.g. "#3 · 1000 todos · 01/02/2026 - 03/03/2026"."""
+    started = records.format_date(segment["started_at"])
+    sealed = records.format_date(segment["sealed_at"])
+    return f"#{segment['segment']} · {segment['count']} todos · {started} - {sealed}"
+
+
+# =========================
+# Bulk Import / Export
+# =========================
+
+EXPORT_FORMATS = ("jsonl", "csv")
+IMPORT_BATCH_SIZE = 500  # Todos written per transaction while importing
+CSV_FIELDS = ("list", "id", "text", "created", "completed")  # Times are epoch seconds
+MAX_EPOCH = 253402300799  # 31/12/9999, the last date format_date() can show
+
 
-    print("✅ All completed todos have been cleared.")
+def guess_format(path: str, default: str = "jsonl") -> str:
+    """Pick "csv" or "jsonl" from a file name's extension."""
+    return "csv" if path.lower().endswith(".csv") else default
 
 
-def prompt_for_todo_selection(todo_list: list) -> None | int:
+def read_import_rows(lines, fmt: str = "jsonl"):
     """
-    Prompt user to select a todo item.
+    Turn lines of a JSONL or CSV file into {"text", "list", "created", "completed"} rows.
 
-    Returns 0-based index of selected todo or None if invalid.
+    This is a generator: rows come out as lines are read, so a file of any size is never held in
+    memory. JSONL lines may be objects (as written by export) or bare JSON strings. CSV files may
+    have a header with a "text" column (and optionally the other CSV_FIELDS); otherwise the first
+    column is used. A file that can't be read that way raises InvalidImportFile; invalid rows in a
+    readable file come out as rows import_todos() skips.
     """
-    if not todo_list:
-        print("\n⚠️ Your Todo list is empty. Please add a Todo first.")
-        pause_terminal()
-        clear_terminal()
-        return None
+    try:
+        yield from _read_rows(lines, fmt)
+    except UnicodeDecodeError as e:
+        raise InvalidImportFile(f"⚠️ The file is not UTF-8 text ({e.reason} at byte {e.start}).") from None
+
+
+def _read_rows(lines, fmt: str):
+    if fmt == "csv":
+        import csv  # Only import/export need it; keep it out of every startup
+        reader = csv.reader(lines)
+        try:
+            header = next(reader, None)
+            if header is None:
+                return
+            if "text" in header:
+                columns = {name: header.index(name) for name in CSV_FIELDS if name in header}
+            else:
+                columns = {"text": 0}
+                if header:  # No header: the first line is already a todo
+                    yield {"text": header[0]}
+            for row in reader:
+                if not row:
+                    continue
+                yield {name: row[at] for name, at in columns.items() if at < len(row) and row[at] != ""}
+        except csv.Error as e:
+            raise InvalidImportFile(f"⚠️ The file is not valid CSV (line {reader.line_num}: {e}).") from None
+    elif fmt == "jsonl":
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except (json.JSONDecodeError, RecursionError):
+                yield {"text": None, "error": "not valid JSON"}
+                continue
+            if isinstance(row, str):
+                row = {"text": row}
+            elif not isinstance(row, dict):
+                row = {"text": None}
+            yield row
+    else:
+        raise ValueError(f"Unknown import format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)}).")
 
-    show_todo_list(todo_list)
 
-    try:
-        prompt_text = "\nEnter the number of the Todo: "
-        index_for_todo = int(input(prompt_text))
-        if 0 < index_for_todo <= len(todo_list):
-            return index_for_todo - 1  # 0-based index
-        else:
-            print("\n⚠️ The value is out of range of the number of todos you have.")
-            return None
-    except ValueError as e:
-        print(f"\n⚠️ You have entered an invalid value. Please enter an integer.\nError: {e}")
-        pause_terminal()
-        clear_terminal()
-        return None
-    except IndexError as I:
-        print(f"\n⚠️ Index entered is out of range.\nError: {I}")
-        pause_terminal()
-        clear_terminal()
+def _epoch_field(row: dict, name: str) -> int | None:
+    value = row.get(name)
+    if value is None or value == "":
         return None
+    try:
+        epoch = int(float(value))
+    except (TypeError, ValueError, OverflowError):  # OverflowError: 1e999 is read as infinity
+        raise ValueError(f"{name} must be epoch seconds") from None
+    if not 0 <= epoch <= MAX_EPOCH:
+        raise ValueError(f"{name} is out of range")
+    return epoch
+
+
+def _prepare_import(row) -> tuple[str, int | None, int | None]:
+    """
+    Validate and normalize one imported todo the same way add() does.
+
+    Returns (text, created, completed). Dates come from the row's created/completed fields or,
+    for text in the old display format, from its "(Created on: ...)" marker.
+    """
+    row = row if isinstance(row, dict) else {"text": row}
+    text = row.get("text")
+    if not isinstance(text, str):
+        raise ValueError(row.get("error", "missing todo text"))
+
+    parsed = Todo.parse("", text)  # Splits off an old "(Created on: ...)" marker, if any
+    created = _epoch_field(row, "created")
+    return normalize_todo(parsed.text), parsed.created if created is None else created, \
+        _epoch_field(row, "completed")
+
+
+@metrics.timed
+def import_todos(rows, store: storage.TodoStore | None = None,
+                 batch_size: int = IMPORT_BATCH_SIZE) -> dict[str, int]:
+    """
+    Add many todos at once from an iterable of texts or rows from read_import_rows().
+
+    Each todo goes through the same normalization and MAX_TODO_LENGTH check as add(); invalid ones
+    are skipped, and so are todos that are already stored (e.g. when the same file is imported
+    twice): active ones with the same text as an active todo, completed ones with the same text,
+    creation and completion time as one in the completed history. Rows with "list": "completed"
+    go to the completed list. Rows are consumed lazily and written batch_size at a time, one
+    transaction per batch, so memory stays flat however long the input is. Returns counts of
+    imported, completed, skipped and duplicate todos.
+    """
+    store = store or get_store()
+    counts = {"imported": 0, "completed": 0, "skipped": 0, "duplicates": 0}
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        # Completed rows are checked against the history before the transaction: the time index
+        # reads the store under its own lock, so it must not be queried inside one (see indexes.py)
+        batch = []  # (completed?, text, created, completed time) of the rows still to write
+        batch_history = set()  # history_key of the completed rows in this batch
+        for row in chunk:
+            try:
+                text, created, completed = _prepare_import(row)
+            except ValueError:
+                counts["skipped"] += 1
+                continue
+            to_completed = isinstance(row, dict) and row.get("list") == "completed"
+            if to_completed:
+                completed_key = duplicates.history_key(text, created, completed)
+                if completed_key in batch_history or _in_history(store, completed_key):
+                    counts["duplicates"] += 1
+                    continue
+                batch_history.add(completed_key)
+            batch.append((to_completed, text, created, completed))
+
+        written = []  # (list, Todo) of this batch, told to the indexes once it is committed
+        batch_keys = set()  # Active texts added in this batch, which the duplicate index learns of only then
+        with store.transaction():
+            for to_completed, text, created, completed in batch:
+                if to_completed:
+                    written.append(("completed", store.complete(store.add(text, created), completed)))
+                    counts["completed"] += 1
+                elif duplicates.key(text) in batch_keys or duplicates.find(store, text) is not None:
+                    counts["duplicates"] += 1
+                    continue
+                else:
+                    batch_keys.add(duplicates.key(text))
+                    written.append(("todo", Todo(store.add(text, created), text, created)))
+                counts["imported"] += 1
+        for list_name, todo in written:
+            indexes.note_put(store, list_name, todo)
+    return counts
+
+
+def _in_history(store: storage.TodoStore, completed_key: tuple) -> bool:
+    """Whether a completed todo with this history_key is stored, looking only at those completed that second."""
+    _text_key, _created, completed = completed_key
+    if completed is None:
+        return False  # Completing it stamps the current time, so it can't match a stored todo
+    candidates = timeline.between(store, "completed", completed, completed + 1, lists=("completed", "archived"))
+    return any(duplicates.history_key(todo.text, todo.created, todo.completed) == completed_key
+               for _list_name, _todo_id, todo in candidates)
+
+
+def iter_export_rows(store: storage.TodoStore | None = None):
+    """Yield a CSV_FIELDS row for every todo, then every completed todo (archive included)."""
+    store = store or get_store()
+    for todo in store.load_todos().values():
+        yield {"list": "todo", "id": todo.id, "text": todo.text,
+               "created": todo.created, "completed": todo.completed}
+    # Archived segments are read one at a time as the export reaches them
+    for _todo_id, todo in store.iter_completed_history():
+        yield {"list": "completed", "id": todo.id, "text": todo.text,
+               "created": todo.created, "completed": todo.completed}
+
+
+@metrics.timed
+def write_export(out, fmt: str = "jsonl", store: storage.TodoStore | None = None) -> int:
+    """Write every todo to an open text file in JSONL or CSV format. Returns the number of rows."""
+    rows = iter_export_rows(store)
+    count = 0
+    if fmt == "csv":
+        import csv
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    elif fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)}).")
+    return count
+
+
+@metrics.timed
+def export_todos(path: str, fmt: str | None = None, store: storage.TodoStore | None = None) -> int:
+    """Export every todo (active and completed) to path. Returns the number of rows written."""
+    fmt = fmt or guess_format(path)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        return write_export(out, fmt, store)
+
+
+@metrics.timed
+def search_todos(query: str, store: storage.TodoStore | None = None, limit: int | None = None,
+                 lists: tuple[str, ...] = search.LISTS) -> list[tuple[str, str, Todo]]:
+    """
+    Find todos containing every word of query (each word may be the start of a longer one).
+
+    Returns (list, id, Todo) tuples, where list is "todo", "completed" or "archived".
+    """
+    return search.search(query, store or get_store(), limit, lists)
+
+
+# =========================
+# Time-Range Queries
+# =========================
+
+AGE_UNITS = {"h": 3600, "d": 24 * 3600, "w": 7 * 24 * 3600}  # "12h", "7d", "2w" ago
+
+
+def parse_when(value: str, end: bool = False, now: float | None = None) -> int:
+    """
+    Turn a date typed by the user into epoch seconds.
+
+    Accepts a dd/mm/yyyy date, "today", "yesterday", or an age such as "12h", "7d" or "2w" (that long
+    before now). A calendar day means its midnight, or with end=True the midnight after it, so a
+    range ending on that day still includes it.
+    """
+    text = value.strip().lower()
+    now = time.time() if now is None else now
+    if text[:-1].isdigit() and text[-1:] in AGE_UNITS:
+        return int(now - int(text[:-1]) * AGE_UNITS[text[-1]])
+
+    if text in ("today", "yesterday"):
+        day = time.localtime(now)
+        offset = -1 if text == "yesterday" else 0
+    else:
+        try:
+            day = time.strptime(text, records.DATE_FORMAT)
+        except ValueError:
+            raise ValueError(f"⚠️ Unrecognised date '{value}'. Use dd/mm/yyyy, 'today', 'yesterday' "
+                             f"or an age like '7d'.") from None
+        offset = 0
+    # mktime normalises the day number, which also keeps midnight right across DST changes
+    return int(time.mktime((day.tm_year, day.tm_mon, day.tm_mday + offset + (1 if end else 0),
+                            0, 0, 0, 0, 0, -1)))
+
+
+@metrics.timed
+def todos_between(field: str, start: int | None = None, end: int | None = None,
+                  store: storage.TodoStore | None = None, lists: tuple[str, ...] = timeline.LISTS,
+                  limit: int | None = None, newest_first: bool = False) -> list[tuple[str, str, Todo]]:
+    """
+    Find todos created (field="created") or completed (field="completed") from start up to end.
+
+    Returns (list, id, Todo) tuples ordered by that time; see timeline.TimeIndex.between.
+    """
+    return timeline.between(store or get_store(), field, start, end, lists, limit, newest_first)
 
 
-def clear_terminal() -> None:
-    """Clear the terminal screen (Windows and Unix compatible)."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+# =========================
+# Duplicates
+# =========================
+
+def find_duplicates(store: storage.TodoStore | None = None):
+    """
+    Yield (list, Todo, id of the todo it duplicates) for the duplicates already stored, in one
+    streaming pass over the active todos and the completed history; see duplicates.scan.
+    """
+    return duplicates.scan(store or get_store())
+
 
+@metrics.timed
+def dedupe(store: storage.TodoStore | None = None, remove: bool = False, report=None) -> dict[str, int]:
+    """
+    Count the stored duplicates per list ("todo", "completed", "archived"), calling report(list,
+    todo, original_id) for each one as it is found.
 
-def pause_terminal() -> None:
-    """Pause the terminal screen and wait for user input."""
-    input("\nPress Enter to continue...")
+    With remove=True the active duplicates are removed (the first of each is kept) in one
+    transaction. Completed and archived duplicates are only reported: they are history, and the
+    archive segments are never rewritten.
+    """
+    store = store or get_store()
+    counts = {"todo": 0, "completed": 0, "archived": 0, "removed": 0}
+    active_duplicates = []
+    for list_name, todo, original_id in find_duplicates(store):
+        counts[list_name] += 1
+        if list_name == "todo":
+            active_duplicates.append(todo.id)
+        if report is not None:
+            report(list_name, todo, original_id)
+    if remove and active_duplicates:
+        counts["removed"] = remove_many(active_duplicates, {}, store).count
+    return counts
@@ -1,7 +1,12 @@
+import argparse
 import functions
+import metrics
 import os
 import FreeSimpleGUI as sg
+import store as storage
 from datetime import datetime
+from watcher import FileWatcher
+from worker import IOWorker
 
 # To rebuild your To-Do app executable with PyInstaller, you should use the following command:
 # -> pyinstaller --onefile --windowed --clean gui.py
@@ -11,43 +16,13 @@ from datetime import datetime
 # --clean: Cleans the PyInstaller cache and removes temporary files before building (a good practice after changing source code, especially file paths).
 
 # ============================
-# File Paths for Data Persistence
-# ============================
-
-r"""
-This code creates a hidden folder named .todo_app inside the current user's home directory
-(e.g., C:\Users\Username on Windows or /home/username on Linux/macOS) to store application data files.
-It ensures the folder exists using os.makedirs with exist_ok=True, which avoids errors if the folder is already present.
-The two file paths defined within this folder (todo_list.txt and completed_todo_list.txt) are used to persist the user's to-do data
-safely and reliably across program runs, regardless of where the program or executable is launched from.
-"""
-
-# Use the user's home directory with a .todo_app subfolder
-APPDATA_DIR = os.path.join(os.path.expanduser("~"), ".todo_app")
-os.makedirs(APPDATA_DIR, exist_ok=True)  # Ensure the directory exists
-
-FILEPATH_TODO = os.path.join(APPDATA_DIR, "todo_list.txt")
-FILEPATH_COMPLETED_TODO = os.path.join(APPDATA_DIR, "completed_todo_list.txt")
-
-# Create file if it does not exist (empty)
-if not os.path.isfile(FILEPATH_TODO):
-    with open(FILEPATH_TODO, 'w', encoding='utf-8'):
-        pass
-if not os.path.isfile(FILEPATH_COMPLETED_TODO):
-    with open(FILEPATH_COMPLETED_TODO, 'w', encoding='utf-8'):
-        pass
-
-
-# ============================
-# Function to Create New Window Each Time (for Theme Switching)
+# Function to Create the Window (once; themes are switched in place, see apply_theme)
 # ============================
 
 
 def create_window(current_theme='DarkGrey15'):
     """
-    Set the global theme and create a new GUI window with fresh elements.
-    This supports dynamic switching between themes by closing the old window
-    and creating a new one with the selected theme applied.
+    Set the global theme and create the GUI window.
 
     Args:
         current_theme (str): The theme name to apply before window creation.
@@ -59,14 +34,17 @@ def create_window(current_theme='DarkGrey15'):
 
     # GUI Elements Creation
     clock = sg.Text('', key='clock')
+    status = sg.Text('', key='status', font=("helvetica", 10))  # "⏳ Working..." while the worker is busy
     label = sg.Text("Type in a To-Do: ", font=("helvetica", 11))
     dark_theme_button = sg.Button("Dark Theme", key="dark_theme")
     light_theme_button = sg.Button("Light Theme", key="light_theme")
     input_box = sg.InputText(tooltip="Enter To-Do", key='todo', font=("helvetica", 14))  # type: ignore
     add_button = sg.Button('Add', size=8, mouseover_colors=('white', 'black'))
     input_box_todo_list = sg.Text("Your To-Do List: ", font=("helvetica", 11))
+    filter_box = sg.InputText(key='filter', enable_events=True, size=25,
+                              tooltip="Show only todos containing these words")  # type: ignore
     list_box = sg.Listbox(
-        values=todo_list,
+        values=functions.render_list(todo_list),
         key='todos',
         enable_events=True,
         size=[70, 9],
@@ -75,7 +53,7 @@ def create_window(current_theme='DarkGrey15'):
     edit_button = sg.Button('Edit', size=8, mouseover_colors=('white', 'black'))
     input_box_comp_todo_list = sg.Text("Your Completed To-Do List: ", font=("helvetica", 11))
     list_box_for_completed_todo = sg.Listbox(
-        values=completed_todo_list,
+        values=functions.render_list(completed_todo_list),
         key='comp_todos',
         enable_events=True,
         size=[70, 9],
@@ -84,19 +62,20 @@ def create_window(current_theme='DarkGrey15'):
     complete_button = sg.Button('Complete', size=8, mouseover_colors=('white', 'black'))
     remove_button = sg.Button('Remove', size=8, mouseover_colors=('white', 'black'))
     clear_completed_todos = sg.Button('Clear Completed Todos', size=20, mouseover_colors=('white', 'black'))
+    history_button = sg.Button('History', size=8, mouseover_colors=('white', 'black'))
     exit_button = sg.Button('Exit', size=8, mouseover_colors=('white', 'black'))
 
     # Layout arrangement, with sg.Push() to push buttons right in first row
     layout = [
-        [clock, sg.Push(), dark_theme_button, light_theme_button],
+        [clock, sg.Push(), status, sg.Push(), dark_theme_button, light_theme_button],
         [label],
         [input_box],
         [add_button, remove_button],
-        [input_box_todo_list],
+        [input_box_todo_list, sg.Push(), sg.Text("🔍 Filter:"), filter_box],
         [list_box, edit_button],
         [input_box_comp_todo_list],
         [list_box_for_completed_todo],
-        [complete_button, clear_completed_todos, sg.Push(), exit_button]
+        [complete_button, clear_completed_todos, history_button, sg.Push(), exit_button]
     ]
 
     # finalize=True lets GUI be fully created and elements accessible immediately
@@ -104,18 +83,174 @@ def create_window(current_theme='DarkGrey15'):
     return sg.Window("My To-Do App", layout, font=("helvetica", 10), finalize=True)
 
 
+def apply_theme(window, theme):
+    """
+    Recolour the open window with another theme, instead of closing it and building a new one.
+
+    sg.theme() only affects elements created afterwards, so the theme's colours are pushed into
+    the existing tkinter widgets directly. The lists, the selection and the input text stay as they are.
+    """
+    sg.theme(theme)
+    background, text = sg.theme_background_color(), sg.theme_text_color()
+    input_background, input_text = sg.theme_input_background_color(), sg.theme_input_text_color()
+    button_color = sg.theme_button_color()
+
+    window.TKroot.configure(background=background)
+    for element in window.element_list():
+        row_frame = getattr(element, 'ParentRowFrame', None)
+        if row_frame is not None:
+            row_frame.configure(background=background)  # The frame holding each layout row
+        if isinstance(element, sg.Button):
+            element.update(button_color=button_color)
+        elif isinstance(element, (sg.InputText, sg.Listbox)):
+            element.Widget.configure(background=input_background, foreground=input_text)
+            if isinstance(element, sg.InputText):
+                element.Widget.configure(insertbackground=input_text)  # The text cursor
+        elif isinstance(element, sg.Text):
+            element.update(background_color=background, text_color=text)
+
+
+def update_listbox(element, items):
+    """
+    Show items, a list of (id, Todo), in a Listbox, redrawing only the rows that changed.
+
+    The new items are compared with the ones on screen from both ends, so adding, removing,
+    completing or editing one todo deletes/inserts that one row instead of replacing all of them.
+    Tk keeps the selection of the rows it did not touch; a selected row that was redrawn (an
+    edit) is selected again by its id.
+    """
+    shown = shown_items[element.Key]
+    start = 0
+    limit = min(len(shown), len(items))
+    while start < limit and shown[start] == items[start]:
+        start += 1
+    end_shown, end_new = len(shown), len(items)
+    while end_shown > start and end_new > start and shown[end_shown - 1] == items[end_new - 1]:
+        end_shown -= 1
+        end_new -= 1
+    if start == end_shown == end_new:
+        return  # Nothing changed
+
+    widget = element.Widget  # The tkinter Listbox
+    selected = {shown[index][0] for index in widget.curselection() if start <= index < end_shown}
+    rows = [todo.render() for _todo_id, todo in items[start:end_new]]
+    if end_shown > start:
+        widget.delete(start, end_shown - 1)
+    if rows:
+        widget.insert(start, *rows)
+    element.Values[start:end_shown] = rows  # FreeSimpleGUI answers get() from this list
+    shown_items[element.Key] = items
+    for index in range(start, end_new):
+        if items[index][0] in selected:
+            widget.selection_set(index)
+
+
+def show_completed(window):
+    """Refresh the completed todos listbox."""
+    update_listbox(window['comp_todos'], list(completed_todo_list.items()))
+
+
+def show_history_window():
+    """
+    Browse the archived completed todos, one segment at a time.
+
+    Only the manifest is read when the window opens; a segment is read when it is picked, on the
+    I/O worker, so a big segment does not freeze the window.
+    """
+    segments = list(reversed(store.archive_segments()))  # Newest first
+    if not segments:
+        sg.popup("There are no archived todos yet.", font=("helvetica", 10), title="History")
+        return
+    labels = {functions.archive_label(segment): segment["segment"] for segment in segments}
+
+    layout = [
+        [sg.Text("Archive segment: "), sg.Combo(list(labels), key='segment', enable_events=True, readonly=True)],
+        [sg.Listbox(values=[], key='archived', size=[70, 15], font=("helvetica", 11))],
+        [sg.Push(), sg.Button('Close')],
+    ]
+    history = sg.Window("Completed Todo History", layout, font=("helvetica", 10), modal=True, finalize=True)
+    while True:
+        event, values = history.read()  # type: ignore
+        if event in (sg.WIN_CLOSED, 'Close'):
+            break
+        if event == 'segment':
+            history['archived'].update(values=["⏳ Loading..."])  # type: ignore
+            io_worker.submit("segment", store.load_archive_segment, labels[values['segment']],
+                             notify=lambda job: history.write_event_value(SEGMENT_LOADED, job))
+        if event == SEGMENT_LOADED:
+            job = values[SEGMENT_LOADED]
+            if job.error is not None:
+                history['archived'].update(values=[f"⚠️ Could not read the segment: {job.error}"])  # type: ignore
+            elif labels.get(values['segment']) == job.args[0]:  # Ignore a segment picked before the last one
+                history['archived'].update(values=functions.render_list(job.result))  # type: ignore
+    history.close()
+
+
+def selected_todo_id(window):
+    """
+    Return the id of the todo selected in the todo listbox.
+
+    The listbox shows the todos in visible_todo_ids, in order, so the selected row number maps
+    straight to an id. Raises IndexError when nothing is selected.
+    """
+    index = window['todos'].get_indexes()[0]  # type: ignore
+    return visible_todo_ids[index]
+
+
+def show_todos(window):
+    """
+    Refresh the todo listbox. With text in the filter box the matching todos are looked up by the
+    I/O worker, and the listbox is filled when the answer arrives (see render_todos). Until then it
+    keeps the todos it shows that are still in todo_list, so a completed or removed todo vanishes
+    at once and the rows always match todo_list.
+    """
+    query = window['filter'].get().strip()  # type: ignore
+    if query:
+        render_todos(window, set(visible_todo_ids))
+        io_worker.submit("filter", matching_ids, query)
+    else:
+        render_todos(window, None)
+
+
+def matching_ids(query):
+    """Ids of the active todos matching query (runs on the I/O worker)."""
+    # The search index answers from memory; only active todos are searched here
+    return {todo_id for _, todo_id, _ in functions.search_todos(query, store, lists=("todo",))}
+
+
+def render_todos(window, matches):
+    """Fill the todo listbox with the todos whose id is in matches (all of them when matches is None)."""
+    global visible_todo_ids
+    visible_todo_ids = [todo_id for todo_id in todo_list if matches is None or todo_id in matches]
+    update_listbox(window['todos'], [(todo_id, todo_list[todo_id]) for todo_id in visible_todo_ids])
+
+
+def load_lists():
+    """Read both lists from the store (runs on the I/O worker)."""
+    return store.load_todos(), store.load_completed()
+
+
 # ============================
 # Loading Existing Todos from Files into Lists
 # ============================
 
-# Reading todos: open files in 'a+' mode to read and create if missing
-with open(FILEPATH_TODO, "a+", encoding="utf-8") as file:
-    file.seek(0)  # Reset file pointer to start
-    todo_list = [line.strip() for line in file if line.strip()]  # Strip whitespace, ignore empty lines
-
-with open(FILEPATH_COMPLETED_TODO, "a+", encoding="utf-8") as file:
-    file.seek(0)
-    completed_todo_list = [line.strip() for line in file if line.strip()]
+# Pick the storage backend: python gui.py --store sqlite (or set TODO_STORE=sqlite)
+# python gui.py --debug prints every event and its values
+parser = argparse.ArgumentParser(description="Todo App - desktop GUI")
+parser.add_argument("--debug", action="store_true", help="print every event to the console")
+parser.add_argument("--store", choices=storage.BACKENDS, default=None)
+parser.add_argument("--durability", choices=storage.DURABILITY_MODES, default=None)  # Default: group commit
+options = parser.parse_known_args()[0]
+if options.durability:
+    storage.set_durability(options.durability)
+store = functions.use_store(options.store)
+metrics.autosave(functions.METRICS_DIR, "gui")  # See: python cli.py stats
+
+# Both lists start empty and are filled by the I/O worker's first job, so the window opens at once
+todo_list = {}
+completed_todo_list = {}
+visible_todo_ids = []  # Ids shown in the todo listbox, in order (see render_todos)
+shown_items = {'todos': [], 'comp_todos': []}  # Listbox key -> the (id, Todo) rows it shows (see update_listbox)
 
 # ============================
 # Initialize Theme Variable and Create First Window
@@ -123,79 +258,153 @@ with open(FILEPATH_COMPLETED_TODO, "a+", encoding="utf-8") as file:
 
 current_theme = 'DarkGrey15'  # Default starting theme, matches create_window default
 window = create_window(current_theme)
+shown_time = None  # Clock text on screen
+
+# ============================
+# Watch the Data Files for Changes Made by the CLI / Web App
+# ============================
 
-# Copy lists for external change detection
-last_todos = list(todo_list)
-last_completed = list(completed_todo_list)
+FILES_CHANGED = "-FILES-CHANGED-"  # Custom event posted by the watcher thread
+
+# The first load hasn't run yet, so make sure the data folder exists for the watcher to watch
+for watched_path in store.watch_paths():
+    os.makedirs(os.path.dirname(watched_path), exist_ok=True)
+
+# The watcher thread posts an event into the GUI's event queue (write_event_value is thread-safe).
+file_watcher = FileWatcher(store.watch_paths(), lambda paths: window.write_event_value(FILES_CHANGED, paths))
+file_watcher.start()
+
+# ============================
+# Disk Work on a Background Thread
+# ============================
+
+IO_DONE = "-IO-DONE-"  # Custom event posted by the I/O worker with each finished job
+SEGMENT_LOADED = "-SEGMENT-LOADED-"  # Same, for the history window
+BUSY_DELAY_MS = 150  # Only show "Working..." for jobs that take longer than this
+
+# Loads and saves run on the worker and come back as IO_DONE events (see the handlers below),
+# so the window keeps redrawing and answering clicks while the disk is slow
+io_worker = IOWorker(lambda job: window.write_event_value(IO_DONE, job))
+io_worker.start()
+io_worker.submit("reload", load_lists)
+window['status'].update(value="⏳ Loading your todos...")  # type: ignore
+busy_shown = True
+
+
+def apply_io_result(window, job):
+    """Apply a finished worker job to the in-memory lists and the listboxes (GUI thread)."""
+    if job.error is not None:
+        if isinstance(job.error, functions.TodoNotFound):
+            todo_list.pop(job.error.todo_id, None)  # Gone already, e.g. removed in the CLI
+            show_todos(window)
+        if isinstance(job.error, functions.TodoError):
+            message = str(job.error)
+        else:
+            message = f"Could not {job.action} the todo.\nError: {job.error}"
+        sg.popup(message, font=("helvetica", 10), title="ERROR!!!")
+        return
+
+    change = job.result
+    match job.action:
+        case "reload":
+            # Our own saves trigger the watcher too, so compare before touching the listboxes
+            new_todos, new_completed = job.result
+            if new_todos != todo_list:
+                todo_list.clear()  # Update main dict in-place
+                todo_list.update(new_todos)
+                show_todos(window)
+            if new_completed != completed_todo_list:
+                completed_todo_list.clear()
+                completed_todo_list.update(new_completed)
+                show_completed(window)
+
+        case "filter":
+            if job.args[0] == window['filter'].get().strip():  # type: ignore  # Skip answers to old queries
+                render_todos(window, job.result)
+
+        case "add" | "edit":
+            todo_list[change.todo.id] = change.todo  # An edited todo keeps its place in the dict
+            show_todos(window)
+            window['todo'].update(value='')  # Clear inputbox # type: ignore
+
+        case "remove":
+            todo_list.pop(change.todo.id, None)
+            show_todos(window)
+            window['todo'].update(value='')  # type: ignore
+
+        case "complete":
+            todo_list.pop(change.todo.id, None)
+            completed_todo_list[change.todo.id] = change.todo
+            show_completed(window)
+            show_todos(window)
+            window['todo'].update(value='')  # type: ignore
+
+        case "clear":
+            completed_todo_list.clear()
+            show_completed(window)
+
+
+def ms_until_next_minute():
+    """Milliseconds until the clock's minute changes, so the loop only wakes up when it must."""
+    now = datetime.now()
+    return (60 - now.second) * 1000 - now.microsecond // 1000
 
-# Function references to reload todos externally
-read_todos = functions.load_todos(filepath=FILEPATH_TODO)
-read_comp_todos = functions.load_todos(filepath=FILEPATH_COMPLETED_TODO)
 
 # ============================
 # Main Event Loop
 # ============================
 
 while True:
-    # window.read() with timeout to update clock periodically and remain responsive
-    event, values = window.read(timeout=400)  # wait max 400ms for events # type: ignore
+    # Sleep until a GUI event, a file change or worker event, or the next minute for the clock
+    # (or until it is time to show the busy state, if the worker is still going)
+    timeout = ms_until_next_minute()
+    if io_worker.pending() and not busy_shown:
+        timeout = min(timeout, BUSY_DELAY_MS)
+    event, values = window.read(timeout=timeout)  # type: ignore
+    metrics.save_if_due()  # Cheap unless SAVE_INTERVAL has passed
 
     # ---------- Theme Switching Logic ----------
-    # When user clicks theme buttons:
-    # 1. Update current_theme string
-    # 2. Close old window
-    # 3. Create new window with new theme via create_window()
-    # 4. Update listboxes in new window to reflect current data lists
-    if event == "dark_theme":
+    # The theme's colours are applied to the open window; nothing is rebuilt or reloaded
+    if event == "dark_theme" and current_theme != 'DarkGrey15':
         current_theme = 'DarkGrey15'
-        window.close()
-        window = create_window(current_theme)
-        try:
-            window['todos'].update(values=todo_list)  # refresh todo list display # type: ignore
-            window['comp_todos'].update(values=completed_todo_list)  # refresh completed todos display # type: ignore
-        except Exception:
-            # Timing issues with update right after recreation can cause exceptions
-            # Silently ignore here for robustness
-            pass
-
-    elif event == "light_theme":
+        apply_theme(window, current_theme)
+
+    elif event == "light_theme" and current_theme != 'LightGrey2':
         current_theme = 'LightGrey2'
-        window.close()
-        window = create_window(current_theme)
-        try:
-            window['todos'].update(values=todo_list)  # type: ignore
-            window['comp_todos'].update(values=completed_todo_list)  # type: ignore
-        except Exception:
-            pass
+        apply_theme(window, current_theme)
 
     # ---------- Exit Handling ----------
     if event in [sg.WIN_CLOSED, 'Exit']:
         break  # Exit the program cleanly
 
     # ---------- Clock Update ----------
-    # Update clock Text element with current date/time every iteration
+    # The clock shows minutes, so it is only redrawn when the displayed text changes
     current_time = datetime.now().strftime("Today's Date:%m/%d/%Y\nTime: %I:%M %p")
-    window['clock'].update(value=current_time)  # type: ignore
-
-    # ---------- Poll for external file changes ----------
-    # Refresh todos from external file changes detected by functions.load_todos functions
-    new_todos = read_todos
-    new_completed = read_comp_todos
-
-    # If new values differ, update GUI and in-memory variables
-    if new_todos != last_todos:
-        todo_list[:] = new_todos  # Update main list in-place
-        window['todos'].update(values=todo_list)  # type: ignore
-        last_todos = list(new_todos)
-
-    if new_completed != last_completed:
-        completed_todo_list[:] = new_completed
-        window['comp_todos'].update(values=completed_todo_list)  # type: ignore
-        last_completed = list(new_completed)
-
-    # ---------- Debug prints (optional) ----------
-    print("Event:", event)  # Log which event was triggered
-    print("Values:", values)  # Log current input values for debugging
+    if current_time != shown_time:
+        window['clock'].update(value=current_time)  # type: ignore
+        shown_time = current_time
+
+    # ---------- Busy state ----------
+    if io_worker.pending() and not busy_shown and event == sg.TIMEOUT_KEY:
+        window['status'].update(value="⏳ Working...")  # type: ignore
+        busy_shown = True
+
+    # ---------- Worker results ----------
+    if event == IO_DONE:
+        apply_io_result(window, values[IO_DONE])
+        if busy_shown and not io_worker.pending():
+            window['status'].update(value="")  # type: ignore
+            busy_shown = False
+
+    # ---------- External file changes ----------
+    # Only reload when the watcher reported a change; the worker reads the files
+    if event == FILES_CHANGED:
+        io_worker.submit("reload", load_lists)
+
+    # ---------- Debug prints (python gui.py --debug) ----------
+    if options.debug:
+        print("Event:", event)  # Log which event was triggered
+        print("Values:", values)  # Log current input values for debugging
 
     # ---------- User Interaction Event Handling ----------
     # Use Python 3.10+ match statement to respond to events
@@ -204,10 +413,9 @@ while True:
         case "Add":
             todo = values['todo'].strip()
             if todo:
-                # Add the new todo item using the imported function
-                functions.add(todo, todo_list)
-                window['todos'].update(values=todo_list)  # Update listbox # type: ignore
-                window['todo'].update(value='')  # Clear inputbox # type: ignore
+                # Add the new todo item on the worker; the listbox updates when it is saved.
+                # Scratch dicts keep the worker away from the lists this thread displays
+                io_worker.submit("add", functions.add, todo, {}, store)
             else:
                 # Show error popup if input is empty
                 sg.popup(
@@ -218,11 +426,8 @@ while True:
 
         case "Remove":
             try:
-                todo_to_remove = values['todos'][0]  # get selected todo item
-                index = todo_list.index(todo_to_remove)  # find index in list
-                functions.remove(index, todo_list)  # remove todo
-                window['todos'].update(values=todo_list)  # update display # type: ignore
-                window['todo'].update(value='')  # clear input box # type: ignore
+                todo_id = selected_todo_id(window)  # id of the selected todo item
+                io_worker.submit("remove", functions.remove, todo_id, {}, store)  # remove todo
             except IndexError:
                 sg.popup(
                     "You haven't selected any todo to remove.\nSelect a todo to remove.",
@@ -232,12 +437,9 @@ while True:
 
         case "Edit":
             try:
-                todo_to_edit = values['todos'][0]  # selected todo item
+                todo_id = selected_todo_id(window)  # selected todo item
                 new_todo = values['todo']  # new text from input box
-                index = todo_list.index(todo_to_edit)
-                functions.edit(index, new_todo, todo_list, completed_todo_list)
-                window['todos'].update(values=todo_list)  # update display # type: ignore
-                window['todo'].update(value='')  # clear input box # type: ignore
+                io_worker.submit("edit", functions.edit, todo_id, new_todo, {}, None, store)
             except IndexError:
                 sg.popup(
                     "You haven't selected any todo to edit.\nSelect a todo to edit.",
@@ -247,12 +449,8 @@ while True:
 
         case "Complete":
             try:
-                todo_to_complete = values['todos'][0]
-                index = todo_list.index(todo_to_complete)
-                functions.complete(index, todo_list, completed_todo_list)
-                window['comp_todos'].update(values=completed_todo_list)  # update completed todos # type: ignore
-                window['todos'].update(values=todo_list)  # update todo list # type: ignore
-                window['todo'].update(value='')  # clear input box # type: ignore
+                todo_id = selected_todo_id(window)
+                io_worker.submit("complete", functions.complete, todo_id, {}, {}, store)
             except IndexError:
                 sg.popup(
                     "You haven't selected any todo for completion.\nSelect a todo for completing.",
@@ -261,17 +459,21 @@ while True:
                 )
 
         case "Clear Completed Todos":
-            functions.clear_completed(completed_todo_list)
-            window['comp_todos'].update(values=completed_todo_list)  # refresh display # type: ignore 
+            io_worker.submit("clear", functions.clear_completed, dict(completed_todo_list), store)
+
+        case "History":
+            show_history_window()
+
+        case "filter":
+            show_todos(window)  # Re-filter on every keystroke
 
         case "todos":
             # When a todo item listbox selection changes,
-            # extract the todo text without the date suffix and fill input box for editing
+            # fill the input box with the todo's text (without the date) for editing
             try:
-                selected_todo = values['todos'][0]
-                # Remove the last 24 chars containing "(Created on: DD/MM/YYYY)"
-                todo_without_date = selected_todo[:-24]
-                window['todo'].update(value=todo_without_date)  # type: ignore
+                selected_todo = todo_list.get(selected_todo_id(window))
+                # None if it was just completed or removed (the listbox is redrawn right after)
+                window['todo'].update(value=selected_todo.text if selected_todo else "")  # type: ignore
             except IndexError:
                 sg.popup(
                     "First add a todo, then select from the list.",
@@ -287,4 +489,7 @@ while True:
 # Cleanup on Exit
 # ============================
 
+file_watcher.stop()
+io_worker.stop()  # Let queued saves finish before the window goes away
 window.close()
+store.close()  # Flushes writes still waiting for their group commit
@@ -0,0 +1,138 @@
+import threading
+import weakref
+
+from records import Todo
+
+r"""
+What the in-memory indexes over a store (search.py, timeline.py, duplicates.py) have in common.
+
+Each index is built on its first query and then kept up to date two ways:
+
+- functions.py reports every change it commits once, through note_put/note_delete below, and each
+  index already built for that store applies it in memory;
+- changes made elsewhere (another process, batch mode) move the store version, and an index that
+  finds itself behind catches up on its next query (StoreIndex._sync).
+
+    index = SearchIndex.for_store(store)          # one index of each kind per store, kept weakly
+    indexes.note_put(store, "completed", todo)    # after store.complete() has returned
+
+Call note_put/note_delete after the transaction has committed: the search and time indexes read the
+store while holding their own lock, so notifying them under the store lock could deadlock.
+"""
+
+
+class StoreIndex:
+    """
+    Base of an index over one store: its lock, the store version it reflects and the note_* methods.
+
+    Subclasses implement _reset, _catch_up, _put and _delete, and may override _covers and
+    _own_write_complete when part of the index (the archive) is only built on demand.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._reset()
+
+    @classmethod
+    def for_store(cls, store):
+        """Return this kind of index for store, creating it (empty until the first query) on first use."""
+        with _registry_lock:
+            built = _registry.get(store)
+            if built is None:
+                built = _registry[store] = {}
+            index = built.get(cls)
+            if index is None:
+                index = built[cls] = cls(store)
+            return index
+
+    # -------------------------
+    # For subclasses
+    # -------------------------
+
+    def _reset(self) -> None:
+        """Forget everything indexed; the next query reads the store again."""
+        self._version: int | None = None  # Store version the index reflects
+
+    def _catch_up(self, include_archive: bool) -> None:
+        """Bring the indexed todos in line with the store (self._lock held)."""
+        raise NotImplementedError
+
+    def _put(self, list_name: str, todo: Todo) -> None:
+        """Index todo as added to or changed in list_name ("todo" or "completed")."""
+        raise NotImplementedError
+
+    def _delete(self, todo_id: str) -> None:
+        """Drop todo_id from the index."""
+        raise NotImplementedError
+
+    def _covers(self, include_archive: bool) -> bool:
+        """Whether the index can answer a query at its version (the archive may not be read yet)."""
+        return True
+
+    def _own_write_complete(self) -> bool:
+        """Whether a noted change is all that happened in its write (no archive segment was sealed)."""
+        return True
+
+    # -------------------------
+    # Versions
+    # -------------------------
+
+    def _sync(self, include_archive: bool = False) -> None:
+        """Catch up with the store if someone changed it behind our back (self._lock held)."""
+        version = self.store.version()  # Read before the data, so a write in between is caught next time
+        if version == self._version and self._covers(include_archive):
+            return
+        self._catch_up(include_archive)
+        self._version = version
+
+    def _after_own_write(self, version: int) -> None:
+        """Accept our own change as the new version if nothing else happened in between."""
+        if self._version is not None and version == self._version + 1 and self._own_write_complete():
+            self._version = version
+
+    # The store version is read before taking self._lock: the duplicate index is queried inside
+    # store transactions, so waiting for the store while holding self._lock could deadlock with it
+
+    def note_put(self, list_name: str, todo: Todo) -> None:
+        """Record that todo was added to or changed in list_name ("todo" or "completed")."""
+        version = self.store.version()
+        with self._lock:
+            if self._version is None:
+                return  # Not built yet; the first query reads everything anyway
+            self._put(list_name, todo)
+            self._after_own_write(version)
+
+    def note_delete(self, todo_id: str) -> None:
+        """Record that todo_id was removed."""
+        version = self.store.version()
+        with self._lock:
+            if self._version is None:
+                return
+            self._delete(todo_id)
+            self._after_own_write(version)
+
+
+# =========================
+# The indexes built for each store
+# =========================
+
+_registry: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()  # store -> {index class: index}
+_registry_lock = threading.Lock()
+
+
+def _built(store) -> list[StoreIndex]:
+    with _registry_lock:
+        return list(_registry.get(store, {}).values())
+
+
+def note_put(store, list_name: str, todo: Todo) -> None:
+    """Tell every index built for store that todo was added to, changed in or completed into list_name."""
+    for index in _built(store):
+        index.note_put(list_name, todo)
+
+
+def note_delete(store, todo_id: str) -> None:
+    """Tell every index built for store that todo_id was removed."""
+    for index in _built(store):
+        index.note_delete(todo_id)
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import metrics
+
+r"""
+One process-wide view of a store, shared by every reader in that process.
+
+The web app runs one script per browser tab, and each of them used to load both lists on every
+rerun, and could only notice a change made by the CLI, the GUI or another tab when its user
+clicked something. LiveView keeps the parsed lists together with the store version they belong to:
+
+    live = LiveView(store)                       # once per process (st.cache_resource)
+    version, todos, completed = live.snapshot()  # lists are only read again after the version moved
+    if live.poll() != version: ...               # something changed; poll() asks the store at
+                                                 # most once per POLL_INTERVAL, however many callers
+
+So twenty tabs polling every few seconds cost one version check per interval, and each change is
+read from disk once, by whichever tab notices it first. The returned dicts are shared: treat them
+as read-only and pass a copy (or a scratch dict) to the functions.* mutations.
+"""
+
+POLL_INTERVAL = 1.0  # Seconds between two version checks made for poll()
+
+
+class LiveView:
+    """The lists and version of one store, read once per change and shared by all callers."""
+
+    def __init__(self, store, poll_interval: float = POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._version: int | None = None  # Version the lists below were read at
+        self._todos: dict = {}
+        self._completed: dict = {}
+        self._polled: int | None = None  # Last version seen by poll()
+        self._polled_at = 0.0
+
+    def snapshot(self) -> tuple[int, dict, dict]:
+        """Return (version, active todos, newest completed todos), reading the lists only if they changed."""
+        with self._lock:
+            version = self.store.version()  # Read before the data, so a write in between is caught next time
+            if version != self._version:
+                self._todos = self.store.load_todos()
+                self._completed = self.store.load_completed()
+                self._version = version
+                metrics.count("live.reloads")
+            self._polled, self._polled_at = version, time.monotonic()
+            return version, self._todos, self._completed
+
+    def poll(self) -> int:
+        """Return the store version, asking the store at most once per poll_interval."""
+        with self._lock:
+            now = time.monotonic()
+            if self._polled is None or now - self._polled_at >= self.poll_interval:
+                self._polled, self._polled_at = self.store.version(), now
+                metrics.count("live.version_checks")
+            return self._polled
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock below applies
+    fcntl = None
+
+import metrics
+
+r"""
+Cross-process locking for the shared ~/.todo_app data.
+
+The CLI, the GUI and the web app can all run at the same time against the same files. Every process
+takes a lock on one file in the data folder (store.lock) before touching the data:
+
+- readers take a shared lock (many at once),
+- writers take an exclusive lock (one at a time, and no readers meanwhile).
+
+The same file also holds the *store version*, a counter bumped by every write. A writer that read the
+data at version N can ask for the exclusive lock "only if the version is still N" (compare-and-swap).
+If someone else wrote in between it gets a VersionConflict, catches up on just the new log records
+and tries again, instead of silently overwriting the other change.
+"""
+
+LOCK_FILE_NAME = "store.lock"
+VERSION_WIDTH = 20  # The version is stored as a fixed-width number so it is always one small write
+
+
+class VersionConflict(Exception):
+    """Raised when a compare-and-swap write finds the store version has moved on."""
+
+    def __init__(self, expected: int, actual: int):
+        super().__init__(f"Store changed since it was read (expected version {expected}, found {actual}).")
+        self.expected = expected
+        self.actual = actual
+
+
+class StoreLock:
+    """Reader/writer lock plus version counter for one data folder."""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, LOCK_FILE_NAME)
+        self._fd: int | None = None
+        # flock() does not exclude threads sharing one file descriptor, so threads of this
+        # process are serialised with an ordinary lock first
+        self._mutex = threading.RLock()
+        self._depth = 0  # How many nested lock() calls the owning thread is inside
+        self._exclusive = False
+        self._changed = False  # Whether the current exclusive hold wrote anything
+        # Goes up each time the lock is taken afresh. While it is held nobody else can write, so
+        # callers can check the files once per hold instead of on every nested call
+        self.hold = 0
+        self._version = 0  # Version read when the current hold began (it cannot move until release)
+
+    def _open(self) -> int:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    @contextmanager
+    def shared(self):
+        """Hold the lock for reading; yields the current version."""
+        with self._mutex:
+            if self._depth:  # Already inside a shared or exclusive section on this thread
+                self._depth += 1
+                try:
+                    yield self._version
+                finally:
+                    self._depth -= 1
+                return
+
+            fd = self._open()
+            if fcntl:
+                waited = time.perf_counter()
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                metrics.observe("lock.wait_shared", time.perf_counter() - waited, "seconds")
+            self.hold += 1
+            self._version = self._read_version()
+            self._depth, self._exclusive = 1, False
+            try:
+                yield self._version
+            finally:
+                self._depth = 0
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self, expected_version: int | None = None, bump: bool = True):
+        """
+        Hold the lock for writing; yields the version the write starts from.
+
+        With expected_version the lock is only granted if the store is still at that version,
+        otherwise VersionConflict is raised. When bump is true the version is increased on the way
+        out if anything was written (see mark_changed), so other processes can tell something
+        changed; a section that wrote nothing, e.g. a rejected duplicate, leaves it alone. Nested
+        calls on the same thread join the outer section and the version is bumped once.
+        """
+        with self._mutex:
+            if self._depth:
+                if not self._exclusive:
+                    raise RuntimeError("Cannot upgrade a shared store lock to an exclusive one.")
+                version = self._version
+                if expected_version is not None and version != expected_version:
+                    raise VersionConflict(expected_version, version)
+                self._depth += 1
+                try:
+                    yield version
+                finally:
+                    self._depth -= 1
+                return
+
+            fd = self._open()
+            if fcntl:
+                waited = time.perf_counter()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                metrics.observe("lock.wait_exclusive", time.perf_counter() - waited, "seconds")
+            try:
+                version = self._read_version()
+                if expected_version is not None and version != expected_version:
+                    raise VersionConflict(expected_version, version)
+                self.hold += 1
+                self._version = version
+                self._depth, self._exclusive, self._changed = 1, True, False
+                try:
+                    yield version
+                finally:
+                    self._depth, self._exclusive = 0, False
+                    # Bump even if the body failed part way: some records may already be written
+                    if bump and self._changed:
+                        self._write_version(version + 1)
+                        metrics.count("store.saves")  # One per write transaction, on every backend
+            finally:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def mark_changed(self) -> None:
+        """Record that the current exclusive section wrote to the data files (called by the writers)."""
+        self._changed = True
+
+    def version(self) -> int:
+        """Return the current store version (reads a few bytes, never the todo files)."""
+        with self.shared() as version:
+            return version
+
+    def _read_version(self) -> int:
+        fd = self._open()
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, VERSION_WIDTH + 1)
+        try:
+            return int(data or 0)
+        except ValueError:
+            return 0
+
+    def _write_version(self, version: int) -> None:
+        fd = self._open()
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, b"%0*d\n" % (VERSION_WIDTH, version))
+
+
+# =========================
+# One StoreLock per data folder
+# =========================
+
+_locks: dict[str, StoreLock] = {}
+_locks_lock = threading.Lock()
+
+
+def get_lock(directory: str) -> StoreLock:
+    """Return the shared StoreLock for a data folder, creating it on first use."""
+    key = os.path.abspath(directory)
+    with _locks_lock:
+        if key not in _locks:
+            _locks[key] = StoreLock(key)
+        return _locks[key]
@@ -0,0 +1,357 @@
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+r"""
+Lightweight timing and counter hooks, to see where the time goes.
+
+    @metrics.timed                              # time every call of a function
+    def complete(...): ...
+
+    with metrics.timer("web.rerun"): ...        # time a block
+    metrics.count("io.read_bytes", len(data))   # add to a counter
+    metrics.observe("web.rerun_read_bytes", n, "bytes")   # record one value of a distribution
+
+Everything is kept in memory, per process. A counter keeps its running total plus what was added
+in the current and the previous minute (so "saves per minute" needs no timestamps). A summary
+(timers are summaries of seconds) keeps the number of calls, their sum and the last SAMPLE_SIZE
+values, which the p50/p90/p99 are computed from. A hook costs two perf_counter() calls and an
+uncontended lock.
+
+The front-ends call autosave(directory, name), which writes the process's numbers to
+<directory>/<name>-<pid>.json at exit and at most every SAVE_INTERVAL seconds while running (the
+web app after each rerun, the GUI from its event loop). `python cli.py stats` merges those files,
+and to_prometheus() renders them in the Prometheus text exposition format.
+"""
+
+SAMPLE_SIZE = 1024  # Percentiles are taken over this many most recent values
+SAVE_INTERVAL = 10.0  # Seconds between autosaves of a running front-end
+QUANTILES = (0.5, 0.9, 0.99)
+PROMETHEUS_PREFIX = "todo_"
+
+
+class Counter:
+    """A running total plus the amounts added in the current and previous minute."""
+
+    __slots__ = ("total", "minute", "this_minute", "last_minute")
+
+    def __init__(self, total: float = 0, minute: int = 0, this_minute: float = 0, last_minute: float = 0):
+        self.total = total
+        self.minute = minute  # Minute number (epoch seconds // 60) this_minute belongs to
+        self.this_minute = this_minute
+        self.last_minute = last_minute
+
+    def add(self, amount: float, now: float) -> None:
+        minute = int(now // 60)
+        if minute != self.minute:
+            self.last_minute = self.this_minute if minute == self.minute + 1 else 0
+            self.minute, self.this_minute = minute, 0
+        self.this_minute += amount
+        self.total += amount
+
+    def amount_in(self, minute: int) -> float:
+        """Amount added during the given minute (0 once it is more than a minute old)."""
+        if minute == self.minute:
+            return self.this_minute
+        if minute == self.minute - 1:
+            return self.last_minute
+        return 0
+
+    def per_minute(self, now: float) -> float:
+        """Amount added during the last complete minute."""
+        return self.amount_in(int(now // 60) - 1)
+
+    def to_dict(self) -> dict:
+        return {"total": self.total, "minute": self.minute,
+                "this_minute": self.this_minute, "last_minute": self.last_minute}
+
+
+class Summary:
+    """Count, sum and the most recent values of something measured repeatedly."""
+
+    __slots__ = ("unit", "count", "total", "values")
+
+    def __init__(self, unit: str = "", count: int = 0, total: float = 0, values=()):
+        self.unit = unit
+        self.count = count
+        self.total = total
+        self.values = deque(values, maxlen=SAMPLE_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.values.append(value)
+
+    def quantile(self, fraction: float) -> float:
+        """Nearest-rank quantile of the recent values (0 when there are none)."""
+        ordered = sorted(self.values)
+        if not ordered:
+            return 0.0
+        return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+    def to_dict(self) -> dict:
+        return {"unit": self.unit, "count": self.count, "total": self.total, "values": list(self.values)}
+
+
+_counters: dict[str, Counter] = {}
+_summaries: dict[str, Summary] = {}
+_lock = threading.Lock()
+_started = time.time()
+
+
+# =========================
+# Hooks
+# =========================
+
+def count(name: str, amount: float = 1) -> None:
+    """Add amount to the counter called name."""
+    now = time.time()
+    with _lock:
+        counter = _counters.get(name)
+        if counter is None:
+            counter = _counters[name] = Counter(minute=int(now // 60))
+        counter.add(amount, now)
+
+
+def observe(name: str, value: float, unit: str = "") -> None:
+    """Record one value (a duration, a byte count, ...) in the summary called name."""
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            summary = _summaries[name] = Summary(unit)
+        summary.observe(value)
+
+
+@contextmanager
+def timer(name: str):
+    """Time the block and record it in the summary called name (in seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, "seconds")
+
+
+def timed(func):
+    """Decorator recording the duration of every call as "<module>.<function>"."""
+    name = f"{func.__module__}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe(name, time.perf_counter() - start, "seconds")
+
+    return wrapper
+
+
+def total(name: str) -> float:
+    """Current total of a counter (0 if nothing was counted yet)."""
+    with _lock:
+        counter = _counters.get(name)
+        return counter.total if counter is not None else 0
+
+
+# =========================
+# Snapshots (one process) and merging (many)
+# =========================
+
+def snapshot(process: str = "") -> dict:
+    """Return this process's metrics as a JSON-ready dict."""
+    with _lock:
+        return {
+            "process": process or f"pid-{os.getpid()}",
+            "started": _started,
+            "saved": time.time(),
+            "counters": {name: counter.to_dict() for name, counter in _counters.items()},
+            "summaries": {name: summary.to_dict() for name, summary in _summaries.items()},
+        }
+
+
+def merge(snapshots: list[dict], keep: int | None = None) -> dict:
+    """
+    Combine snapshots of several processes: totals and per-minute amounts add up, and percentiles
+    are taken over the recent values of all of them together (the newest keep values, if given).
+    """
+    counters: dict[str, Counter] = {}
+    summaries: dict[str, Summary] = {}
+    minute = int(time.time() // 60)
+    for snap in snapshots:
+        for name, data in snap.get("counters", {}).items():
+            merged = counters.setdefault(name, Counter(minute=minute))
+            counter = Counter(**data)
+            merged.total += counter.total
+            merged.this_minute += counter.amount_in(minute)
+            merged.last_minute += counter.amount_in(minute - 1)
+        for name, data in snap.get("summaries", {}).items():
+            merged = summaries.setdefault(name, Summary(data.get("unit", "")))
+            merged.count += data["count"]
+            merged.total += data["total"]
+            merged.values = deque(list(merged.values) + data["values"], maxlen=keep)
+    return {
+        "processes": [snap.get("process", "?") for snap in snapshots],
+        "counters": counters,
+        "summaries": summaries,
+    }
+
+
+def rows(merged: dict) -> tuple[list[dict], list[dict]]:
+    """Flatten merged metrics into counter rows and summary rows, sorted by name, for display."""
+    now = time.time()
+    counter_rows = [
+        {"name": name, "total": counter.total, "last_minute": counter.per_minute(now)}
+        for name, counter in sorted(merged["counters"].items())
+    ]
+    summary_rows = [
+        {"name": name, "unit": summary.unit, "count": summary.count,
+         "mean": summary.total / summary.count if summary.count else 0,
+         **{f"p{round(fraction * 100)}": summary.quantile(fraction) for fraction in QUANTILES}}
+        for name, summary in sorted(merged["summaries"].items())
+    ]
+    return counter_rows, summary_rows
+
+
+def current() -> dict:
+    """This process's metrics in the merged form (as used by the web metrics panel)."""
+    return merge([snapshot()])
+
+
+# =========================
+# Saving
+# =========================
+
+_autosave: dict = {}  # {"path", "process", "shared", "last"} once autosave() was called
+
+
+def autosave(directory: str, name: str, shared: bool = False) -> None:
+    """
+    Save this process's metrics to directory at exit and (via save_if_due) while running.
+
+    Long-running front-ends get a <name>-<pid>.json each. With shared=True, meant for short-lived
+    processes such as one CLI command, the numbers are instead added into <name>.json at exit, so
+    running the CLI a thousand times does not leave a thousand files behind.
+    """
+    with _lock:
+        if _autosave:
+            return
+        process = name if shared else f"{name}-{os.getpid()}"
+        _autosave.update(path=os.path.join(directory, f"{process}.json"), process=process,
+                         shared=shared, last=0.0)
+    atexit.register(save)
+
+
+def _from_merged(merged: dict, process: str) -> dict:
+    """Turn merged metrics back into the snapshot form they are saved in."""
+    return {
+        "process": process,
+        "started": _started,
+        "saved": time.time(),
+        "counters": {name: counter.to_dict() for name, counter in merged["counters"].items()},
+        "summaries": {name: summary.to_dict() for name, summary in merged["summaries"].items()},
+    }
+
+
+def save() -> None:
+    """Write this process's metrics to its autosave file now (if autosave is on)."""
+    if not _autosave:
+        return
+    path, process = _autosave["path"], _autosave["process"]
+    mine = snapshot(process)
+    if _autosave["shared"]:
+        # Best effort: two processes exiting at the same moment may lose one's numbers
+        previous = load_snapshots(os.path.dirname(path), [os.path.basename(path)])
+        mine = _from_merged(merge(previous + [mine], keep=SAMPLE_SIZE), process)
+    data = json.dumps(mine)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        return  # Metrics are best effort; never break the app over them
+    _autosave["last"] = time.time()
+
+
+def save_if_due() -> None:
+    """Save unless the last save was less than SAVE_INTERVAL seconds ago (shared files only at exit)."""
+    if _autosave and not _autosave["shared"] and time.time() - _autosave["last"] >= SAVE_INTERVAL:
+        save()
+
+
+def load_snapshots(directory: str, names: list[str] | None = None) -> list[dict]:
+    """Read the saved snapshots in directory, or just the named files (unreadable ones are skipped)."""
+    snapshots = []
+    if names is None:
+        try:
+            names = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            return snapshots
+    for file_name in names:
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def reset(directory: str) -> int:
+    """Delete the saved snapshots in directory and this process's numbers; returns files removed."""
+    removed = 0
+    for file_name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if file_name.endswith(".json"):
+            os.remove(os.path.join(directory, file_name))
+            removed += 1
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
+    return removed
+
+
+# =========================
+# Prometheus text format
+# =========================
+
+def _metric_name(name: str, suffix: str = "") -> str:
+    return PROMETHEUS_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name) + (f"_{suffix}" if suffix else "")
+
+
+def to_prometheus(merged: dict) -> str:
+    """Render merged metrics in the Prometheus text exposition format."""
+    now = time.time()
+    lines = []
+    for name, counter in sorted(merged["counters"].items()):
+        metric = _metric_name(name, "total")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counter.total:g}")
+        gauge = _metric_name(name, "per_minute")
+        lines.append(f"# TYPE {gauge} gauge")
+        lines.append(f"{gauge} {counter.per_minute(now):g}")
+    for name, summary in sorted(merged["summaries"].items()):
+        metric = _metric_name(name, summary.unit)
+        lines.append(f"# TYPE {metric} summary")
+        for fraction in QUANTILES:
+            lines.append(f'{metric}{{quantile="{fraction:g}"}} {summary.quantile(fraction):g}')
+        lines.append(f"{metric}_sum {summary.total:g}")
+        lines.append(f"{metric}_count {summary.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, merged: dict) -> None:
+    """Write merged metrics to path in Prometheus text format (e.g. for node_exporter's textfile collector)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(to_prometheus(merged))
+    os.replace(tmp_path, path)
@@ -0,0 +1,129 @@
+import re
+import time
+
+r"""
+The Todo record shared by every storage backend and front-end.
+
+A todo used to be a single string with its creation date baked in, e.g.
+"Buy Milk. (Created on: 17/10/2026)", so sorting or filtering by date meant parsing text again and
+again. A Todo keeps the parts apart:
+
+    id         stable 12-hex id
+    text       what the user typed, normalized ("Buy Milk.")
+    created    epoch seconds when it was added (None if unknown)
+    completed  epoch seconds when it was completed (None while active)
+
+Records are parsed once when the files are loaded and only turned back into the familiar
+"... (Created on: dd/mm/yyyy)" string by render() (also str()) when something is displayed.
+__slots__ keeps each record to a fixed set of fields with no per-object __dict__.
+
+Records are shared with the stores' caches, so treat them as read-only and make changes through
+the store.
+
+On disk a todo is one tab-separated line: "<id>\t<created>\t<completed>\t<text>" (empty fields for
+None). parse_line() also reads the older "<id>\t<text with date marker>" and plain "<text>" lines,
+taking the date out of the marker, so existing files keep working and are rewritten in the new
+format the next time they are compacted.
+"""
+
+DATE_FORMAT = "%d/%m/%Y"
+CREATED_MARKER = re.compile(r"\s*\(Created on: (\d{2}/\d{2}/\d{4})\)$")
+
+
+class Todo:
+    """One todo item."""
+
+    __slots__ = ("id", "text", "created", "completed")
+
+    def __init__(self, id: str, text: str, created: int | None = None, completed: int | None = None):
+        self.id = id
+        self.text = text
+        self.created = created
+        self.completed = completed
+
+    @classmethod
+    def parse(cls, todo_id: str, display: str) -> "Todo":
+        """Build a Todo from an old-style display string, taking the date out of its marker."""
+        marker = CREATED_MARKER.search(display)
+        if marker is None:
+            return cls(todo_id, display)
+        return cls(todo_id, display[:marker.start()], parse_date(marker.group(1)))
+
+    def render(self) -> str:
+        """Return the text as the front-ends show it, e.g. "Buy Milk. (Created on: 17/10/2026)"."""
+        if self.created is None:
+            return self.text
+        return f"{self.text} (Created on: {format_date(self.created)})"
+
+    __str__ = render
+
+    def to_record(self) -> dict:
+        """Return the JSON-friendly form used by the operation log and exports."""
+        record = {"id": self.id, "text": self.text, "created": self.created}
+        if self.completed is not None:
+            record["completed"] = self.completed
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Todo":
+        """Inverse of to_record(); records written before Todo existed only have "text"."""
+        if "created" not in record:
+            return cls.parse(record["id"], record["text"])
+        return cls(record["id"], record["text"], record["created"], record.get("completed"))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Todo):
+            return NotImplemented
+        return (self.id, self.text, self.created, self.completed) == \
+               (other.id, other.text, other.created, other.completed)
+
+    __hash__ = None  # type: ignore  # Mutable fields, so not usable as a dict key
+
+    def __repr__(self) -> str:
+        return f"Todo({self.id!r}, {self.text!r}, created={self.created!r}, completed={self.completed!r})"
+
+
+def now() -> int:
+    """Current time in whole epoch seconds, the resolution todos are stamped with."""
+    return int(time.time())
+
+
+def format_date(epoch: float) -> str:
+    """Format epoch seconds as dd/mm/yyyy in local time."""
+    return time.strftime(DATE_FORMAT, time.localtime(epoch))
+
+
+def parse_date(text: str) -> int:
+    """Inverse of format_date(): epoch seconds of midnight (local time) on a dd/mm/yyyy date."""
+    return int(time.mktime(time.strptime(text, DATE_FORMAT)))
+
+
+def format_line(todo: Todo) -> str:
+    """Return the on-disk line for a todo (without the newline)."""
+    created = "" if todo.created is None else str(todo.created)
+    completed = "" if todo.completed is None else str(todo.completed)
+    return f"{todo.id}\t{created}\t{completed}\t{todo.text}"
+
+
+def _epoch(field: str) -> int | None:
+    return int(field) if field else None
+
+
+def parse_line(line: str) -> Todo | None:
+    """
+    Parse one on-disk line in any of the formats the app has written.
+
+    Returns None for blank lines. Lines from before todos had ids come back with id "" and the
+    caller gives them one.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    parts = line.split("\t", 3)
+    if len(parts) == 4 and (parts[1].isdigit() or not parts[1]) and (parts[2].isdigit() or not parts[2]):
+        todo_id, created, completed, text = parts
+        return Todo(todo_id, text, _epoch(created), _epoch(completed))
+    todo_id, sep, text = line.partition("\t")
+    if not sep:  # Written before todos had ids
+        return Todo.parse("", line)
+    return Todo.parse(todo_id, text)
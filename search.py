@@ -0,0 +1,212 @@
+import re
+from array import array
+from bisect import bisect_left, insort
+
+import indexes
+from records import Todo
+
+r"""
+Full-text search over the active, completed and archived todos.
+
+SearchIndex keeps an inverted index: every word of a todo's text (lowercased) maps to the documents
+that contain it. Each todo is a document numbered in the order it was
+indexed, and a word's postings are a compact array of those numbers, so a million archived todos
+cost a few bytes per word instead of a Python set entry each.
+
+Queries are words separated by spaces and every word must match (AND). A word matches any indexed
+word that starts with it, so "buy mil" finds "Buy Milk." while it is being typed (a single letter only matches itself). The vocabulary is
+kept sorted, so the words sharing a prefix are one bisect away. Terms are evaluated rarest first and
+once only a few candidates are left the rest are checked against the candidates' text directly.
+
+The index is built on the first search and kept up to date as described in indexes.py. When the
+store version moved behind its back, the next search compares the active and newest completed
+lists with what is indexed and indexes newly sealed archive segments.
+Archive segments never change, so each one is tokenized only once, and only after the first search
+that asks for archived todos (searching the active list stays instant however big the archive is).
+
+    hits = search.search("buy mil", store)    # [(list, id, Todo), ...]
+"""
+
+LISTS = ("todo", "completed", "archived")  # Result order: active todos first
+TOKEN = re.compile(r"\w+")
+MIN_PREFIX = 2  # A one-letter term only matches one-letter words, not every word starting with it
+REBUILD_RATIO = 0.25  # Rebuild once this share of the indexed documents has been deleted
+
+
+def tokenize(text: str) -> set[str]:
+    """Return the distinct lowercase words of a todo's text."""
+    return set(TOKEN.findall(text.lower()))
+
+
+class SearchIndex(indexes.StoreIndex):
+    """Inverted index over one store's todos."""
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._docs: list[tuple[str, str, Todo] | None] = []  # docno -> (list, id, Todo), None once deleted
+        self._deleted = 0
+        self._postings: dict[str, array] = {}  # word -> docnos containing it
+        self._vocab: list[str] = []  # Every word in _postings, sorted, for prefix lookups
+        self._live: dict[str, dict[str, int]] = {"todo": {}, "completed": {}}  # id -> docno
+        self._segment_docs: dict[int, range] = {}  # Archive segment -> its (contiguous) docnos
+        self._archive_indexed = False  # Archive segments are only indexed once someone searches them
+
+    # -------------------------
+    # Keeping the index up to date
+    # -------------------------
+
+    def _index(self, list_name: str, todo: Todo) -> int:
+        docno = len(self._docs)
+        self._docs.append((list_name, todo.id, todo))
+        for word in tokenize(todo.text):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("I")
+                insort(self._vocab, word)
+            postings.append(docno)
+        return docno
+
+    def _index_many(self, list_name: str, records: dict[str, Todo]) -> range:
+        """Index a whole archive segment; the hot loop of building the index, so kept lean."""
+        start = docno = len(self._docs)
+        docs_append = self._docs.append
+        postings_for = self._postings
+        findall = TOKEN.findall
+        new_words = []
+        for todo_id, todo in records.items():
+            docs_append((list_name, todo_id, todo))
+            for word in set(findall(todo.text.lower())):
+                postings = postings_for.get(word)
+                if postings is None:
+                    postings = postings_for[word] = array("I")
+                    new_words.append(word)
+                postings.append(docno)
+            docno += 1
+        if new_words:
+            self._vocab.extend(new_words)
+            self._vocab.sort()  # Two sorted runs, which sort() merges in linear time
+        return range(start, docno)
+
+    def _unindex(self, docno: int) -> None:
+        # Postings keep the number; lookups skip documents that are gone
+        if self._docs[docno] is not None:
+            self._docs[docno] = None
+            self._deleted += 1
+
+    def _put(self, list_name: str, todo: Todo) -> None:
+        for name, live in self._live.items():
+            docno = live.get(todo.id)
+            if docno is not None:
+                if name == list_name and self._docs[docno][2] == todo:  # type: ignore
+                    return
+                self._unindex(live.pop(todo.id))
+        if list_name in self._live:
+            self._live[list_name][todo.id] = self._index(list_name, todo)
+
+    def _delete(self, todo_id: str) -> None:
+        for live in self._live.values():
+            docno = live.pop(todo_id, None)
+            if docno is not None:
+                self._unindex(docno)
+
+    def _covers(self, include_archive: bool) -> bool:
+        return self._archive_indexed or not include_archive
+
+    def _catch_up(self, include_archive: bool) -> None:
+        if self._version is None or self._deleted > REBUILD_RATIO * max(len(self._docs), 1000):
+            self._reset()
+
+        for list_name, records in (("todo", self.store.load_todos()), ("completed", self.store.load_completed())):
+            live = self._live[list_name]
+            for todo_id in [todo_id for todo_id in live if todo_id not in records]:
+                self._unindex(live.pop(todo_id))
+            for todo_id, todo in records.items():
+                docno = live.get(todo_id)
+                if docno is None or self._docs[docno][2] != todo:  # type: ignore
+                    self._put(list_name, todo)
+
+        self._archive_indexed |= include_archive
+        if not self._archive_indexed:
+            return
+
+        segments = {segment["segment"] for segment in self.store.archive_segments()}
+        for number in [number for number in self._segment_docs if number not in segments]:
+            for docno in self._segment_docs.pop(number):
+                self._unindex(docno)
+        for number in sorted(segments - self._segment_docs.keys()):
+            self._segment_docs[number] = self._index_many("archived", self.store.load_archive_segment(number))
+
+    def _own_write_complete(self) -> bool:
+        if not self._archive_indexed:
+            return True
+        # Completing a todo may have sealed a segment, which has to be indexed by _sync
+        segments = self.store.archive_segments()
+        return (segments[-1]["segment"] if segments else None) == max(self._segment_docs, default=None)
+
+    # -------------------------
+    # Querying
+    # -------------------------
+
+    def _matching(self, term: str) -> list[array]:
+        """Postings of every indexed word starting with term (or equal to it, for very short terms)."""
+        if len(term) < MIN_PREFIX:
+            postings = self._postings.get(term)
+            return [postings] if postings is not None else []
+        start = bisect_left(self._vocab, term)
+        end = start
+        while end < len(self._vocab) and self._vocab[end].startswith(term):
+            end += 1
+        return [self._postings[word] for word in self._vocab[start:end]]
+
+    def search(self, query: str, limit: int | None = None,
+               lists: tuple[str, ...] = LISTS) -> list[tuple[str, str, Todo]]:
+        """
+        Return the todos matching every word of query as (list, id, Todo) tuples.
+
+        Active todos come first, then completed, then archived ones; within a list in the order
+        they were indexed.
+        """
+        terms = sorted(set(TOKEN.findall(query.lower())))
+        if not terms:
+            return []
+
+        with self._lock:
+            self._sync(include_archive="archived" in lists)
+
+            # Rarest term first, so the candidate set starts as small as possible
+            looked_up = sorted(((sum(map(len, postings)), term, postings)
+                                for term in terms for postings in [self._matching(term)]),
+                               key=lambda item: item[0])
+            candidates: set[int] | None = None
+            for size, term, postings in looked_up:
+                if candidates is None:
+                    candidates = set().union(*postings)
+                elif size <= 4 * len(candidates):
+                    candidates &= set().union(*postings)
+                else:
+                    # Few candidates left: checking their text is cheaper than expanding postings
+                    pattern = re.compile(r"\b" + re.escape(term) + (r"\b" if len(term) < MIN_PREFIX else ""))
+                    candidates = {
+                        docno for docno in candidates
+                        if self._docs[docno] is not None
+                        and pattern.search(self._docs[docno][2].text.lower())  # type: ignore
+                    }
+                if not candidates:
+                    return []
+
+            rank = {name: position for position, name in enumerate(LISTS)}
+            hits = sorted(
+                (docno for docno in candidates
+                 if self._docs[docno] is not None and self._docs[docno][0] in lists),  # type: ignore
+                key=lambda docno: (rank[self._docs[docno][0]], docno),  # type: ignore
+            )
+            return [self._docs[docno] for docno in hits[:limit]]  # type: ignore
+
+    def __len__(self) -> int:
+        """Number of indexed todos."""
+        return len(self._docs) - self._deleted
+
+
+def search(query: str, store, limit: int | None = None, lists: tuple[str, ...] = LISTS):
+    """Search store's todos; see SearchIndex.search."""
+    return SearchIndex.for_store(store).search(query, limit, lists)
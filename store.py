@@ -0,0 +1,545 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import archive
+import locking
+import oplog
+import records
+from locking import VersionConflict  # Re-exported so front-ends only need to import store
+from oplog import DURABILITY_MODES, set_durability  # Re-exported as well
+from records import Todo  # Re-exported as well
+
+r"""
+Storage backends for the todo app.
+
+Every front-end talks to a TodoStore instead of opening files itself, so the same commands work no
+matter where the data lives. Two backends are available:
+
+- TextFileStore: the original todo_list.txt / completed_todo_list.txt files (through the
+  append-only operation log in oplog.py).
+- SQLiteStore: a single todo.db database in WAL mode, so a change touches one row, readers are never
+  blocked by a writer, and rows are found through indexes instead of list scans.
+
+Both keep todos in the order they were added and completed todos in the order they were completed.
+Completed todos are kept in segments (see archive.py): load_completed() only returns the newest
+one, older segments are listed by archive_segments() and read one at a time on demand.
+Every todo has a stable id (a short hex string) that it keeps when it is edited or completed, so the
+front-ends address todos by id instead of by their position in a list that may have changed since.
+Listings are returned as insertion-ordered {id: Todo} dicts (see records.py); the "(Created on: ...)"
+text is only produced when a Todo is rendered.
+
+Each store also has a version number that goes up with every write. transaction() groups several
+changes into one atomic step, and transaction(expected_version=v) only goes ahead if nobody wrote
+since version v was read (compare-and-swap); otherwise it raises VersionConflict and the caller
+re-reads and retries.
+
+set_durability("fsync") makes every write durable before it returns; the default "group" mode lets
+writes made within a few ms share one fsync (text backend, see oplog.py) or leaves syncing to WAL
+checkpoints (SQLite, synchronous=NORMAL). Either way other processes see a write immediately.
+"""
+
+
+class TodoStore:
+    """Interface shared by every storage backend."""
+
+    def load_todos(self) -> dict[str, Todo]:
+        """Return the active todos as {id: Todo} in the order they were added."""
+        raise NotImplementedError
+
+    def load_completed(self) -> dict[str, Todo]:
+        """Return the newest segment of completed todos as {id: Todo} in the order they were completed."""
+        raise NotImplementedError
+
+    def get(self, todo_id: str) -> Todo | None:
+        """Return an active todo, or None if there is no such id."""
+        raise NotImplementedError
+
+    def counts(self) -> dict[str, int]:
+        """Return how many todos are active, completed (newest segment) and archived, without loading them."""
+        archived = sum(segment["count"] for segment in self.archive_segments())
+        return {"todo": len(self.load_todos()), "completed": len(self.load_completed()), "archived": archived}
+
+    def version(self) -> int:
+        """Return the store version, which increases with every write from any process."""
+        raise NotImplementedError
+
+    def transaction(self, expected_version: int | None = None):
+        """
+        Context manager that makes the enclosed changes one atomic write.
+
+        Raises VersionConflict on entry if expected_version is given and the store has moved on.
+        """
+        raise NotImplementedError
+
+    def add(self, text: str, created: int | None = None) -> str:
+        """Append a new active todo (created now unless given) and return its id."""
+        raise NotImplementedError
+
+    def replace(self, todo_id: str, text: str) -> Todo:
+        """Change the text of an active todo and return it; it keeps its creation time."""
+        raise NotImplementedError
+
+    def delete(self, todo_id: str) -> Todo:
+        """Remove an active todo and return it."""
+        raise NotImplementedError
+
+    def complete(self, todo_id: str, completed: int | None = None) -> Todo:
+        """Move an active todo to the end of the completed list (completed now unless given) and return it."""
+        raise NotImplementedError
+
+    def clear_completed(self) -> None:
+        """Move the completed todos into the archive and apply the retention policy."""
+        with self.transaction():
+            self.seal_completed()
+            self.apply_retention()
+
+    def archive_segments(self) -> list[dict]:
+        """Return the sealed segments oldest first, as {"segment", "count", "started_at", "sealed_at"}."""
+        raise NotImplementedError
+
+    def load_archive_segment(self, segment: int) -> dict[str, Todo]:
+        """Read one sealed segment as {id: Todo} in completion order."""
+        raise NotImplementedError
+
+    def seal_completed(self) -> dict | None:
+        """Move the newest completed todos into a new sealed segment and return its manifest entry."""
+        raise NotImplementedError
+
+    def apply_retention(self, max_segments: int | None = archive.RETENTION_SEGMENTS,
+                        max_age_days: float | None = archive.RETENTION_DAYS) -> int:
+        """Drop the sealed segments outside the retention policy; returns how many todos went."""
+        raise NotImplementedError
+
+    def iter_completed_history(self):
+        """Yield (id, Todo) for every completed todo, oldest first, reading one segment at a time."""
+        for segment in self.archive_segments():
+            yield from self.load_archive_segment(segment["segment"]).items()
+        yield from self.load_completed().items()
+
+    def watch_paths(self) -> list[str]:
+        """Return the files whose modification means the stored todos may have changed."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+def _not_found(todo_id: str) -> KeyError:
+    """The error every backend raises for an id that is not (or no longer) an active todo."""
+    return KeyError(f"No active todo with id {todo_id!r}; it may have been changed elsewhere.")
+
+
+# =========================
+# Text File Backend
+# =========================
+
+
+class TextFileStore(TodoStore):
+    """The original two text files, written through the append-only operation log."""
+
+    def __init__(self, todo_path: str, completed_path: str):
+        self.todo_path = todo_path
+        self.completed_path = completed_path
+        self._todos = oplog.get_log(todo_path)
+        self._completed = oplog.get_log(completed_path)
+        self._archive = archive.SegmentArchive(
+            os.path.join(os.path.dirname(completed_path), archive.ARCHIVE_DIR_NAME)
+        )
+        self._lock = locking.get_lock(os.path.dirname(todo_path))
+
+    def load_todos(self) -> dict[str, Todo]:
+        return self._todos.items()
+
+    def load_completed(self) -> dict[str, Todo]:
+        return self._completed.items()
+
+    def get(self, todo_id: str) -> Todo | None:
+        return self._todos.get(todo_id)
+
+    def counts(self) -> dict[str, int]:
+        # len() of the in-memory log state: no copy of the lists, no archive segment read
+        archived = sum(segment["count"] for segment in self._archive.segments())
+        return {"todo": len(self._todos), "completed": len(self._completed), "archived": archived}
+
+    def version(self) -> int:
+        return self._lock.version()
+
+    @contextmanager
+    def transaction(self, expected_version: int | None = None):
+        # Changes are buffered by both logs and appended once when the outermost block ends. The
+        # archive's writes are held back too and go first, so a failed transaction that sealed the
+        # head leaves neither the new segment nor the cleared head behind
+        with self._lock.exclusive(expected_version) as version:
+            with self._todos.batch(), self._completed.batch(), self._archive.batch():
+                yield version
+
+    def add(self, text: str, created: int | None = None) -> str:
+        with self.transaction():
+            # A todo keeps its id when completed, so the new id must be free in both files
+            todo_id = oplog.new_id()
+            while todo_id in self._todos or todo_id in self._completed:
+                todo_id = oplog.new_id()
+            self._todos.put(Todo(todo_id, text, records.now() if created is None else created))
+        return todo_id
+
+    def replace(self, todo_id: str, text: str) -> Todo:
+        with self.transaction():
+            todo = self._todos.get(todo_id)
+            if todo is None:
+                raise _not_found(todo_id)
+            todo = Todo(todo_id, text, todo.created)
+            self._todos.put(todo)
+        return todo
+
+    def delete(self, todo_id: str) -> Todo:
+        try:
+            return self._todos.delete(todo_id)
+        except KeyError:
+            raise _not_found(todo_id) from None
+
+    def complete(self, todo_id: str, completed: int | None = None) -> Todo:
+        # Both files change under one exclusive lock, so no other process sees a half-moved todo
+        with self.transaction():
+            todo = self._todos.get(todo_id)
+            if todo is None:
+                raise _not_found(todo_id)
+            todo = Todo(todo_id, todo.text, todo.created, records.now() if completed is None else completed)
+            # Append to completed first: a crash in between leaves a duplicate rather than a lost todo
+            self._completed.put(todo)
+            self._todos.delete(todo_id)
+
+            started = self._archive.head_started()
+            if started is None:
+                self._archive.start_head()
+            elif archive.segment_is_full(len(self._completed), started):
+                self.seal_completed()
+                self.apply_retention()
+        return todo
+
+    def archive_segments(self) -> list[dict]:
+        return self._archive.segments()
+
+    def load_archive_segment(self, segment: int) -> dict[str, Todo]:
+        return self._archive.load(segment)
+
+    def seal_completed(self) -> dict | None:
+        with self.transaction():
+            entry = self._archive.seal(self._completed.items())
+            if entry is not None:
+                self._completed.clear()
+        return entry
+
+    def apply_retention(self, max_segments: int | None = archive.RETENTION_SEGMENTS,
+                        max_age_days: float | None = archive.RETENTION_DAYS) -> int:
+        with self.transaction():
+            expired = archive.expired_segments(self._archive.segments(), max_segments, max_age_days)
+            self._archive.drop(expired)
+        return sum(segment["count"] for segment in expired)
+
+    def watch_paths(self) -> list[str]:
+        # Every write bumps the version in the lock file; the text files catch hand edits
+        return [self._lock.path, self.todo_path, self.completed_path, self._archive.manifest_path]
+
+    def close(self) -> None:
+        oplog.flush()  # Group commit: don't leave appends waiting for the flusher
+
+
+# =========================
+# SQLite Backend
+# =========================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,  -- insertion order
+    text          TEXT NOT NULL,
+    completed_seq INTEGER,               -- NULL while active, completion order once completed
+    uid           TEXT,                  -- stable todo id shared with the other backends
+    segment       INTEGER,               -- archive segment of a completed todo, NULL for the newest
+    created       INTEGER,               -- epoch seconds
+    completed_at  INTEGER                -- epoch seconds, NULL while active
+);
+CREATE INDEX IF NOT EXISTS idx_todos_completed_seq ON todos (completed_seq);
+CREATE TABLE IF NOT EXISTS segments (
+    segment    INTEGER PRIMARY KEY AUTOINCREMENT,
+    count      INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    sealed_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+TODO_COLUMNS = "uid, text, created, completed_at"  # In Todo's field order
+UID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_todos_uid ON todos (uid)"
+SEGMENT_INDEX = "CREATE INDEX IF NOT EXISTS idx_todos_segment ON todos (segment, completed_seq)"
+
+
+class SQLiteStore(TodoStore):
+    """All todos in one SQLite database using WAL journaling."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        import sqlite3  # Here rather than at the top, so text-store processes never load it
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)  # First use of a new data folder
+        # One connection shared by the threads of this process (Streamlit runs callbacks on threads)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")  # Wait for other writers instead of failing
+        self._lock = threading.RLock()
+        self._depth = 0  # Nesting level of transaction() on the thread holding self._lock
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")  # Readers keep working while we write
+            if oplog.durability() == "fsync":
+                self._conn.execute("PRAGMA synchronous=FULL")  # Every commit is fsynced
+            else:
+                self._conn.execute("PRAGMA synchronous=NORMAL")  # Durable at each checkpoint, fast commits
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Add columns missing from older databases and give rows created before todos had ids a uid."""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(todos)")]
+        with self.transaction():
+            if "uid" not in columns:
+                self._conn.execute("ALTER TABLE todos ADD COLUMN uid TEXT")
+            if "segment" not in columns:
+                self._conn.execute("ALTER TABLE todos ADD COLUMN segment INTEGER")
+            self._conn.execute(SEGMENT_INDEX)
+            if "created" not in columns:
+                # Texts still carry their "(Created on: ...)" marker: move the date into its own column
+                self._conn.execute("ALTER TABLE todos ADD COLUMN created INTEGER")
+                self._conn.execute("ALTER TABLE todos ADD COLUMN completed_at INTEGER")
+                for row_id, text in self._conn.execute("SELECT id, text FROM todos").fetchall():
+                    todo = Todo.parse("", text)
+                    self._conn.execute(
+                        "UPDATE todos SET text = ?, created = ? WHERE id = ?", (todo.text, todo.created, row_id)
+                    )
+            missing = self._conn.execute("SELECT id FROM todos WHERE uid IS NULL").fetchall()
+            for (row_id,) in missing:
+                self._conn.execute(
+                    "UPDATE todos SET uid = ? WHERE id = ?", (oplog.new_id(), row_id)
+                )
+            self._conn.execute(UID_INDEX)
+
+    def load_todos(self) -> dict[str, Todo]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE completed_seq IS NULL ORDER BY id"
+            ).fetchall()
+        return _todos_from_rows(rows)
+
+    def load_completed(self) -> dict[str, Todo]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE segment IS NULL AND completed_seq IS NOT NULL "
+                "ORDER BY completed_seq"
+            ).fetchall()
+        return _todos_from_rows(rows)
+
+    def get(self, todo_id: str) -> Todo | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE uid = ? AND completed_seq IS NULL", (todo_id,)
+            ).fetchone()
+        return Todo(*row) if row else None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            todo, completed = self._conn.execute(
+                "SELECT COUNT(*) - COUNT(completed_seq), "
+                "COUNT(CASE WHEN completed_seq IS NOT NULL AND segment IS NULL THEN 1 END) FROM todos"
+            ).fetchone()
+            archived = self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM segments").fetchone()[0]
+        return {"todo": todo, "completed": completed, "archived": archived}
+
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @contextmanager
+    def transaction(self, expected_version: int | None = None):
+        with self._lock:
+            if self._depth:  # Join the transaction already open on this thread
+                self._depth += 1
+                try:
+                    yield self.version()
+                finally:
+                    self._depth -= 1
+                return
+
+            # BEGIN IMMEDIATE takes SQLite's write lock up front, so the version check below
+            # cannot race with another process
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            changes = self._conn.total_changes
+            try:
+                version = self.version()
+                if expected_version is not None and version != expected_version:
+                    raise VersionConflict(expected_version, version)
+                yield version
+                # Only a transaction that changed rows is a write; opening the store (migrations
+                # with nothing to do) or a rejected duplicate leaves the version alone
+                if self._conn.total_changes != changes:
+                    self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def add(self, text: str, created: int | None = None) -> str:
+        created = records.now() if created is None else created
+        with self.transaction():
+            while True:
+                todo_id = oplog.new_id()
+                try:
+                    self._conn.execute(
+                        "INSERT INTO todos (text, uid, created) VALUES (?, ?, ?)", (text, todo_id, created)
+                    )
+                    return todo_id
+                except self._conn.IntegrityError:  # The connection carries the sqlite3 exceptions
+                    continue  # Id already taken (vanishingly rare), pick another
+
+    def replace(self, todo_id: str, text: str) -> Todo:
+        with self.transaction():
+            todo = self._active_todo(todo_id)
+            todo.text = text
+            self._conn.execute("UPDATE todos SET text = ? WHERE uid = ?", (text, todo_id))
+        return todo
+
+    def delete(self, todo_id: str) -> Todo:
+        with self.transaction():
+            todo = self._active_todo(todo_id)
+            self._conn.execute("DELETE FROM todos WHERE uid = ?", (todo_id,))
+        return todo
+
+    def complete(self, todo_id: str, completed: int | None = None) -> Todo:
+        completed = records.now() if completed is None else completed
+        with self.transaction():
+            todo = self._active_todo(todo_id)
+            todo.completed = completed
+            self._conn.execute(
+                "UPDATE todos SET completed_at = ?, completed_seq = "
+                "(SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM todos) WHERE uid = ?",
+                (completed, todo_id),
+            )
+
+            started = self._head_started()
+            if started is None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('head_started', ?)", (time.time(),)
+                )
+            elif archive.segment_is_full(self._head_count(), started):
+                self.seal_completed()
+                self.apply_retention()
+        return todo
+
+    def archive_segments(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT segment, count, started_at, sealed_at FROM segments ORDER BY segment"
+            ).fetchall()
+        return [dict(zip(("segment", "count", "started_at", "sealed_at"), row)) for row in rows]
+
+    def load_archive_segment(self, segment: int) -> dict[str, Todo]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {TODO_COLUMNS} FROM todos WHERE segment = ? ORDER BY completed_seq", (segment,)
+            ).fetchall()
+        return _todos_from_rows(rows)
+
+    def seal_completed(self) -> dict | None:
+        with self.transaction():
+            count = self._head_count()
+            if not count:
+                return None
+            now = time.time()
+            started = self._head_started() or now
+            cursor = self._conn.execute(
+                "INSERT INTO segments (count, started_at, sealed_at) VALUES (?, ?, ?)",
+                (count, started, now),
+            )
+            self._conn.execute(
+                "UPDATE todos SET segment = ? WHERE segment IS NULL AND completed_seq IS NOT NULL",
+                (cursor.lastrowid,),
+            )
+            self._conn.execute("DELETE FROM meta WHERE key = 'head_started'")
+        return {"segment": cursor.lastrowid, "count": count, "started_at": started, "sealed_at": now}
+
+    def apply_retention(self, max_segments: int | None = archive.RETENTION_SEGMENTS,
+                        max_age_days: float | None = archive.RETENTION_DAYS) -> int:
+        with self.transaction():
+            expired = archive.expired_segments(self.archive_segments(), max_segments, max_age_days)
+            for segment in expired:
+                self._conn.execute("DELETE FROM todos WHERE segment = ?", (segment["segment"],))
+                self._conn.execute("DELETE FROM segments WHERE segment = ?", (segment["segment"],))
+        return sum(segment["count"] for segment in expired)
+
+    def watch_paths(self) -> list[str]:
+        # In WAL mode commits land in the -wal file; checkpoints and other tools touch the db itself
+        return [self.db_path, self.db_path + "-wal"]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _head_count(self) -> int:
+        """Count the completed todos not sealed into a segment yet."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM todos WHERE segment IS NULL AND completed_seq IS NOT NULL"
+        ).fetchone()[0]
+
+    def _head_started(self) -> float | None:
+        """Return when the newest segment started collecting completed todos."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'head_started'").fetchone()
+        return row[0] if row else None
+
+    def _active_todo(self, todo_id: str) -> Todo:
+        """Return an active todo, looked up through the uid index."""
+        row = self._conn.execute(
+            f"SELECT {TODO_COLUMNS} FROM todos WHERE uid = ? AND completed_seq IS NULL", (todo_id,)
+        ).fetchone()
+        if row is None:
+            raise _not_found(todo_id)
+        return Todo(*row)
+
+
+def _todos_from_rows(rows) -> dict[str, Todo]:
+    """Turn (uid, text, created, completed_at) rows into an {id: Todo} dict."""
+    return {row[0]: Todo(*row) for row in rows}
+
+
+# =========================
+# Choosing a Backend
+# =========================
+
+BACKENDS = ("text", "sqlite", "daemon")
+STORE_ENV_VAR = "TODO_STORE"  # e.g. TODO_STORE=sqlite python cli.py
+
+
+def open_store(kind: str | None, appdata_dir: str) -> TodoStore:
+    """
+    Create the backend named by kind ("text", "sqlite", or "daemon" for a client of todod.py)
+    for files inside appdata_dir.
+
+    When kind is None the TODO_STORE environment variable decides, defaulting to "text".
+    """
+    kind = (kind or os.environ.get(STORE_ENV_VAR) or "text").lower()
+    if kind == "text":
+        return TextFileStore(
+            os.path.join(appdata_dir, "todo_list.txt"),
+            os.path.join(appdata_dir, "completed_todo_list.txt"),
+        )
+    if kind == "sqlite":
+        return SQLiteStore(os.path.join(appdata_dir, "todo.db"))
+    if kind == "daemon":
+        import todod  # Thin client of a running todod (see todod.py)
+
+        return todod.DaemonStore(todod.socket_path(appdata_dir))
+    raise ValueError(f"Unknown storage backend {kind!r}, expected one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,102 @@
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+
+import functions
+import store as storage
+
+r"""
+Concurrency stress test for the store locking.
+
+Starts several writer processes against one throwaway data folder. Every writer, for each operation:
+
+1. adds its own todo (plain write under the exclusive lock), and
+2. increments a shared "Counter N" todo with a read-modify-write that uses compare-and-swap:
+   read the version, read the counter, write counter + 1 only if the version is unchanged,
+   otherwise retry.
+3. adds "Shared Item N" through functions.add, racing every other writer to add the same text;
+   the duplicate check must let exactly one of them through.
+
+At the end every added todo must be present and the counter must equal writers x ops. Any missing
+todo or counter step is a lost update, and any shared item stored more than once a lost duplicate
+check. Usage:
+
+    python stress.py                      # 8 writers x 200 ops on the text backend
+    python stress.py --store sqlite --writers 8 --ops 500
+"""
+
+
+def _writer(kind: str, directory: str, counter_id: str, writer_no: int, ops: int, results) -> None:
+    """Body of one writer process."""
+    store = storage.open_store(kind, directory)
+    retries = 0
+    for i in range(ops):
+        store.add(f"Writer {writer_no} Item {i}.")
+
+        while True:
+            version = store.version()  # Read the version *before* the data it guards
+            value = int(store.get(counter_id).text.split()[1])  # type: ignore
+            try:
+                with store.transaction(expected_version=version):
+                    store.replace(counter_id, f"Counter {value + 1}")
+                break
+            except storage.VersionConflict:
+                retries += 1
+
+        try:
+            functions.add(f"Shared item {i}", {}, store)
+        except functions.DuplicateTodo:
+            pass  # Another writer got there first
+    store.close()
+    results.put(retries)
+
+
+def run(kind: str = "text", writers: int = 8, ops: int = 200, directory: str | None = None) -> bool:
+    """Run the stress test and print a summary. Returns True when no update was lost."""
+    with tempfile.TemporaryDirectory(prefix="todo_stress_") as tmp_dir:
+        directory = directory or tmp_dir
+        store = storage.open_store(kind, directory)
+        counter_id = store.add("Counter 0")
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_writer, args=(kind, directory, counter_id, n, ops, results))
+            for n in range(writers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        retries = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        todos = store.load_todos()
+        expected = {f"Writer {n} Item {i}." for n in range(writers) for i in range(ops)}
+        missing = expected - {todo.text for todo in todos.values()}
+        shared = [todo.text for todo in todos.values() if todo.text.startswith("Shared Item ")]
+        duplicated = len(shared) - len(set(shared))
+        missing_shared = ops - len(set(shared))
+        counter = int(todos[counter_id].text.split()[1])
+        store.close()
+
+    lost = len(missing) + (writers * ops - counter) + duplicated + missing_shared
+    print(f"Backend:        {kind}")
+    print(f"Writers x ops:  {writers} x {ops} ({elapsed:.2f}s)")
+    print(f"Todos present:  {len(expected) - len(missing)}/{len(expected)}")
+    print(f"Counter:        {counter}/{writers * ops} ({retries} compare-and-swap retries)")
+    print(f"Shared items:   {ops - missing_shared}/{ops} ({duplicated} stored twice)")
+    print(f"Lost updates:   {lost}")
+    return lost == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress test concurrent writers against the todo store.")
+    parser.add_argument("--store", choices=("text", "sqlite"), default="text")  # Each writer opens the folder itself
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.store, args.writers, args.ops) else 1)
@@ -0,0 +1,142 @@
+import os
+import sys
+
+import functions
+
+r"""
+Terminal rendering for the interactive CLI.
+
+functions.py only changes data: its mutations return a functions.Change and raise a
+functions.TodoError instead of printing, so the GUI and the web app never pay for output they throw
+away. Everything the CLI shows is built here instead, from the lists it already holds in memory
+(nothing is read from disk just to print it), and each screenful is written with a single buffered
+write rather than one print() per todo.
+
+    try:
+        change = functions.add(text, todo_list, store)
+        terminal.report(change, todo_list, completed_todo_list)
+    except functions.TodoError as e:
+        terminal.show_error(e)
+"""
+
+RULE = "=" * 81
+EMPTY_TODOS = "-> Your Todo list is empty. Add a Todo now and get back to work!"
+EMPTY_COMPLETED = "-> You have not completed any Todo Task."
+
+MESSAGES = {
+    "added": "***✅ Todo added successfully!***",
+    "removed": "***✅ Todo removed successfully!***",
+    "edited": "***✅ Todo updated successfully!***",
+    "completed": "🎉 Todo marked as completed!",
+    "cleared": "✅ All completed todos have been cleared (moved to the archive).",
+}
+
+
+def write(*parts: str, out=None) -> None:
+    """Write the parts to out (default: the current sys.stdout) in one go."""
+    (out or sys.stdout).write("".join(parts))
+
+
+# =========================
+# Listings
+# =========================
+
+def todo_listing(todo_list: dict, title: str = "📝 Your Todo List:") -> str:
+    """Return the numbered todo list as one string."""
+    if not todo_list:
+        return f"\n{title}\n\n{EMPTY_TODOS}\n"
+    lines = [f"{i}. {todo}" for i, todo in enumerate(todo_list.values(), 1)]
+    return f"\n{title}\n\n" + "\n".join(lines) + "\n"
+
+
+def completed_listing(completed_todo_list: dict) -> str:
+    """Return the numbered completed list (the newest archive segment only) as one string."""
+    if not completed_todo_list:
+        return f"\n✅ Your Completed Todo List:\n\n{EMPTY_COMPLETED}\n"
+    lines = [f"{i}. {todo} --> Done" for i, todo in enumerate(completed_todo_list.values(), 1)]
+    return "\n✅ Your Completed Todo List:\n\n" + "\n".join(lines) + "\n"
+
+
+def show_todo_list(todo_list: dict, out=None) -> None:
+    """Display the current todo list."""
+    write(todo_listing(todo_list), out=out)
+
+
+def show_completed_todo(completed_todo_list: dict, out=None) -> None:
+    """Display the completed todos with completion markers."""
+    write(completed_listing(completed_todo_list), out=out)
+
+
+def show(todo_list: dict, completed_todo_list: dict, out=None) -> None:
+    """
+    Display all current todos and completed todos.
+
+    - Todos are shown in the order they were added.
+    - Completed todos are shown with a '--> Done' marker.
+    """
+    write("\n", RULE, "\n", todo_listing(todo_list), completed_listing(completed_todo_list), RULE, "\n", out=out)
+
+
+# =========================
+# Results and Errors
+# =========================
+
+def report(change: "functions.Change", todo_list: dict, completed_todo_list: dict, out=None) -> None:
+    """Show what a mutation did, followed by the list it changed."""
+    parts = ["\n", MESSAGES[change.action], "\n"]
+    if change.action in ("added", "removed"):
+        parts.append(todo_listing(todo_list))
+    elif change.action == "edited":
+        parts.append(todo_listing(todo_list, "📝 Your New Todo List:"))
+        parts.append(completed_listing(completed_todo_list))
+    elif change.action == "completed":
+        parts.append(completed_listing(completed_todo_list))
+    write(*parts, out=out)
+
+
+def show_error(error: Exception, out=None) -> None:
+    """Show a functions.TodoError (or any error whose message is meant for the user)."""
+    write("\n", str(error), "\n", out=out)
+
+
+# =========================
+# Prompts
+# =========================
+
+def prompt_for_todo_selection(todo_list: dict) -> None | str:
+    """
+    Prompt user to select a todo item.
+
+    Returns the id of the selected todo or None if invalid.
+    """
+    if not todo_list:
+        write("\n⚠️ Your Todo list is empty. Please add a Todo first.\n")
+        pause_terminal()
+        clear_terminal()
+        return None
+
+    show_todo_list(todo_list)
+
+    try:
+        prompt_text = "\nEnter the number of the Todo: "
+        index_for_todo = int(input(prompt_text))
+        if 0 < index_for_todo <= len(todo_list):
+            return functions.todo_id_at(todo_list, index_for_todo)
+        else:
+            write("\n⚠️ The value is out of range of the number of todos you have.\n")
+            return None
+    except ValueError as e:
+        write(f"\n⚠️ You have entered an invalid value. Please enter an integer.\nError: {e}\n")
+        pause_terminal()
+        clear_terminal()
+        return None
+
+
+def clear_terminal() -> None:
+    """Clear the terminal screen (Windows and Unix compatible)."""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+
+def pause_terminal() -> None:
+    """Pause the terminal screen and wait for user input."""
+    input("\nPress Enter to continue...")
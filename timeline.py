@@ -0,0 +1,217 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import islice, repeat
+from operator import itemgetter
+
+import indexes
+from records import Todo
+
+r"""
+Time-range queries over when todos were created and completed.
+
+"What did I complete last week?" or "which todos are older than 30 days?" used to mean loading every
+list and comparing dates one todo at a time. TimeIndex keeps the todos of each list sorted by their
+created and completed timestamps instead, so a range is two bisects plus the k todos inside it:
+O(log n + k) however long the lists get.
+
+    ("created", "todo")          active todos by creation time
+    ("created", "completed")     newest completed todos (the head segment) by creation time
+    ("completed", "completed")   ... and by completion time
+    ("created", "archived")      sealed archive segments by creation time
+    ("completed", "archived")    ... and by completion time
+
+Like the search index it is built on the first query and kept up to date as described in
+indexes.py. Archive segments never change, so each one is read once, and only after the first query
+that asks for archived todos.
+
+    hits = timeline.between(store, "completed", start=week_ago)    # [(list, id, Todo), ...] oldest first
+"""
+
+FIELDS = ("created", "completed")
+LISTS = ("todo", "completed", "archived")
+
+
+class SortedTimes:
+    """The todos of one list ordered by one timestamp, as parallel lists of times and todos."""
+
+    __slots__ = ("times", "todos")
+
+    def __init__(self):
+        self.times: list[int] = []
+        self.todos: list[Todo] = []
+
+    def insert(self, when: int, todo: Todo) -> None:
+        position = bisect_right(self.times, when)  # After equal times, so ties keep insertion order
+        self.times.insert(position, when)
+        self.todos.insert(position, todo)
+
+    def remove(self, when: int, todo_id: str) -> None:
+        position = bisect_left(self.times, when)
+        while position < len(self.times) and self.times[position] == when:
+            if self.todos[position].id == todo_id:
+                del self.times[position]
+                del self.todos[position]
+                return
+            position += 1
+
+    def extend(self, pairs: list[tuple[int, Todo]]) -> None:
+        """Add many (time, todo) pairs at once, e.g. a whole archive segment."""
+        if not pairs:
+            return
+        merged = list(zip(self.times, self.todos))
+        merged.extend(pairs)
+        merged.sort(key=itemgetter(0))  # Stable, and mostly two sorted runs, which sort() merges quickly
+        self.times = [when for when, _todo in merged]
+        self.todos = [todo for _when, todo in merged]
+
+    def bounds(self, start: int | None, end: int | None) -> tuple[int, int]:
+        """Positions of the todos with start <= time < end (either end may be open)."""
+        low = 0 if start is None else bisect_left(self.times, start)
+        high = len(self.times) if end is None else bisect_left(self.times, end)
+        return low, max(low, high)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class TimeIndex(indexes.StoreIndex):
+    """Created/completed timestamp indexes over one store's todos."""
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._sorted: dict[tuple[str, str], SortedTimes] = {
+            (field, list_name): SortedTimes()
+            for field in FIELDS for list_name in LISTS
+            if (field, list_name) != ("completed", "todo")  # Active todos have no completion time
+        }
+        self._live: dict[str, dict[str, Todo]] = {"todo": {}, "completed": {}}  # id -> indexed Todo
+        self._segments: set[int] = set()  # Archive segments already indexed
+        self._newest_segment: int | None = None  # Newest sealed segment when we last looked
+        self._archive_indexed = False  # Archive segments are only indexed once someone asks for them
+
+    # -------------------------
+    # Keeping the index up to date
+    # -------------------------
+
+    def _index(self, list_name: str, todo: Todo) -> None:
+        for field in FIELDS:
+            when = getattr(todo, field)
+            times = self._sorted.get((field, list_name))
+            if when is not None and times is not None:
+                times.insert(when, todo)
+
+    def _unindex(self, list_name: str, todo: Todo) -> None:
+        for field in FIELDS:
+            when = getattr(todo, field)
+            times = self._sorted.get((field, list_name))
+            if when is not None and times is not None:
+                times.remove(when, todo.id)
+
+    def _put(self, list_name: str, todo: Todo) -> None:
+        for name, live in self._live.items():
+            indexed = live.get(todo.id)
+            if indexed is not None:
+                if name == list_name and indexed == todo:
+                    return
+                self._unindex(name, live.pop(todo.id))
+        if list_name in self._live:
+            self._live[list_name][todo.id] = todo
+            self._index(list_name, todo)
+
+    def _delete(self, todo_id: str) -> None:
+        for name, live in self._live.items():
+            indexed = live.pop(todo_id, None)
+            if indexed is not None:
+                self._unindex(name, indexed)
+
+    def _index_archive(self, segments: set[int]) -> None:
+        if not self._segments <= segments:
+            # Retention dropped a segment; they are rare, so rebuild the archive part from scratch
+            for field in FIELDS:
+                self._sorted[(field, "archived")] = SortedTimes()
+            self._segments = set()
+        pairs: dict[str, list[tuple[int, Todo]]] = {field: [] for field in FIELDS}
+        for number in sorted(segments - self._segments):
+            for todo in self.store.load_archive_segment(number).values():
+                for field in FIELDS:
+                    when = getattr(todo, field)
+                    if when is not None:
+                        pairs[field].append((when, todo))
+        for field in FIELDS:
+            self._sorted[(field, "archived")].extend(pairs[field])
+        self._segments = segments
+
+    def _covers(self, include_archive: bool) -> bool:
+        return self._archive_indexed or not include_archive
+
+    def _catch_up(self, include_archive: bool) -> None:
+        if self._version is None:
+            self._reset()
+
+        for list_name, todos in (("todo", self.store.load_todos()), ("completed", self.store.load_completed())):
+            live = self._live[list_name]
+            for todo_id in [todo_id for todo_id in live if todo_id not in todos]:
+                self._unindex(list_name, live.pop(todo_id))
+            for todo in todos.values():
+                if live.get(todo.id) != todo:
+                    self._put(list_name, todo)
+
+        segments = {segment["segment"] for segment in self.store.archive_segments()}
+        self._newest_segment = max(segments, default=None)
+        self._archive_indexed |= include_archive
+        if self._archive_indexed:
+            self._index_archive(segments)
+
+    def _own_write_complete(self) -> bool:
+        # Completing a todo may have sealed the head into a segment; then _sync has to move it
+        segments = self.store.archive_segments()
+        return (segments[-1]["segment"] if segments else None) == self._newest_segment
+
+    # -------------------------
+    # Querying
+    # -------------------------
+
+    def between(self, field: str, start: int | None = None, end: int | None = None,
+                lists: tuple[str, ...] = LISTS, limit: int | None = None,
+                newest_first: bool = False) -> list[tuple[str, str, Todo]]:
+        """
+        Return the todos whose field ("created" or "completed") lies in [start, end).
+
+        Either end may be None for an open range. Results are (list, id, Todo) tuples ordered by
+        that timestamp, oldest first unless newest_first. Todos without the timestamp (active todos
+        have no completion time, very old ones may have no creation time) never match.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown time field {field!r}; expected one of {', '.join(FIELDS)}.")
+
+        with self._lock:
+            self._sync(include_archive="archived" in lists)
+
+            runs = []
+            for list_name in lists:
+                times = self._sorted.get((field, list_name))
+                if times is None:
+                    continue
+                low, high = times.bounds(start, end)
+                if low == high:
+                    continue
+                if limit is not None:
+                    # No run can contribute more than limit todos, so copy only those from the end read first
+                    if newest_first:
+                        low = max(low, high - limit)
+                    else:
+                        high = min(high, low + limit)
+                when, todos = times.times[low:high], times.todos[low:high]
+                if newest_first:
+                    when.reverse()
+                    todos.reverse()
+                runs.append(zip(when, repeat(list_name), todos))
+
+            merged = heapq.merge(*runs, key=itemgetter(0), reverse=newest_first)
+            return [(list_name, todo.id, todo) for _when, list_name, todo in islice(merged, limit)]
+
+
+def between(store, field: str, start: int | None = None, end: int | None = None,
+            lists: tuple[str, ...] = LISTS, limit: int | None = None, newest_first: bool = False):
+    """Query store's todos by time; see TimeIndex.between."""
+    return TimeIndex.for_store(store).between(field, start, end, lists, limit, newest_first)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+r"""
+One entry point for every front-end of the todo app:
+
+    todo                              the interactive terminal app (same as `todo cli`)
+    todo add buy milk                 any cli.py subcommand: add, batch, search, created, history, stats, ...
+    todo batch commands.txt           apply a command file in one transaction
+    todo gui [--store sqlite]         the desktop GUI
+    todo web [--store sqlite]         the Streamlit web app (streamlit run app_web.py)
+
+This file only imports os and sys. The chosen front-end is imported when it is picked, so
+`todo add` never loads FreeSimpleGUI or Streamlit, and the data folder is only touched once the
+store is actually used. Make it a command with e.g. `chmod +x todo.py && ln -s "$PWD/todo.py" ~/.local/bin/todo`.
+
+Startup time can be checked with `python bench.py --startup` or `python -X importtime todo.py add x`.
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_gui(argv: list[str]) -> int:
+    sys.argv = [os.path.join(HERE, "gui.py"), *argv]  # gui.py reads --store from sys.argv
+    import gui  # noqa: F401  (the GUI runs its event loop at import)
+    return 0
+
+
+def run_web(argv: list[str]) -> int:
+    from streamlit.web import cli as streamlit_cli
+    # Anything after the app path goes to app_web.py itself (e.g. --store sqlite)
+    sys.argv = ["streamlit", "run", os.path.join(HERE, "app_web.py"), "--", *argv]
+    return streamlit_cli.main()
+
+
+def run_cli(argv: list[str]) -> int:
+    import cli
+    return cli.start(argv)
+
+
+FRONT_ENDS = {  # First argument -> (runner, what it starts); anything else is a cli.py subcommand
+    "cli": (run_cli, "the interactive terminal app, or the cli.py subcommand after it"),
+    "gui": (run_gui, "the desktop GUI (e.g. todo.py gui --store sqlite)"),
+    "web": (run_web, "the Streamlit web app (options after it go to app_web.py, e.g. --store sqlite)"),
+}
+
+
+def usage() -> str:
+    """todo.py's own help; -h/--help prints it before cli.py's options and subcommands."""
+    lines = ["usage: todo.py [cli|gui|web] [options]   or   todo.py SUBCOMMAND ...   (any cli.py subcommand)",
+             "", "front-ends:"]
+    lines += [f"  {name:<6} {description}" for name, (_runner, description) in FRONT_ENDS.items()]
+    lines.append("  batch  apply a command file in one transaction (the cli.py batch subcommand)")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Dispatch to the front-end named by the first argument; anything else goes to the CLI."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in FRONT_ENDS:
+        runner, _description = FRONT_ENDS[argv[0]]
+        return runner(argv[1:])
+    if argv[:1] in (["-h"], ["--help"]):
+        print(usage())
+    return run_cli(argv)  # "batch" is a cli.py subcommand, as are add, search, ...
+
+
+if __name__ == "__main__":
+    sys.exit(main())
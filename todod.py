@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+import archive
+import metrics
+import store as storage
+from locking import VersionConflict
+from records import Todo
+
+r"""
+todod: an optional daemon that owns the todo store, and the client store that talks to it.
+
+Without it every front-end opens the files itself, keeps its own copy of the lists and parses
+them again after every change made elsewhere. With it one process holds the store (and so the
+parsed lists) and the front-ends are thin clients on a Unix domain socket:
+
+    python todod.py                      # serve ~/.todo_app/todod.sock (add --store sqlite, --durability fsync)
+    python cli.py --store daemon add Buy milk
+    python gui.py --store daemon         # or TODO_STORE=daemon for every front-end
+
+Protocol: every message is a frame, a 4-byte big-endian length followed by that many bytes of
+compact JSON. A request is [id, op, args] and its reply [id, 0, result] or [id, 1, [error type,
+message, data]]. A client may send many requests before reading any reply (pipelining); replies
+come back in request order. Todos travel as [id, text, created, completed] and listings as lists of
+those. After a "subscribe" request the connection also receives [0, "changed", version] whenever
+the store version moves past the one in the reply, whoever wrote. Nothing is ever written with a
+blocking call: a subscriber that stops reading is disconnected once it is MAX_BACKLOG bytes behind.
+
+The daemon is a single thread around a selector: requests are run one at a time, in the order
+they arrive, against one store. "begin" opens a store transaction for one connection; until its
+"commit" (or "abort", or the client going away) requests from other connections wait.
+"""
+
+SOCKET_NAME = "todod.sock"
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024  # Refuse absurd lengths instead of trying to buffer them
+WATCH_INTERVAL = 0.5  # Seconds between checks for writes made around the daemon (for subscribers)
+MAX_BACKLOG = 256 * 1024  # Unsent bytes a subscriber may fall behind by before it is disconnected
+
+
+def socket_path(appdata_dir: str) -> str:
+    """Where the daemon for appdata_dir listens."""
+    return os.path.join(appdata_dir, SOCKET_NAME)
+
+
+# =========================
+# Framing and encoding
+# =========================
+
+def encode_frame(message) -> bytes:
+    data = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def decode_frames(buffer: bytearray) -> list:
+    """Remove and return the complete frames at the start of buffer (a partial one stays)."""
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= FRAME_HEADER.size:
+        (length,) = FRAME_HEADER.unpack_from(buffer, offset)
+        if length > MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes is too large")
+        end = offset + FRAME_HEADER.size + length
+        if end > len(buffer):
+            break
+        messages.append(json.loads(buffer[offset + FRAME_HEADER.size:end]))
+        offset = end
+    del buffer[:offset]
+    return messages
+
+
+def _todo_row(todo: Todo | None):
+    return None if todo is None else [todo.id, todo.text, todo.created, todo.completed]
+
+
+def _todo_rows(todos: dict) -> list:
+    return [[todo.id, todo.text, todo.created, todo.completed] for todo in todos.values()]
+
+
+def _as_is(value):
+    return value
+
+
+def _todo(row) -> Todo | None:
+    return None if row is None else Todo(*row)
+
+
+def _todos(rows) -> dict[str, Todo]:
+    return {row[0]: Todo(*row) for row in rows}
+
+
+# op -> (store method, encoder) on the daemon; writes bump the version, so subscribers hear of them
+OPS = {
+    "version": ("version", _as_is),
+    "load_todos": ("load_todos", _todo_rows),
+    "load_completed": ("load_completed", _todo_rows),
+    "get": ("get", _todo_row),
+    "counts": ("counts", _as_is),
+    "add": ("add", _as_is),
+    "replace": ("replace", _todo_row),
+    "delete": ("delete", _todo_row),
+    "complete": ("complete", _todo_row),
+    "clear_completed": ("clear_completed", _as_is),
+    "archive_segments": ("archive_segments", _as_is),
+    "load_archive_segment": ("load_archive_segment", _todo_rows),
+    "seal_completed": ("seal_completed", _as_is),
+    "apply_retention": ("apply_retention", _as_is),
+    "watch_paths": ("watch_paths", _as_is),
+}
+
+
+# =========================
+# The daemon
+# =========================
+
+class Connection:
+    """One client of the daemon."""
+
+    __slots__ = ("sock", "buffer", "outbox", "waiting", "announced", "transaction")
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buffer = bytearray()  # Bytes received but not yet a complete frame
+        self.outbox = bytearray()  # Bytes the client has not taken yet; sent when the socket is writable
+        self.waiting: list = []  # Requests held back while another connection's transaction is open
+        self.announced: int | None = None  # Version this subscriber was last told about (None: not subscribed)
+        self.transaction: ExitStack | None = None  # Open store transaction, between begin and commit
+
+
+class Daemon:
+    """Serve one store to the clients of a Unix socket."""
+
+    def __init__(self, store: storage.TodoStore, path: str):
+        self.store = store
+        self.path = path
+        self._selector = selectors.DefaultSelector()
+        self._connections: dict[socket.socket, Connection] = {}
+        self._owner: Connection | None = None  # Connection whose transaction is open
+        self._stop_r, self._stop_w = os.pipe()  # stop() wakes the selector through this pipe
+        self.listener: socket.socket | None = None
+
+    def bind(self) -> None:
+        """Listen on the socket path, replacing a stale socket left by a daemon that died."""
+        if os.path.exists(self.path):
+            if _is_listening(self.path):
+                raise RuntimeError(f"todod is already running on {self.path}")
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)  # The socket is only for this user
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self._selector.register(self.listener, selectors.EVENT_READ)
+        self._selector.register(self._stop_r, selectors.EVENT_READ)
+
+    def serve_forever(self) -> None:
+        if self.listener is None:
+            self.bind()
+        try:
+            while True:
+                for key, mask in self._selector.select(WATCH_INTERVAL):
+                    if key.fileobj == self._stop_r:
+                        return
+                    if key.fileobj is self.listener:
+                        self._accept()
+                    else:
+                        connection = self._connections.get(key.fileobj)
+                        if connection is None:  # Closed by an earlier event of this round
+                            continue
+                        if mask & selectors.EVENT_WRITE:
+                            self._flush(connection)
+                        else:
+                            self._receive(connection)
+                self._announce()
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        """Make serve_forever() return (from any thread)."""
+        os.write(self._stop_w, b"x")
+
+    # -------------------------
+    # Connections
+    # -------------------------
+
+    def _accept(self) -> None:
+        try:
+            sock, _address = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)  # A client that stops reading must never stall the others
+        self._connections[sock] = Connection(sock)
+        self._selector.register(sock, selectors.EVENT_READ)
+        metrics.count("todod.connections")
+
+    def _receive(self, connection: Connection) -> None:
+        try:
+            data = connection.sock.recv(256 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(connection)
+            return
+        connection.buffer += data
+        try:
+            requests = decode_frames(connection.buffer)
+        except ValueError:
+            self._close(connection)  # Not speaking our protocol
+            return
+        connection.waiting.extend(requests)
+        self._serve(connection)
+
+    def _serve(self, connection: Connection) -> None:
+        """Run connection's waiting requests (unless another connection's transaction is open)."""
+        replies = []
+        while connection.waiting and self._owner in (None, connection):
+            replies.append(self._handle(connection, connection.waiting.pop(0)))
+        if replies and not self._send(connection, b"".join(replies)):  # A pipelined burst in one write
+            return
+        if self._owner is None:
+            self._serve_waiting()
+
+    def _send(self, connection: Connection, data: bytes) -> bool:
+        """
+        Send data without blocking; what the client does not take now waits in its outbox.
+
+        While the outbox is not empty the connection is only watched for writing, so a client that
+        stops reading gets no further requests served either. Returns False if it was closed.
+        """
+        if connection.outbox:
+            connection.outbox += data
+            return True
+        try:
+            sent = connection.sock.send(data)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._close(connection)
+            return False
+        if sent < len(data):
+            connection.outbox += data[sent:]
+            self._selector.modify(connection.sock, selectors.EVENT_WRITE)
+        return True
+
+    def _flush(self, connection: Connection) -> None:
+        """The client's socket is writable again: send its outbox, then go back to reading requests."""
+        try:
+            sent = connection.sock.send(connection.outbox)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._close(connection)
+            return
+        del connection.outbox[:sent]
+        if not connection.outbox:
+            self._selector.modify(connection.sock, selectors.EVENT_READ)
+            if connection.waiting:
+                self._serve(connection)
+
+    def _serve_waiting(self) -> None:
+        """A transaction ended: serve the requests other connections sent meanwhile."""
+        for connection in list(self._connections.values()):
+            if connection.waiting and self._owner is None and not connection.outbox:
+                self._serve(connection)
+
+    def _close(self, connection: Connection) -> None:
+        if connection.transaction is not None:
+            self._end_transaction(connection, commit=False)  # Client went away mid-transaction
+        self._connections.pop(connection.sock, None)
+        try:
+            self._selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        connection.sock.close()
+        if self._owner is None:
+            self._serve_waiting()
+
+    def _shutdown(self) -> None:
+        for connection in list(self._connections.values()):
+            self._close(connection)
+        if self.listener is not None:
+            self._selector.unregister(self.listener)
+            self.listener.close()
+            self.listener = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self._selector.close()
+        os.close(self._stop_r)
+        os.close(self._stop_w)
+        self.store.close()
+
+    # -------------------------
+    # Requests
+    # -------------------------
+
+    def _handle(self, connection: Connection, request) -> bytes:
+        request_id = request[0] if isinstance(request, list) and request else None
+        try:
+            request_id, op, args = request
+            metrics.count(f"todod.{op}")
+            if op == "begin":
+                result = self._begin(connection, *args)
+            elif op == "commit":
+                result = self._end_transaction(connection, commit=True)
+            elif op == "abort":
+                result = self._end_transaction(connection, commit=False)
+            elif op == "subscribe":
+                result = connection.announced = self.store.version()  # Only later versions are pushed
+            elif op in OPS:
+                method, encode = OPS[op]
+                result = encode(getattr(self.store, method)(*args))
+            else:
+                raise ValueError(f"Unknown request {op!r}")
+        except Exception as e:
+            return encode_frame([request_id, 1, _error_data(e)])
+        return encode_frame([request_id, 0, result])
+
+    def _begin(self, connection: Connection, expected_version: int | None = None) -> int:
+        if connection.transaction is not None:
+            raise RuntimeError("A transaction is already open on this connection")
+        stack = ExitStack()
+        version = stack.enter_context(self.store.transaction(expected_version))  # May raise VersionConflict
+        connection.transaction = stack
+        self._owner = connection
+        return version
+
+    def _end_transaction(self, connection: Connection, commit: bool) -> int:
+        stack, connection.transaction = connection.transaction, None
+        if stack is None:
+            raise RuntimeError("No transaction is open on this connection")
+        self._owner = None
+        if commit:
+            stack.close()  # Writes the buffered changes (raises if that fails)
+        else:
+            stack.__exit__(RuntimeError, RuntimeError("Transaction aborted"), None)  # Rolls back
+        return self.store.version()
+
+    def _announce(self) -> None:
+        """Tell subscribers the store version moved, by our clients or by anyone else."""
+        subscribers = [connection for connection in self._connections.values() if connection.announced is not None]
+        if not subscribers or self._owner is not None:
+            return
+        version = self.store.version()
+        event = encode_frame([0, "changed", version])
+        for connection in subscribers:
+            if connection.announced == version:
+                continue
+            if len(connection.outbox) > MAX_BACKLOG:
+                metrics.count("todod.dropped_subscribers")
+                self._close(connection)  # Not reading its events (e.g. a suspended GUI); it may subscribe again
+                continue
+            connection.announced = version
+            self._send(connection, event)
+
+
+def _error_data(error: Exception) -> list:
+    if isinstance(error, VersionConflict):
+        return ["VersionConflict", str(error), [error.expected, error.actual]]
+    if isinstance(error, KeyError):
+        return ["KeyError", error.args[0] if error.args else "", None]
+    return [type(error).__name__, str(error), None]
+
+
+def _is_listening(path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+# =========================
+# The client store
+# =========================
+
+class DaemonUnavailable(ConnectionError):
+    """No todod is listening on the socket."""
+
+
+class DaemonStore(storage.TodoStore):
+    """A TodoStore whose every call is a request to todod; nothing is read from disk here."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sock = _connect(path)
+        self._buffer = bytearray()
+        self._replies: deque = deque()  # Replies received but not yet collected, in request order
+        self._lock = threading.RLock()  # One request/reply exchange (or transaction) at a time
+        self._next_id = 1
+        self._depth = 0  # Nesting of transaction() blocks; only the outermost talks to the daemon
+
+    # -------------------------
+    # Requests
+    # -------------------------
+
+    def call(self, op: str, *args):
+        """Send one request and return its (decoded) result."""
+        return self.pipeline([(op, *args)])[0]
+
+    def pipeline(self, calls: list[tuple]) -> list:
+        """
+        Send several requests in one write and read their replies, e.g.
+        store.pipeline([("load_todos",), ("load_completed",), ("version",)]).
+
+        Raises the error of the first request that failed, after all replies were read.
+        """
+        with self._lock:
+            first_id = self._next_id
+            self._next_id += len(calls)
+            frames = [encode_frame([first_id + n, op, list(args)]) for n, (op, *args) in enumerate(calls)]
+            try:
+                self._sock.sendall(b"".join(frames))
+                replies = [self._reply(first_id + n) for n in range(len(calls))]
+            except OSError as e:
+                raise DaemonUnavailable(f"Lost the connection to todod on {self.path}: {e}") from None
+        results = []
+        for (op, *_args), (status, result) in zip(calls, replies):
+            if status:
+                raise _error(result)
+            results.append(_DECODERS.get(op, _as_is)(result))
+        return results
+
+    def _reply(self, request_id: int):
+        while not self._replies:
+            data = self._sock.recv(256 * 1024)
+            if not data:
+                raise ConnectionResetError("todod closed the connection")
+            self._buffer += data
+            self._replies.extend(decode_frames(self._buffer))
+        reply_id, status, result = self._replies.popleft()
+        if reply_id != request_id:  # Replies come in request order, so this means a protocol bug
+            raise ConnectionError(f"todod answered request {reply_id} while {request_id} was expected")
+        return status, result
+
+    # -------------------------
+    # TodoStore
+    # -------------------------
+
+    def load_todos(self) -> dict[str, Todo]:
+        return self.call("load_todos")
+
+    def load_completed(self) -> dict[str, Todo]:
+        return self.call("load_completed")
+
+    def get(self, todo_id: str) -> Todo | None:
+        return self.call("get", todo_id)
+
+    def counts(self) -> dict[str, int]:
+        return self.call("counts")
+
+    def version(self) -> int:
+        return self.call("version")
+
+    @contextmanager
+    def transaction(self, expected_version: int | None = None):
+        with self._lock:  # Other threads using this client wait for the whole transaction
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self.version()
+                finally:
+                    self._depth -= 1
+                return
+
+            version = self.call("begin", expected_version)
+            self._depth = 1
+            try:
+                yield version
+            except BaseException:
+                self._depth = 0
+                self.call("abort")
+                raise
+            self._depth = 0
+            self.call("commit")
+
+    def add(self, text: str, created: int | None = None) -> str:
+        return self.call("add", text, created)
+
+    def replace(self, todo_id: str, text: str) -> Todo:
+        return self.call("replace", todo_id, text)
+
+    def delete(self, todo_id: str) -> Todo:
+        return self.call("delete", todo_id)
+
+    def complete(self, todo_id: str, completed: int | None = None) -> Todo:
+        return self.call("complete", todo_id, completed)
+
+    def clear_completed(self) -> None:
+        self.call("clear_completed")
+
+    def archive_segments(self) -> list[dict]:
+        return self.call("archive_segments")
+
+    def load_archive_segment(self, segment: int) -> dict[str, Todo]:
+        return self.call("load_archive_segment", segment)
+
+    def seal_completed(self) -> dict | None:
+        return self.call("seal_completed")
+
+    def apply_retention(self, max_segments: int | None = archive.RETENTION_SEGMENTS,
+                        max_age_days: float | None = archive.RETENTION_DAYS) -> int:
+        return self.call("apply_retention", max_segments, max_age_days)
+
+    def watch_paths(self) -> list[str]:
+        return self.call("watch_paths")  # The daemon's files; they are on this machine too
+
+    def subscribe(self):
+        """Yield the store version every time it moves (on a connection of its own; blocks between changes)."""
+        sock = _connect(self.path)
+        buffer = bytearray()
+        try:
+            sock.sendall(encode_frame([1, "subscribe", []]))
+            while True:
+                for _reply_id, _status, version in decode_frames(buffer):
+                    yield version  # The subscribe reply first, then one [0, "changed", version] per change
+                data = sock.recv(64 * 1024)
+                if not data:
+                    return
+                buffer += data
+        finally:
+            sock.close()
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+_DECODERS = {
+    "load_todos": _todos,
+    "load_completed": _todos,
+    "load_archive_segment": _todos,
+    "get": _todo,
+    "replace": _todo,
+    "delete": _todo,
+    "complete": _todo,
+}
+
+
+def _error(data: list) -> Exception:
+    """Turn an error reply back into the exception the local stores would have raised."""
+    kind, message, extra = data
+    if kind == "VersionConflict":
+        return VersionConflict(*extra)
+    if kind == "KeyError":
+        return KeyError(message)
+    if kind == "ValueError":
+        return ValueError(message)
+    return RuntimeError(f"todod: {kind}: {message}")
+
+
+def _connect(path: str) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise DaemonUnavailable(f"todod is not running on {path}. Start it with: python todod.py") from None
+    return sock
+
+
+# =========================
+# Running the daemon
+# =========================
+
+def main(argv=None) -> int:
+    import functions  # Only for the default data folder
+
+    parser = argparse.ArgumentParser(description="todod - serve the todo store to the front-ends")
+    parser.add_argument("--store", choices=("text", "sqlite"), default=None,
+                        help="backend holding the data (default: $TODO_STORE or text)")
+    parser.add_argument("--durability", choices=storage.DURABILITY_MODES, default=None)
+    parser.add_argument("--dir", default=functions.APPDATA_DIR, help="data folder (default: ~/.todo_app)")
+    args = parser.parse_args(argv)
+
+    if args.durability:
+        storage.set_durability(args.durability)
+    kind = args.store or os.environ.get(storage.STORE_ENV_VAR)
+    if kind == "daemon":
+        kind = None  # TODO_STORE=daemon is meant for the clients; the daemon itself uses the files
+    daemon = Daemon(storage.open_store(kind, args.dir), socket_path(args.dir))
+    metrics.autosave(functions.METRICS_DIR, "todod")
+    try:
+        daemon.bind()
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+        return 1
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: daemon.stop())  # kill: shut down cleanly too
+    print(f"🚀 todod is serving {args.dir} on {daemon.path} (Ctrl+C to stop)", flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 todod stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
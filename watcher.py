@@ -0,0 +1,191 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+r"""
+File change notifications for the todo data files.
+
+FileWatcher calls a callback (on its own thread) whenever one of the watched files changes. On Linux
+it uses inotify, so the watcher thread sleeps inside the kernel and costs no CPU until something is
+actually written. Elsewhere, or if inotify is unavailable, it falls back to comparing the files'
+mtime/size once per poll_interval. Files in a folder inotify can't watch (one that doesn't exist yet)
+are polled that way too, while the other folders stay on inotify.
+
+Bursts of events (a save touches the log, the lock file and maybe the snapshot) are merged: the
+callback runs once, debounce seconds after things go quiet, with the set of paths that changed.
+
+The GUI uses it like this:
+
+    watcher = FileWatcher(store.watch_paths(), lambda paths: window.write_event_value("-FILES-", paths))
+    watcher.start()
+"""
+
+# inotify event masks (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len (followed by len bytes of name)
+
+
+class FileWatcher:
+    """Watch a set of files and report changes to a callback."""
+
+    def __init__(self, paths, callback, debounce: float = 0.05, poll_interval: float = 1.0):
+        self.paths = {os.path.abspath(path) for path in paths}
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = None  # "inotify" or "stat" once started
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._wake_r = self._wake_w = None  # Pipe used to wake the inotify thread on stop()
+
+    def start(self) -> None:
+        """Start watching on a daemon thread."""
+        watch = _inotify_watch(self.paths)
+        if watch is not None:
+            self.backend = "inotify"
+            self._wake_r, self._wake_w = os.pipe()
+            target, args = self._run_inotify, watch
+        else:
+            self.backend = "stat"
+            target, args = self._run_stat, ()
+        self._thread = threading.Thread(target=target, args=args, name="todo-file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the watcher thread to finish."""
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    # -------------------------
+    # inotify backend
+    # -------------------------
+
+    def _run_inotify(self, inotify_fd: int, wds: dict[int, str], unwatched: set[str]) -> None:
+        # Files whose folder could not be watched (it doesn't exist yet) are polled in between
+        last = {path: _stat_signature(path) for path in unwatched}
+        timeout = self.poll_interval if unwatched else None
+        try:
+            while not self._stop.is_set():
+                # Block with no timeout when every folder is watched: zero CPU until the kernel reports a change
+                readable, _, _ = select.select([inotify_fd, self._wake_r], [], [], timeout)
+                if self._wake_r in readable:
+                    break
+
+                changed = self._poll(unwatched, last)
+                if inotify_fd in readable:
+                    changed |= self._read_events(inotify_fd, wds)
+                    # Keep collecting while events keep coming, then report once
+                    while not self._stop.is_set():
+                        readable, _, _ = select.select([inotify_fd, self._wake_r], [], [], self.debounce)
+                        if not readable or self._wake_r in readable:
+                            break
+                        changed |= self._read_events(inotify_fd, wds)
+
+                if changed and not self._stop.is_set():
+                    self._notify(changed)
+        finally:
+            os.close(inotify_fd)
+            os.close(self._wake_r)  # type: ignore
+            os.close(self._wake_w)  # type: ignore
+
+    def _read_events(self, inotify_fd: int, wds: dict[int, str]) -> set[str]:
+        """Read pending inotify events and return the watched paths they touched."""
+        data = os.read(inotify_fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            path = os.path.join(wds.get(wd, ""), name)
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    # -------------------------
+    # stat fallback
+    # -------------------------
+
+    def _run_stat(self) -> None:
+        last = {path: _stat_signature(path) for path in self.paths}
+        while not self._stop.wait(self.poll_interval):
+            changed = self._poll(self.paths, last)
+            if changed:
+                self._notify(changed)
+
+    @staticmethod
+    def _poll(paths, last: dict) -> set[str]:
+        """Return the paths whose stat signature differs from last (which is updated)."""
+        changed = set()
+        for path in paths:
+            signature = _stat_signature(path)
+            if signature != last[path]:
+                last[path] = signature
+                changed.add(path)
+        return changed
+
+    def _notify(self, changed: set[str]) -> None:
+        # A failing callback (e.g. the GUI window closing during a theme switch) must not stop
+        # the watcher; the next change will be reported again
+        try:
+            self.callback(changed)
+        except Exception:
+            pass
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _inotify_watch(paths) -> tuple[int, dict[int, str], set[str]] | None:
+    """
+    Create an inotify instance watching the directories that hold paths.
+
+    Watching the directory rather than each file keeps working when a file is replaced by rename
+    (as compaction does). Returns (inotify fd, {watch descriptor: directory}, paths left to poll
+    because their directory could not be watched), or None when inotify is not available or no
+    directory could be watched.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    wds = {}
+    unwatched = set()
+    for directory in {os.path.dirname(path) for path in paths}:
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            # Typically a folder that doesn't exist yet: poll just its files, keep inotify for the rest
+            unwatched |= {path for path in paths if os.path.dirname(path) == directory}
+            continue
+        wds[wd] = directory
+    if not wds:
+        os.close(fd)
+        return None
+    return fd, wds, unwatched
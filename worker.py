@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+
+import metrics
+
+r"""
+A background thread for the GUI's disk work.
+
+Loading, saving and searching can take a while with a big archive or a slow home folder, and a
+GUI that does them inside its event loop freezes until they finish. IOWorker runs them one at a
+time, in the order they were submitted, on its own thread. When a job finishes it is handed to a
+notify callback, which for FreeSimpleGUI posts it back into the window's event queue
+(write_event_value is thread-safe), so the event loop picks up the result like any other event:
+
+    worker = IOWorker(lambda job: window.write_event_value(IO_DONE, job))
+    worker.start()
+    worker.submit("add", functions.add, text, {}, store)
+    ...
+    if event == IO_DONE:
+        job = values[IO_DONE]     # job.action, job.result, job.error, job.seconds
+
+Jobs should not touch data the GUI thread is using: the GUI passes scratch dicts to the
+functions.* mutations and applies the returned functions.Change to its own lists itself.
+"""
+
+
+class Job:
+    """One piece of work for the IOWorker, and its outcome once it ran."""
+
+    __slots__ = ("action", "func", "args", "notify", "result", "error", "seconds")
+
+    def __init__(self, action: str, func, args: tuple, notify=None):
+        self.action = action  # What the GUI should do with the result, e.g. "add" or "reload"
+        self.func = func
+        self.args = args
+        self.notify = notify  # Overrides the worker's callback (e.g. to answer a dialog window)
+        self.result = None
+        self.error: Exception | None = None  # Set instead of result if func raised
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"Job({self.action!r}, error={self.error!r}, seconds={self.seconds:.3f})"
+
+
+class IOWorker:
+    """Run submitted jobs in order on a background thread and report each one when it is done."""
+
+    def __init__(self, notify, name: str = "gui-io"):
+        self.notify = notify
+        self._queue: queue.Queue[Job | None] = queue.Queue()
+        self._pending = 0  # Jobs submitted but not reported yet
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(self, action: str, func, *args, notify=None) -> Job:
+        """Queue func(*args); the finished Job is passed to notify (default: the worker's callback)."""
+        job = Job(action, func, args, notify)
+        with self._lock:
+            self._pending += 1
+        self._queue.put(job)
+        return job
+
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock:
+            return self._pending
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Finish the jobs already queued (so no save is lost on exit), then end the thread."""
+        self._queue.put(None)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            start = time.perf_counter()
+            try:
+                job.result = job.func(*job.args)
+            except Exception as e:  # Reported to the GUI, which decides what to show
+                job.error = e
+            job.seconds = time.perf_counter() - start
+            metrics.observe(f"worker.{job.action}", job.seconds, "seconds")
+            with self._lock:
+                self._pending -= 1  # Before notifying, so the GUI sees 0 when the last job arrives
+            try:
+                (job.notify or self.notify)(job)
+            except Exception:
+                pass  # The window went away (closed or being re-created); nobody is waiting for it